@@ -1,9 +1,23 @@
 import logging  # this is to access to basic logging functioanlity
 import logging.config  # this is to specifically configure our logging system
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
-from app.routers import category_routes
+from app.db_connetion import DB_ASYNC_MODE, async_replica_set, engine, replica_set
+from app.routers import (
+    autocomplete_routes,
+    category_async_routes,
+    category_bulk_routes,
+    category_export_routes,
+    category_routes,
+    category_search_routes,
+    category_tree_routes,
+    metrics_routes,
+)
+from app.utils.autocomplete import AUTOCOMPLETE_PRELOAD, preload_autocomplete
+from app.utils.category_events import CATEGORY_NOTIFY_ENABLED, CategoryChangeListener
 
 # using an external configuration file; in this case logging.conf
 
@@ -15,8 +29,50 @@ logging.config.fileConfig("logging.conf", disable_existing_loggers=False)
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-app.include_router(category_routes.router, prefix="/api/category", tags=["categories"])
+# evicts this worker's cached categories when any worker writes one
+category_listener = CategoryChangeListener(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background work of this worker, started before it serves requests
+    active_replica_set = async_replica_set if DB_ASYNC_MODE else replica_set
+    active_replica_set.start_health_checks()
+    if CATEGORY_NOTIFY_ENABLED:
+        category_listener.start()
+    if AUTOCOMPLETE_PRELOAD:
+        # after the listener, so no write between the two gets lost
+        await run_in_threadpool(preload_autocomplete)
+    yield
+    category_listener.stop()
+    active_replica_set.stop_health_checks()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# DB_ASYNC_MODE=true swaps in the async def versions of the category endpoints
+category_router = (
+    category_async_routes.router if DB_ASYNC_MODE else category_routes.router
+)
+# routers with fixed paths go before the category router, otherwise its
+# /{category_id} routes would catch them
+app.include_router(
+    category_export_routes.router, prefix="/api/category", tags=["categories"]
+)
+app.include_router(
+    category_bulk_routes.router, prefix="/api/category", tags=["categories"]
+)
+app.include_router(
+    category_tree_routes.router, prefix="/api/category", tags=["categories"]
+)
+app.include_router(
+    category_search_routes.router, prefix="/api/category", tags=["categories"]
+)
+app.include_router(category_router, prefix="/api/category", tags=["categories"])
+app.include_router(
+    autocomplete_routes.router, prefix="/api/autocomplete", tags=["autocomplete"]
+)
+app.include_router(metrics_routes.router, prefix="/api/metrics", tags=["metrics"])
 
 
 """# Define a test endpoint
@@ -1,5 +1,6 @@
 from sqlalchemy import (
     DECIMAL,
+    BigInteger,
     Boolean,
     CheckConstraint,
     Column,
@@ -7,6 +8,7 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,  # this one is object type
@@ -18,6 +20,15 @@ from sqlalchemy.dialects.postgresql import UUID
 
 from .db_connetion import Base
 
+# the text GET /api/category/search matches against, the words of the name and the
+# slug (- and _ split words). the search queries repeat this expression verbatim,
+# postgres only uses ix_category_search for the exact same expression. written the
+# way postgres prints it back, so alembic finds the index unchanged
+CATEGORY_SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, (name::text || ' '::text) "
+    "|| translate(slug::text, '-_'::text, '  '::text))"
+)
+
 
 class Category(Base):
     __tablename__ = "category"
@@ -28,6 +39,14 @@ class Category(Base):
     is_active = Column(Boolean, nullable=False, default=False, server_default="False")
     level = Column(Integer, nullable=False, default="100", server_default="100")
     parent_id = Column(Integer, ForeignKey("category.id"), nullable=True)
+    # row version of the category, like updated_at of Product. the upsert sets it
+    # itself, ON CONFLICT DO UPDATE doesnt apply onupdate
+    updated_at = Column(
+        DateTime,
+        server_default=text("CURRENT_TIMESTAMP"),
+        onupdate=func.now(),
+        nullable=False,
+    )
 
     # to set the default value there are two approaches: default parameter and server default parameter
     # server default value specifies the default value applied at the database level
@@ -50,9 +69,43 @@ class Category(Base):
             "name", "level", name="uq_category_name_level"
         ),  # check together
         UniqueConstraint("slug", name="uq_category_slug"),
+        # keyset pagination of GET /api/category/ walks the table in this order
+        Index("ix_category_level_id", "level", "id"),
+        # deleting a category checks that no child category / product points at it,
+        # without these indexes that check is a full scan of both tables
+        Index("ix_category_parent_id", "parent_id"),
+        Index(
+            "ix_category_search", text(CATEGORY_SEARCH_DOCUMENT), postgresql_using="gin"
+        ),
     )
 
 
+class CategoryVersion(Base):
+    # single row (id 1) counter bumped by every committed category write, workers
+    # use it to find out they missed a change notification (app/utils/category_events.py)
+    __tablename__ = "category_version"
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    version = Column(BigInteger, nullable=False, server_default="0")
+
+
+class CategoryPath(Base):
+    # materialized path of a category, the ids from the top level category down
+    # to it: "3/17/42/". written only by the triggers of the category table (see
+    # the migrations), on insert and on every parent_id change, never by the app.
+    # "C" collation so a subtree is a plain btree range. a table of its own
+    # because a move rewrites the path of the whole subtree: a narrow row with two
+    # indexes is several times cheaper to rewrite than the category row with six
+    __tablename__ = "category_path"
+
+    category_id = Column(
+        Integer, ForeignKey("category.id", ondelete="CASCADE"), primary_key=True
+    )
+    path = Column(Text(collation="C"), nullable=False)
+
+    __table_args__ = (Index("ix_category_path_path", "path"),)
+
+
 class Product(Base):
     __tablename__ = "product"
 
@@ -96,6 +149,7 @@ class Product(Base):
         UniqueConstraint("name", name="uq_product_name"),
         UniqueConstraint("slug", name="uq_product_slug"),
         UniqueConstraint("pid", name="uq_product_pid"),
+        Index("ix_product_category_id", "category_id"),
     )
 
 
@@ -0,0 +1,43 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.schemas.autocomplete_schema import AutocompleteKind, AutocompleteReturn
+from app.utils.autocomplete import (
+    AUTOCOMPLETE_MAX_LIMIT,
+    category_autocomplete,
+    product_autocomplete,
+)
+
+# type-ahead, answered from the in-memory indexes of this worker
+# (app/utils/autocomplete.py). plain def handler: a lookup right after a category
+# write reads the changed rows first
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def autocomplete_items(autocomplete, q, limit):
+    return [
+        {"id": row_id, "name": name, "slug": slug}
+        for row_id, name, slug, _ in autocomplete.complete(q, limit)
+    ]
+
+
+# Endpoint to suggest the categories and products whose name starts with q
+@router.get("/", response_model=AutocompleteReturn)
+def autocomplete(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=AUTOCOMPLETE_MAX_LIMIT),
+    kind: AutocompleteKind = AutocompleteKind.all,
+):
+    try:
+        result = {}
+        if kind in (AutocompleteKind.all, AutocompleteKind.category):
+            result["categories"] = autocomplete_items(category_autocomplete, q, limit)
+        if kind in (AutocompleteKind.all, AutocompleteKind.product):
+            result["products"] = autocomplete_items(product_autocomplete, q, limit)
+        return result
+    except Exception as e:
+        logger.error(f"Unexpected error while autocompleting: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
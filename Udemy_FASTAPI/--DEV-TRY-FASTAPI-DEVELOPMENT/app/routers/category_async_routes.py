@@ -0,0 +1,227 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db_connetion import get_async_db_session, get_async_read_db_session
+from app.models import Category
+from app.schemas.category_schema import (
+    CategoryCreate,
+    CategoryDeleteReturn,
+    CategoryPatch,
+    CategoryReturn,
+    CategoryUpdate,
+)
+from app.utils.cache import MISSING
+from app.utils.category_cache import get_cached_category, load_category_async
+from app.utils.category_etag import (
+    CATEGORY_ETAG_ENABLED,
+    category_version,
+    not_modified,
+    read_version_async,
+    version_etag,
+)
+from app.utils.category_events import record_category_change
+from app.utils.category_reads import (
+    category_page_statement,
+    category_records,
+)
+from app.utils.category_utils import (
+    CATEGORY_RETURN_FIELDS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    check_existing_category_async,
+    delete_category_statement,
+    insert_category_statement,
+    patch_category_statement,
+    raise_if_name_level_conflict,
+    raise_if_parent_cycle,
+    set_next_page,
+    update_category_statement,
+    upsert_category_statement,
+)
+from app.utils.fast_json import FAST_JSON, rows_response
+from app.utils.response_cache import (
+    RESPONSE_CACHE_ITEM_TTL,
+    CachedRoute,
+    cached_response,
+    category_tags,
+)
+
+# async def versions of the endpoints in category_routes.py, served instead of them
+# when DB_ASYNC_MODE=true. a plain def handler occupies a threadpool thread for the
+# whole request; these ones give the event loop back while they wait on postgres
+
+router = APIRouter(route_class=CachedRoute)
+logger = logging.getLogger(__name__)
+
+
+# Endpoint to retrieve all categories
+@router.get("/", response_model=List[CategoryReturn])
+@cached_response()
+async def get_categories(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db_session),
+):
+    try:
+        if CATEGORY_ETAG_ENABLED:
+            # the cached version only answers the If-None-Match. the ETag of a page
+            # is the version of the session its rows come from, a replica may not
+            # have the latest write yet
+            if request.headers.get("if-none-match"):
+                version = await category_version.get_async(db)
+                if (unchanged := not_modified(request, response, version)) is not None:
+                    return unchanged
+            response.headers["ETag"] = version_etag(await read_version_async(db))
+        result = await db.execute(category_page_statement(cursor, limit))
+        rows = set_next_page(request, response, result.all(), limit)
+        if FAST_JSON:  # written straight out, no response_model pass
+            return rows_response(rows, CATEGORY_RETURN_FIELDS, response)
+        return category_records(rows)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to retrieve a category by its slug
+@router.get("/slug/{category_slug}", response_model=CategoryReturn)
+@cached_response(ttl=RESPONSE_CACHE_ITEM_TTL, tags=category_tags)
+async def get_category_by_slug(
+    category_slug: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db_session),
+):
+    try:
+        if CATEGORY_ETAG_ENABLED:
+            version = await category_version.get_async(db)
+            if (unchanged := not_modified(request, response, version)) is not None:
+                return unchanged
+        category = get_cached_category(category_slug)
+        if category is MISSING:
+            category = await load_category_async(db, category_slug)
+        if not category:
+            raise HTTPException(status_code=404, detail="Category does not exist")
+        return category
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/", response_model=CategoryReturn, status_code=201)
+async def create_category(
+    category_data: CategoryCreate,
+    response: Response,
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_async_db_session),
+):
+    try:
+        if upsert:
+            statement = upsert_category_statement(category_data)
+        else:
+            statement = insert_category_statement(category_data)
+        row = (await db.execute(statement)).first()
+        if row is None:  # ON CONFLICT DO NOTHING skipped the insert
+            await check_existing_category_async(db, category_data)
+            raise HTTPException(
+                status_code=409, detail="Category changed concurrently, retry"
+            )
+        new_category, inserted = row
+        if not inserted:
+            response.status_code = 200
+        # get_async_db_session commits once the endpoint returns
+        record_category_change(db, new_category.id, new_category.slug)
+        return new_category
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        raise_if_name_level_conflict(e)
+        logger.error(f"Unexpected error while creating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server errorrr")
+    except Exception as e:
+        logger.error(f"Unexpected error while creating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server errorrr")
+
+
+# Endpoint to delete a category
+@router.delete("/{category_id}", response_model=CategoryDeleteReturn)
+async def delete_category(
+    category_id: int, db: AsyncSession = Depends(get_async_db_session)
+):
+    try:
+        result = await db.execute(delete_category_statement(category_id))
+        category = result.first()
+        if not category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        record_category_change(db, category.id, category.slug)
+        return category
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to update an existing category
+@router.put("/{category_id}", response_model=CategoryReturn, status_code=201)
+async def update_category(
+    category_id: int,
+    category_data: CategoryUpdate,
+    db: AsyncSession = Depends(get_async_db_session),
+):
+    try:
+        result = await db.execute(update_category_statement(category_id, category_data))
+        category = result.scalars().first()
+        if not category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        record_category_change(db, category.id, category.slug)
+        return category
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        raise_if_parent_cycle(e)  # parent_id inside its own subtree
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to change some fields of a category
+@router.patch("/{category_id}", response_model=CategoryReturn)
+async def patch_category(
+    category_id: int,
+    category_data: CategoryPatch,
+    db: AsyncSession = Depends(get_async_db_session),
+):
+    try:
+        values = category_data.model_dump(exclude_unset=True)
+        category = None
+        if values:
+            result = await db.execute(patch_category_statement(category_id, values))
+            category = result.scalars().first()
+        if category is None:  # nothing sent, nothing changed or no such category
+            category = await db.get(Category, category_id)
+            if not category:
+                raise HTTPException(status_code=404, detail="Category not found")
+            return category
+        record_category_change(db, category.id, category.slug)
+        return category
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        raise_if_parent_cycle(e)  # parent_id inside its own subtree
+        logger.error(f"Unexpected error while updating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    except Exception as e:
+        logger.error(f"Unexpected error while updating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,137 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db_connetion import get_db_session
+from app.models import Category
+from app.schemas.category_schema import (
+    CategoryBulkMode,
+    CategoryBulkReturn,
+    CategoryBulkSelect,
+    CategoryBulkUpdate,
+    CategoryBulkWriteReturn,
+    CategoryCreate,
+)
+from app.utils.category_bulk import (
+    CATEGORY_BULK_CHUNK_SIZE,
+    CATEGORY_BULK_MAX_ITEMS,
+    PARENT_NOT_FOUND,
+    bulk_create_categories,
+    bulk_delete_categories,
+    bulk_update_categories,
+)
+
+# batch endpoints for seeding and sync jobs, one request for thousands of categories
+# instead of one per category. bulk create is one transaction, bulk update / delete
+# commit chunk by chunk and report the chunks that failed (app/utils/category_bulk).
+# plain def handlers in both DB_ASYNC_MODEs, the work is a handful of big statements
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def check_batch_size(items):
+    if len(items) > CATEGORY_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {CATEGORY_BULK_MAX_ITEMS} categories per request",
+        )
+
+
+def bulk_return(results):
+    succeeded = sum(result["status"] not in ("error", "skipped") for result in results)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+# Endpoint to create many categories at once.
+# atomic (default): 201 when every item was created, otherwise 400 and nothing is
+# created. best_effort: the valid items are created, 201 if that is all of them
+# and 200 when some failed; the results say which ones and why
+@router.post("/bulk", response_model=CategoryBulkReturn, status_code=201)
+def bulk_create_category(
+    items: List[CategoryCreate],
+    response: Response,
+    mode: CategoryBulkMode = CategoryBulkMode.atomic,
+    db: Session = Depends(get_db_session),
+):
+    check_batch_size(items)
+    try:
+        results, ok = bulk_create_categories(
+            db, items, atomic=mode == CategoryBulkMode.atomic
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error while creating categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not ok:
+        # raising makes get_db_session roll back whatever got inserted
+        raise HTTPException(status_code=400, detail=bulk_return(results))
+    body = bulk_return(results)
+    if body["failed"]:
+        response.status_code = 200
+    return body
+
+
+def check_selection(selector: CategoryBulkSelect):
+    # an empty selection would be the whole table, that has to be asked for
+    # explicitly with a filter
+    if not selector.model_fields_set:
+        raise HTTPException(
+            status_code=400, detail="Select categories by ids, level or parent_id"
+        )
+    check_batch_size(selector.ids or [])
+
+
+def write_return(result):
+    return {
+        "succeeded": len(result["ids"]),
+        "failed": len(result["errors"]),
+        **result,
+    }
+
+
+# Endpoint to set is_active / level / parent_id of many categories at once
+@router.post("/bulk/update", response_model=CategoryBulkWriteReturn)
+def bulk_update_category(
+    data: CategoryBulkUpdate,
+    chunk_size: int = Query(CATEGORY_BULK_CHUNK_SIZE, ge=1, le=CATEGORY_BULK_MAX_ITEMS),
+    db: Session = Depends(get_db_session),
+):
+    check_selection(data.where)
+    if not data.values.model_fields_set:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    parent_id = data.values.parent_id
+    if (
+        parent_id is not None
+        and db.scalar(select(Category.id).where(Category.id == parent_id)) is None
+    ):
+        raise HTTPException(status_code=400, detail=PARENT_NOT_FOUND)
+    try:
+        return write_return(
+            bulk_update_categories(db, data.where, data.values, chunk_size)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error while updating categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to delete many categories at once. categories that still have
+# subcategories or products (outside of the selection) are left alone and reported
+@router.post("/bulk/delete", response_model=CategoryBulkWriteReturn)
+def bulk_delete_category(
+    selector: CategoryBulkSelect,
+    chunk_size: int = Query(CATEGORY_BULK_CHUNK_SIZE, ge=1, le=CATEGORY_BULK_MAX_ITEMS),
+    db: Session = Depends(get_db_session),
+):
+    check_selection(selector)
+    try:
+        return write_return(bulk_delete_categories(db, selector, chunk_size))
+    except Exception as e:
+        logger.error(f"Unexpected error while deleting categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+import logging
+import os
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.db_connetion import SessionLocal
+from app.models import Category
+from app.schemas.category_schema import CategoryExportFormat
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# rows fetched from the server side cursor (and sent to the client) per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("CATEGORY_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = ("id", "name", "slug", "is_active", "level", "parent_id")
+
+
+def render_ndjson(rows, first_chunk):
+    return "".join(json.dumps(row._asdict()) + "\n" for row in rows)
+
+
+def render_csv(rows, first_chunk):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if first_chunk:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    CategoryExportFormat.ndjson: (render_ndjson, "application/x-ndjson"),
+    CategoryExportFormat.csv: (render_csv, "text/csv"),
+}
+
+
+def export_statement():
+    return (
+        select(*(getattr(Category, column) for column in EXPORT_COLUMNS))
+        .order_by(Category.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+async def open_export():
+    # the request scoped session (get_db_session) is closed as soon as the endpoint
+    # returns, before the body is streamed, so the export opens its own one.
+    # yield_per makes psycopg2 use a server side cursor: only one batch of rows is
+    # in memory at a time, whatever the size of the table
+    db = SessionLocal()
+    db.info["read_only"] = True
+    try:
+        result = await run_in_threadpool(db.execute, export_statement())
+    except Exception:
+        await run_in_threadpool(db.close)
+        raise
+    return db, result
+
+
+async def stream_categories(request: Request, db, result, render):
+    try:
+        partitions = result.partitions()
+        first_chunk = True
+        while not await request.is_disconnected():
+            rows = await run_in_threadpool(next, partitions, None)
+            if rows is None:
+                break
+            yield render(rows, first_chunk)
+            first_chunk = False
+        else:
+            logger.info("Client disconnected, category export stopped")
+    except Exception as e:
+        # the status line is already sent. raising makes the server abort the
+        # chunked body, a client sees a broken download instead of a short export
+        logger.error(f"Unexpected error while exporting categories: {e}")
+        raise
+    finally:
+        # also runs when starlette cancels the stream because the client went away;
+        # shielded so closing the cursor and returning the connection isnt cancelled
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(db.close)
+
+
+# Endpoint to stream every category as NDJSON (default) or CSV
+@router.get("/export")
+async def export_categories(
+    request: Request, format: CategoryExportFormat = CategoryExportFormat.ndjson
+):
+    render, media_type = RENDERERS[format]
+    try:
+        # before the response starts, a failing query is still a 500
+        db, result = await open_export()
+    except Exception as e:
+        logger.error(f"Unexpected error while exporting categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    return StreamingResponse(
+        stream_categories(request, db, result, render),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="categories.{format.value}"'
+        },
+    )
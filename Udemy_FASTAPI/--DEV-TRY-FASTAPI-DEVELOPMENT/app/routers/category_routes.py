@@ -1,30 +1,88 @@
 import logging
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.db_connetion import SessionLocal, get_db_session
-from app.models import Category
+from app.db_connetion import get_db_session, get_read_db_session
 from app.schemas.category_schema import (
     CategoryCreate,
     CategoryDeleteReturn,
+    CategoryPatch,
     CategoryReturn,
     CategoryUpdate,
 )
-from app.utils.category_utils import check_existing_category
+from app.utils.cache import MISSING
+from app.utils.category_cache import get_cached_category, load_category
+from app.utils.category_etag import (
+    CATEGORY_ETAG_ENABLED,
+    category_version,
+    not_modified,
+    read_version,
+    version_etag,
+)
+from app.utils.category_events import record_category_change
+from app.utils.category_reads import (
+    CATEGORY_BY_ID,
+    category_page_statement,
+    category_record,
+    category_records,
+)
+from app.utils.category_utils import (
+    CATEGORY_RETURN_FIELDS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    check_existing_category,
+    delete_category_statement,
+    insert_category_statement,
+    patch_category_statement,
+    raise_if_name_level_conflict,
+    raise_if_parent_cycle,
+    set_next_page,
+    update_category_statement,
+    upsert_category_statement,
+)
+from app.utils.fast_json import FAST_JSON, rows_response
+from app.utils.response_cache import (
+    RESPONSE_CACHE_ITEM_TTL,
+    CachedRoute,
+    cached_response,
+    category_tags,
+)
 
-router = APIRouter()
-db = SessionLocal()
+router = APIRouter(route_class=CachedRoute)
 logger = logging.getLogger(__name__)
 
 
-# Endpoint to retrieve all categories
+# Endpoint to retrieve all categories, one page at a time.
+# the next page is announced in the Link / X-Next-Cursor response headers
 @router.get("/", response_model=List[CategoryReturn])
-def get_categories(db: Session = Depends(get_db_session)):
+@cached_response()
+def get_categories(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db_session),
+):
     try:
-        categories = db.query(Category).all()
-        return categories
+        if CATEGORY_ETAG_ENABLED:  # answered before any query or serialization
+            # the cached version only answers the If-None-Match. the ETag of a page
+            # is the version of the session its rows come from, a replica may not
+            # have the latest write yet
+            if request.headers.get("if-none-match"):
+                version = category_version.get(db)
+                if (unchanged := not_modified(request, response, version)) is not None:
+                    return unchanged
+            response.headers["ETag"] = version_etag(read_version(db))
+        rows = db.execute(category_page_statement(cursor, limit)).all()
+        rows = set_next_page(request, response, rows, limit)
+        if FAST_JSON:  # written straight out, no response_model pass
+            return rows_response(rows, CATEGORY_RETURN_FIELDS, response)
+        return category_records(rows)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error while retrieving categories: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -32,11 +90,21 @@ def get_categories(db: Session = Depends(get_db_session)):
 
 # Endpoint to retrieve a category by its slug
 @router.get("/slug/{category_slug}", response_model=CategoryReturn)
-def get_category_by_slug(category_slug: str, db: Session = Depends(get_db_session)):
+@cached_response(ttl=RESPONSE_CACHE_ITEM_TTL, tags=category_tags)
+def get_category_by_slug(
+    category_slug: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db_session),
+):
     try:
-        category = (
-            db.query(Category).filter(Category.slug == category_slug).first()
-        )  # filter
+        if CATEGORY_ETAG_ENABLED:
+            version = category_version.get(db)
+            if (unchanged := not_modified(request, response, version)) is not None:
+                return unchanged
+        category = get_cached_category(category_slug)
+        if category is MISSING:
+            category = load_category(db, category_slug)
         if not category:
             raise HTTPException(status_code=404, detail="Category does not exist")
         return category
@@ -51,37 +119,48 @@ def get_category_by_slug(category_slug: str, db: Session = Depends(get_db_sessio
     "/", response_model=CategoryReturn, status_code=201
 )  # response_model the class we made
 def create_category(
-    category_data: CategoryCreate, db: Session = Depends(get_db_session)
+    category_data: CategoryCreate,
+    response: Response,
+    upsert: bool = False,
+    db: Session = Depends(get_db_session),
 ):
     try:
-        check_existing_category(db, category_data)  # IMPORTED
-        """ dikkat et bunu try in icine koymamamk onemli cunku biz buna 400 error vermesini soyledik
-            ama try'in icine koyarsak direkt except e gecip bize 500 error vercek
-            """
         # Depends here ensures each handler receives its own db session ???
         # like each request has its own isolated db session to avoid conflicts
-        new_category = Category(**category_data.model_dump())
+
         # model_dump is one method of pydantic basemodel, see: https://docs.pydantic.dev/latest/api/base_model/
-        # which we inherited when creating the CategoryCreate class
-        # The model_dump method you've provided is a custom method added to
-        # Pydantic's BaseModel or a subclass of it. This method is used for
-        # serializing the model instance into a dictionary representation.
-        db.add(new_category)
-        db.commit()  # bcz we hadn't chosen autocommit
-        db.refresh(new_category)  # this is used to refresh the object state from the
-        # corresponding db row. when receive an object from a db, sql alchemy keeps
-        # track of its state n attributes
-        # however oif changes are made to an underlying row in the db by another
-        # transactional process, the object states in memory become stale and out of
-        # sync with the db. refresh method will allow us to update to object state
-        # from the latest db, ensuring it reflects the current state of the row
+        # which we inherited when creating the CategoryCreate class, it gives the
+        # dictionary of values the INSERT is built from
+        if upsert:
+            statement = upsert_category_statement(category_data)
+        else:
+            statement = insert_category_statement(category_data)
+        row = db.execute(statement).first()
+        if row is None:  # ON CONFLICT DO NOTHING skipped the insert
+            check_existing_category(db, category_data)  # IMPORTED, raises the 400
+            """ dikkat et bunu try in icine koymamamk onemli cunku biz buna 400 error vermesini soyledik
+            ama try'in icine koyarsak direkt except e gecip bize 500 error vercek
+            """
+            # the conflicting row got deleted in the meantime
+            raise HTTPException(
+                status_code=409, detail="Category changed concurrently, retry"
+            )
+        new_category, inserted = row
+        if not inserted:
+            response.status_code = 200  # upsert updated the existing category
+        record_category_change(db, new_category.id, new_category.slug)
+        # commit is not called here anymore, get_db_session commits the whole request
+        # once the endpoint returns (and rolls back if it raises)
 
         return new_category
 
     except HTTPException:
         raise  # this data already exoist thing not necessarily an info we wanna log
+    except IntegrityError as e:
+        raise_if_name_level_conflict(e)
+        logger.error(f"Unexpected error while creating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server errorrr")
     except Exception as e:
-        db.rollback
         logger.error(f"Unexpected error while creating category: {e}")
         # dev.log da belirecek error i buraya yazdik
         raise HTTPException(status_code=500, detail="Internal server errorrr")
@@ -147,11 +226,11 @@ Yes, you can indeed pass another class inside a class. This is often used for cr
 @router.delete("/{category_id}", response_model=CategoryDeleteReturn)
 def delete_category(category_id: int, db: Session = Depends(get_db_session)):
     try:
-        category = db.query(Category).filter(Category.id == category_id).first()
+        # DELETE ... RETURNING, an empty result means there was no such category
+        category = db.execute(delete_category_statement(category_id)).first()
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
-        db.delete(category)
-        db.commit()
+        record_category_change(db, category.id, category.slug)
         return category
     except HTTPException:
         raise
@@ -168,16 +247,54 @@ def update_category(
     db: Session = Depends(get_db_session),
 ):
     try:
-        category = db.query(Category).filter(Category.id == category_id).first()
+        # UPDATE ... RETURNING, one round trip instead of SELECT + UPDATE
+        statement = update_category_statement(category_id, category_data)
+        category = db.execute(statement).scalars().first()
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
-        for key, value in category_data.model_dump().items():
-            setattr(category, key, value)
-        db.commit()
-        db.refresh(category)
+        # the old slug goes through the id, the new one may have a cached 404
+        record_category_change(db, category.id, category.slug)
         return category
     except HTTPException:
         raise
+    except IntegrityError as e:
+        raise_if_parent_cycle(e)  # parent_id inside its own subtree
+        logger.error(f"Unexpected error while retrieving categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
     except Exception as e:
         logger.error(f"Unexpected error while retrieving categories: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to change some fields of a category, unlike PUT only the fields in the
+# body are written and an unchanged category is not written at all
+@router.patch("/{category_id}", response_model=CategoryReturn)
+def patch_category(
+    category_id: int,
+    category_data: CategoryPatch,
+    db: Session = Depends(get_db_session),
+):
+    try:
+        values = category_data.model_dump(exclude_unset=True)
+        category = None
+        if values:
+            statement = patch_category_statement(category_id, values)
+            category = db.execute(statement).scalars().first()
+        if category is None:  # nothing sent, nothing changed or no such category
+            category = category_record(
+                CATEGORY_BY_ID.execute(db, category_id=category_id).first()
+            )
+            if not category:
+                raise HTTPException(status_code=404, detail="Category not found")
+            return category
+        record_category_change(db, category.id, category.slug)
+        return category
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        raise_if_parent_cycle(e)  # parent_id inside its own subtree
+        logger.error(f"Unexpected error while updating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    except Exception as e:
+        logger.error(f"Unexpected error while updating category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,41 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db_connetion import get_read_db_session
+from app.schemas.category_schema import CategoryReturn
+from app.utils.category_search import (
+    CATEGORY_SEARCH_DEFAULT_LIMIT,
+    CATEGORY_SEARCH_MAX_LIMIT,
+    search_categories,
+)
+from app.utils.response_cache import CachedRoute, cached_response
+
+# search over category names and slugs, one gin index lookup instead of clients
+# paging through GET /api/category/ and filtering themselves.
+# plain def handler in both DB_ASYNC_MODEs like the tree endpoints
+
+router = APIRouter(route_class=CachedRoute)
+logger = logging.getLogger(__name__)
+
+
+# Endpoint to search categories by name and slug. every word of q has to match a
+# word of the name or the slug, prefix=true (default) also matches words that only
+# start with it
+@router.get("/search", response_model=List[CategoryReturn])
+@cached_response()
+def search_category(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(
+        CATEGORY_SEARCH_DEFAULT_LIMIT, ge=1, le=CATEGORY_SEARCH_MAX_LIMIT
+    ),
+    prefix: bool = True,
+    db: Session = Depends(get_read_db_session),
+):
+    try:
+        return search_categories(db, q, limit, prefix)
+    except Exception as e:
+        logger.error(f"Unexpected error while searching categories: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
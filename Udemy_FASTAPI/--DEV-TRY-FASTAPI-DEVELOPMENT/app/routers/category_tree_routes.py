@@ -0,0 +1,148 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db_connetion import get_db_session, get_read_db_session
+from app.schemas.category_schema import (
+    CategoryBreadcrumbsRequest,
+    CategoryBreadcrumbsReturn,
+    CategoryCrumb,
+    CategoryMove,
+    CategoryMoveReturn,
+    CategoryTreeNode,
+)
+from app.utils.category_breadcrumbs import (
+    CATEGORY_BREADCRUMB_BATCH_MAX,
+    category_breadcrumbs,
+)
+from app.utils.category_tree import (
+    CATEGORY_TREE_MAX_DEPTH,
+    category_ancestors,
+    category_subtree,
+    category_tree,
+    move_category,
+)
+from app.utils.response_cache import CachedRoute, cached_response
+
+# the category hierarchy (parent_id) as nested json, each endpoint is one query
+# on the materialized path however deep the tree is.
+# plain def handlers in both DB_ASYNC_MODEs like the bulk endpoints
+
+router = APIRouter(route_class=CachedRoute)
+logger = logging.getLogger(__name__)
+
+MaxDepth = Query(CATEGORY_TREE_MAX_DEPTH, ge=0, le=CATEGORY_TREE_MAX_DEPTH)
+
+
+# Endpoint to retrieve every top level category with its subcategories
+@router.get("/tree", response_model=List[CategoryTreeNode])
+@cached_response()
+def get_category_tree(
+    max_depth: int = MaxDepth, db: Session = Depends(get_read_db_session)
+):
+    try:
+        return category_tree(db, max_depth)
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving the category tree: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to retrieve a category with its subcategories
+@router.get("/{category_id}/subtree", response_model=CategoryTreeNode)
+@cached_response()
+def get_category_subtree(
+    category_id: int,
+    max_depth: int = MaxDepth,
+    db: Session = Depends(get_read_db_session),
+):
+    try:
+        subtree = category_subtree(db, category_id, max_depth)
+        if subtree is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return subtree
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving the category tree: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to retrieve the parents of a category, nested from the top level
+# category down to the category itself
+@router.get("/{category_id}/ancestors", response_model=CategoryTreeNode)
+@cached_response()
+def get_category_ancestors(
+    category_id: int,
+    max_depth: int = MaxDepth,
+    db: Session = Depends(get_read_db_session),
+):
+    try:
+        ancestors = category_ancestors(db, category_id, max_depth)
+        if ancestors is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return ancestors
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving the category tree: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to retrieve the breadcrumbs of many categories at once (a listing page
+# with products from hundreds of categories), answered from the same in-memory index
+@router.post("/breadcrumbs", response_model=CategoryBreadcrumbsReturn)
+def get_category_breadcrumbs_batch(data: CategoryBreadcrumbsRequest):
+    if len(data.ids) > CATEGORY_BREADCRUMB_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {CATEGORY_BREADCRUMB_BATCH_MAX} ids per request",
+        )
+    try:
+        breadcrumbs = category_breadcrumbs.get_many(data.ids)
+        return {
+            "breadcrumbs": breadcrumbs,
+            "not_found": [
+                category_id
+                for category_id in data.ids
+                if category_id not in breadcrumbs
+            ],
+        }
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving category breadcrumbs: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to retrieve the breadcrumb of a category: the top level category first,
+# the category itself last. a lookup in the in-memory index of this worker
+# (app/utils/category_breadcrumbs.py), the database is only asked after a write
+@router.get("/{category_id}/breadcrumbs", response_model=List[CategoryCrumb])
+def get_category_breadcrumbs(category_id: int):
+    try:
+        breadcrumb = category_breadcrumbs.get(category_id)
+        if breadcrumb is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return breadcrumb
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while retrieving category breadcrumbs: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Endpoint to move a category, with all of its subcategories, below another
+# parent (or to the top level with parent_id null). one transaction, moved says
+# how many categories got a new path
+@router.post("/{category_id}/move", response_model=CategoryMoveReturn)
+def move_category_subtree(
+    category_id: int, data: CategoryMove, db: Session = Depends(get_db_session)
+):
+    try:
+        category, moved = move_category(db, category_id, data.parent_id)
+        return {"category": category, "moved": moved}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while moving category: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,32 @@
+from typing import List
+
+from fastapi import APIRouter
+
+from app.schemas.metrics_schema import (
+    CacheStatsReturn,
+    PoolStatsReturn,
+    SingleFlightStatsReturn,
+)
+from app.utils.cache import cache_snapshots
+from app.utils.pool_stats import pool_snapshots
+from app.utils.singleflight import flight_snapshots
+
+router = APIRouter()
+
+
+# Endpoint to inspect the connection pool(s) of this worker
+@router.get("/pool", response_model=List[PoolStatsReturn])
+def get_pool_stats():
+    return pool_snapshots()
+
+
+# Endpoint to inspect the in-process caches of this worker
+@router.get("/cache", response_model=List[CacheStatsReturn])
+def get_cache_stats():
+    return cache_snapshots()
+
+
+# Endpoint to inspect the coalesced reads of this worker, one entry per key
+@router.get("/singleflight", response_model=List[SingleFlightStatsReturn])
+def get_singleflight_stats():
+    return flight_snapshots()
@@ -0,0 +1,22 @@
+from enum import Enum
+from typing import List
+
+from pydantic import BaseModel
+
+
+class AutocompleteKind(str, Enum):
+    all = "all"
+    category = "category"
+    product = "product"
+
+
+class AutocompleteItem(BaseModel):
+    id: int
+    name: str
+    slug: str
+
+
+class AutocompleteReturn(BaseModel):
+    # best first, categories higher up the hierarchy and active products first
+    categories: List[AutocompleteItem] = []
+    products: List[AutocompleteItem] = []
@@ -1,4 +1,5 @@
-from typing import Annotated, Optional
+from enum import Enum
+from typing import Annotated, Dict, List, Optional
 
 from pydantic import BaseModel, StringConstraints
 
@@ -35,6 +36,104 @@ class CategoryUpdate(CategoryBase):
     pass
 
 
+class CategoryPatch(BaseModel):
+    # PATCH body: only the fields the client sends are written (exclude_unset).
+    # the defaults are not validated, so leaving a field out is fine but sending
+    # null for a not nullable column is still a 422
+    name: Annotated[str, StringConstraints(min_length=1)] = None
+    slug: Annotated[str, StringConstraints(min_length=1)] = None
+    is_active: bool = None
+    level: int = None
+    parent_id: Optional[int] = None
+
+
 class CategoryDeleteReturn(BaseModel):
     id: int
     name: Annotated[str, StringConstraints(min_length=1)]
+
+
+class CategoryExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class CategoryBulkMode(str, Enum):
+    atomic = "atomic"  # one bad item and nothing is created
+    best_effort = "best_effort"  # the good items are created, the bad ones reported
+
+
+class CategoryBulkItemResult(BaseModel):
+    index: int  # position of the item in the request body
+    status: str  # "created" or "error"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class CategoryBulkReturn(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[CategoryBulkItemResult]
+
+
+class CategoryBulkSelect(BaseModel):
+    # which categories a bulk update/delete touches, the fields that are sent are
+    # ANDed together. parent_id: null selects the top level categories
+    ids: List[int] = None
+    level: int = None
+    parent_id: Optional[int] = None
+
+
+class CategoryBulkSet(BaseModel):
+    # the columns a bulk update may set, name and slug are unique per category
+    is_active: bool = None
+    level: int = None
+    parent_id: Optional[int] = None
+
+
+class CategoryBulkUpdate(BaseModel):
+    where: CategoryBulkSelect
+    values: CategoryBulkSet
+
+
+class CategoryBulkError(BaseModel):
+    id: int
+    detail: str
+
+
+class CategoryBulkWriteReturn(BaseModel):
+    succeeded: int  # categories updated / deleted
+    unchanged: int  # selected but already had the values (bulk update)
+    failed: int
+    ids: List[int]  # the updated / deleted ones
+    errors: List[CategoryBulkError]
+    chunks: int  # transactions it took
+
+
+class CategoryTreeNode(CategoryReturn):
+    # a category with its subcategories, down to the max_depth of the request
+    children: List["CategoryTreeNode"] = []
+
+
+class CategoryMove(BaseModel):
+    parent_id: Optional[int] = None  # null moves the category to the top level
+
+
+class CategoryMoveReturn(BaseModel):
+    category: CategoryReturn
+    moved: int  # categories in the moved subtree (0: parent_id did not change)
+
+
+class CategoryCrumb(BaseModel):
+    id: int
+    name: str
+    slug: str
+
+
+class CategoryBreadcrumbsRequest(BaseModel):
+    ids: List[int]
+
+
+class CategoryBreadcrumbsReturn(BaseModel):
+    # id -> breadcrumb from the top level category down to the category itself
+    breadcrumbs: Dict[int, List[CategoryCrumb]]
+    not_found: List[int]
@@ -0,0 +1,41 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class PoolStatsReturn(BaseModel):
+    name: str
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeouts: int
+    wait_count: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    # bucket upper bound in ms -> number of checkouts (not cumulative)
+    wait_histogram_ms: Dict[str, int]
+
+
+class CacheStatsReturn(BaseModel):
+    name: str
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+class SingleFlightStatsReturn(BaseModel):
+    name: str
+    key: str
+    in_flight: bool
+    leaders: int
+    followers: int
+    timeouts: int
+    errors: int
+    wait_avg_ms: float
+    wait_max_ms: float
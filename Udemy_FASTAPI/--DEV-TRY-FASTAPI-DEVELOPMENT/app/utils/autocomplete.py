@@ -0,0 +1,351 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import Integer, String, any_, bindparam, case, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db_connetion import SessionLocal
+from app.models import Category, Product
+from app.utils.cache import register_cache
+from app.utils.category_events import register_invalidator
+
+logger = logging.getLogger(__name__)
+
+# type-ahead over category and product names answered from memory, no query per
+# keystroke. every worker builds the indexes when it starts (AUTOCOMPLETE_PRELOAD,
+# otherwise on the first request); category writes are applied as they commit
+# (category_events), everything is rebuilt in the background every
+# AUTOCOMPLETE_MAX_AGE seconds, which is also how new products show up (the api
+# doesnt write products)
+AUTOCOMPLETE_PRELOAD = os.getenv("AUTOCOMPLETE_PRELOAD", "true").lower() == "true"
+AUTOCOMPLETE_MAX_AGE = float(os.getenv("AUTOCOMPLETE_MAX_AGE", "600"))
+# changed categories kept next to the index before it is rebuilt with them
+AUTOCOMPLETE_MAX_CHANGES = int(os.getenv("AUTOCOMPLETE_MAX_CHANGES", "1000"))
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv("AUTOCOMPLETE_MAX_LIMIT", "50"))
+
+# sorts after every character, prefix + LAST_CHAR closes the range of the prefix
+LAST_CHAR = chr(0x10FFFF)
+
+
+def rank_key(entry):
+    # entries are (id, name, slug, weight): lower weight first, then the shorter name
+    row_id, name, _, weight = entry
+    return weight, len(name), name.casefold(), row_id
+
+
+class PrefixIndex:
+    """
+    Immutable snapshot of (id, name, slug, weight) entries, sorted by casefolded
+    name, so the names starting with a prefix are one range found by bisect.
+    The best entries of a range come from a segment tree over the rank of every
+    position (weight, then the shorter name): top(k) costs O(k log n) however
+    many names share the prefix.
+
+    Flat arrays and lists instead of a trie of dicts, for 1M names the nodes of
+    a trie alone would take gigabytes.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: row[1].casefold())
+        size = len(rows)
+        self.size = size
+        self.ids = array("q", (row[0] for row in rows))
+        self.names = [row[1] for row in rows]
+        self.slugs = [row[2] for row in rows]
+        self.weights = array("i", (row[3] for row in rows))
+        # position of the best, second best... entry: by weight, then length,
+        # then name (the position). two stable sorts on plain ints, a sort on
+        # (weight, length, position) tuples takes three times as long
+        lengths = array("i", map(len, self.names))
+        by_rank = sorted(range(size), key=lengths.__getitem__)
+        by_rank.sort(key=self.weights.__getitem__)
+        self.by_rank = array("i", by_rank)
+        # tree[size + position] is the rank of the position, every inner node the
+        # best rank of its two children. built a block of nodes at a time, the
+        # children of [lo, hi) are [2 * lo, 2 * hi)
+        tree = array("i", bytes(4 * size))
+        tree.extend(sorted(range(size), key=self.by_rank.__getitem__))
+        hi = size
+        while hi > 1:
+            lo = max(1, 1 << (hi - 1).bit_length() - 1)
+            tree[lo:hi] = array(
+                "i", map(min, tree[2 * lo : 2 * hi : 2], tree[2 * lo + 1 : 2 * hi : 2])
+            )
+            hi = lo
+        self.tree = tree
+
+    def entry(self, position):
+        return (
+            self.ids[position],
+            self.names[position],
+            self.slugs[position],
+            self.weights[position],
+        )
+
+    def best_rank(self, lo, hi):
+        # the best rank in positions [lo, hi)
+        tree, best = self.tree, self.size
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                best = min(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = min(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def top(self, prefix, k, skip=()):
+        """
+        the positions of the k best entries whose casefolded name starts with
+        prefix, best first. ids in skip are passed over
+        """
+        lo = bisect_left(self.names, prefix, key=str.casefold)
+        hi = bisect_left(self.names, prefix + LAST_CHAR, lo, key=str.casefold)
+        pending = [(self.best_rank(lo, hi), lo, hi)] if lo < hi else []
+        found = []
+        while pending and len(found) < k:
+            rank, lo, hi = heapq.heappop(pending)
+            position = self.by_rank[rank]
+            if self.ids[position] not in skip:
+                found.append(position)
+            # the rest of the range, minus the position just taken
+            if lo < position:
+                heapq.heappush(pending, (self.best_rank(lo, position), lo, position))
+            if position + 1 < hi:
+                heapq.heappush(
+                    pending, (self.best_rank(position + 1, hi), position + 1, hi)
+                )
+        return found
+
+
+class Autocomplete:
+    """
+    A PrefixIndex of the rows of columns (id, name, slug, weight) plus the rows
+    that changed since it was built. on_change / on_reset are the category_events
+    invalidators: the changed rows are read again (one query by id or slug) on
+    the next lookup, a reset rebuilds the whole index in the background while the
+    old one keeps answering
+    """
+
+    def __init__(
+        self,
+        columns,
+        session_factory=SessionLocal,
+        max_age=AUTOCOMPLETE_MAX_AGE,
+        max_changes=AUTOCOMPLETE_MAX_CHANGES,
+    ):
+        self.columns = columns
+        self.session_factory = session_factory
+        self.max_age = max_age
+        self.max_changes = max_changes
+        self._index = None
+        # id -> (sequence, row or None when it was deleted). replaced, never
+        # changed in place, lookups read it without the lock
+        self._changed = {}
+        self._sequence = 0  # bumped by every refresh of changed rows
+        self._stale_ids = set()
+        self._stale_slugs = set()  # bulk writes only know the slug
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.build_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.invalidations = 0
+
+    def on_change(self, category_id=None, slug=None):
+        with self._lock:
+            if category_id is not None:
+                self._stale_ids.add(category_id)
+            elif slug is not None:
+                self._stale_slugs.add(slug)
+
+    def on_reset(self):
+        with self._lock:
+            self._built_at = 0.0  # rebuilt in the background on the next lookup
+
+    def clear(self):
+        with self._lock:
+            self._index, self._changed = None, {}
+            self._stale_ids, self._stale_slugs = set(), set()
+
+    def build(self):
+        # loads every row and swaps the new index in. the rows that change while
+        # the query runs stay in _changed on top of it
+        with self._lock:
+            sequence = self._sequence
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            rows = db.execute(select(*self.columns)).all()
+        index = PrefixIndex(rows)
+        with self._lock:
+            self._index = index
+            self._changed = {
+                row_id: change
+                for row_id, change in self._changed.items()
+                if change[0] > sequence
+            }
+            self._built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+            self.rebuilds += 1
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.error(f"Rebuilding the autocomplete index failed: {e}")
+            with self._lock:
+                self._built_at = time.monotonic()  # try again after max_age
+        finally:
+            self._rebuilding = False
+
+    def _rebuild_if_due(self):
+        with self._lock:
+            if self._rebuilding or (
+                time.monotonic() - self._built_at < self.max_age
+                and len(self._changed) <= self.max_changes
+            ):
+                return
+            self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild_in_background, name="autocomplete", daemon=True
+        ).start()
+
+    def _refresh_changed(self):
+        with self._refresh_lock:
+            with self._lock:
+                ids, self._stale_ids = self._stale_ids, set()
+                slugs, self._stale_slugs = self._stale_slugs, set()
+                self._sequence += 1
+                sequence = self._sequence
+            if not ids and not slugs:
+                return  # done by the refresh we waited for
+            id_column, _, slug_column, _ = self.columns
+            with self.session_factory() as db:
+                rows = db.execute(
+                    select(*self.columns).where(
+                        or_(
+                            id_column
+                            == any_(bindparam("ids", list(ids), type_=ARRAY(Integer))),
+                            slug_column
+                            == any_(
+                                bindparam("slugs", list(slugs), type_=ARRAY(String))
+                            ),
+                        )
+                    )
+                ).all()
+            with self._lock:
+                changed = dict(self._changed)
+                for row in rows:
+                    changed[row[0]] = (sequence, tuple(row))
+                    ids.discard(row[0])
+                    slugs.discard(row[2])
+                # what is left was deleted, by slug it has to be looked up
+                if slugs:
+                    ids.update(
+                        row_id
+                        for row_id, (_, row) in changed.items()
+                        if row is not None and row[2] in slugs
+                    )
+                    index = self._index
+                    ids.update(
+                        index.ids[position]
+                        for position, slug in enumerate(index.slugs)
+                        if slug in slugs
+                    )
+                for row_id in ids:
+                    changed[row_id] = (sequence, None)
+                self._changed = changed
+                self.invalidations += len(rows) + len(ids)
+
+    def complete(self, q, limit):
+        """
+        the limit best (id, name, slug, weight) entries whose name starts with q,
+        ignoring case
+        """
+        if self._index is None:
+            with self._refresh_lock:
+                if self._index is None:
+                    self.build()
+            queried = True
+        elif self._stale_ids or self._stale_slugs:
+            self._refresh_changed()
+            queried = True
+        else:
+            queried = False
+        self._rebuild_if_due()
+
+        prefix = q.lstrip().casefold()
+        index, changed = self._index, self._changed
+        found = [
+            index.entry(position) for position in index.top(prefix, limit, skip=changed)
+        ]
+        found.extend(
+            row
+            for _, row in changed.values()
+            if row is not None and row[1].casefold().startswith(prefix)
+        )
+        with self._lock:
+            if queried:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return heapq.nsmallest(limit, found, key=rank_key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._index.size if self._index is not None else 0,
+                "maxsize": 0,  # every row, not bounded
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": 0,
+                "expirations": self.rebuilds,
+                "invalidations": self.invalidations,
+            }
+
+
+category = Category.__table__.c
+product = Product.__table__.c
+
+# categories higher up the hierarchy (lower level) first
+category_autocomplete = register_cache(
+    "category_autocomplete",
+    Autocomplete((category.id, category.name, category.slug, category.level)),
+)
+register_invalidator(category_autocomplete.on_change, category_autocomplete.on_reset)
+
+# there is no popularity to rank products by yet, active products come first
+product_autocomplete = register_cache(
+    "product_autocomplete",
+    Autocomplete(
+        (
+            product.id,
+            product.name,
+            product.slug,
+            case((product.is_active, 0), else_=1),
+        )
+    ),
+)
+
+
+def preload_autocomplete():
+    for autocomplete in (category_autocomplete, product_autocomplete):
+        try:
+            autocomplete.build()
+        except Exception as e:
+            # the first request tries again
+            logger.error(f"Building the autocomplete index failed: {e}")
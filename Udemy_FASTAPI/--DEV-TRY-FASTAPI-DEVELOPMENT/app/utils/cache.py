@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+# returned by TTLCache.get when there is no usable entry, None is a valid cached
+# value (negative caching of "this does not exist")
+MISSING = object()
+
+# name -> TTLCache for every cache we want to expose
+_registry = {}
+
+
+class TTLCache:
+    """
+    Size bounded LRU cache whose entries expire after ttl seconds.
+
+    set(key, None) caches the absence of something (a 404) for negative_ttl seconds.
+    Safe to share between the threadpool threads of one worker, it is not shared
+    between workers.
+
+    generation moves with every pop / pop_where / clear. A value read from the
+    database before an invalidation is older than it: set(..., generation=...) with
+    the generation from before the read drops it instead of storing it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, negative_ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # invalidated while the value was read
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            self.generation += 1
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def pop_where(self, predicate):
+        # drops every entry whose value matches, used when only part of the value
+        # (an id for example) is known at invalidation time
+        with self._lock:
+            self.generation += 1
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def register_cache(name, cache):
+    _registry[name] = cache
+    return cache
+
+
+def cache_snapshots():
+    return [{"name": name, **cache.stats()} for name, cache in _registry.items()]
+
+
+def clear_caches():
+    for cache in _registry.values():
+        cache.clear()
@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+
+from sqlalchemy import any_, select
+
+from app.db_connetion import SessionLocal
+from app.models import Category
+from app.utils.cache import register_cache
+from app.utils.category_bulk import id_array
+from app.utils.category_events import register_invalidator
+
+# product pages need the chain of parents of their category. instead of walking
+# parent_id on every request each worker keeps every category's breadcrumb in
+# memory: one query loads all categories, after that a breadcrumb is a dict lookup.
+# a committed category write only reloads the rows that changed
+# (category_events), the breadcrumbs below them are rebuilt from memory.
+# the refreshes read the primary, a replica could still have the row from before
+# the write and nothing would correct it
+#
+# seconds after which the index is loaded again from scratch, for writes that
+# were never announced (CATEGORY_NOTIFY_ENABLED=false). the other requests keep
+# answering from the old one meanwhile
+CATEGORY_BREADCRUMB_MAX_AGE = float(os.getenv("CATEGORY_BREADCRUMB_MAX_AGE", "600"))
+# most ids one batch request may ask for
+CATEGORY_BREADCRUMB_BATCH_MAX = int(os.getenv("CATEGORY_BREADCRUMB_BATCH_MAX", "1000"))
+
+# the table columns, not the ORM attributes: a core select comes back as plain
+# rows without going through the ORM loading, the full load reads every category
+CRUMB_COLUMNS = tuple(
+    Category.__table__.c[column] for column in ("id", "name", "slug", "parent_id")
+)
+
+
+class CategoryBreadcrumbs:
+    """
+    id -> breadcrumb of every category, the top level category first and the
+    category itself last, each crumb a {"id", "name", "slug"} dict. a breadcrumb
+    is its parent's breadcrumb plus one crumb, the tuples share the crumb dicts.
+
+    on_change / on_reset are the category_events invalidators, they only mark
+    what is stale. the next get / get_many reloads it in a session of its own
+    (session_factory) before it answers, so a request never sees a breadcrumb
+    from before a write that was already announced
+    """
+
+    def __init__(
+        self, session_factory=SessionLocal, max_age=CATEGORY_BREADCRUMB_MAX_AGE
+    ):
+        self.session_factory = session_factory
+        self.max_age = max_age
+        self._nodes = {}  # id -> (crumb, parent_id)
+        self._children = {}  # id -> set of child ids
+        self._ids_by_slug = {}
+        # id -> breadcrumb tuple. all built on load, after a change the ones below
+        # the changed category are built again on their next lookup
+        self._crumbs = {}
+        self._reset = True  # nothing loaded yet
+        self._stale = set()  # ids whose row changed since the last refresh
+        self._expires_at = 0.0
+        self._lock = threading.Lock()  # guards the dicts above
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def on_change(self, category_id=None, slug=None):
+        with self._lock:
+            if self._reset:
+                return  # everything is reloaded anyway
+            if category_id is None:
+                # bulk writes only know the slug, it doesnt change there
+                category_id = self._ids_by_slug.get(slug)
+                if category_id is None:
+                    self._reset = True
+                    return
+            self._stale.add(category_id)
+
+    def on_reset(self):
+        with self._lock:
+            self._reset = True
+
+    def clear(self):
+        self.on_reset()
+
+    def get(self, category_id):
+        # the breadcrumb of the category, None when there is no such category
+        return self.get_many([category_id]).get(category_id)
+
+    def get_many(self, category_ids):
+        # id -> breadcrumb, the ids that are not categories are left out
+        if self._reset or self._stale:
+            refreshed = self._refresh()
+        elif time.monotonic() >= self._expires_at:
+            # nothing is known to be wrong, whoever gets the lock reloads
+            refreshed = self._refresh(blocking=False)
+        else:
+            refreshed = False
+        with self._lock:
+            if refreshed:
+                self.misses += len(category_ids)
+            else:
+                self.hits += len(category_ids)
+            return {
+                category_id: self._breadcrumb(category_id)
+                for category_id in category_ids
+                if category_id in self._nodes
+            }
+
+    def _refresh(self, blocking=True):
+        # True when it queried the database
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return False
+        try:
+            # writes that come in while the query runs are picked up next time
+            with self._lock:
+                expired = time.monotonic() >= self._expires_at
+                if expired and not self._reset:
+                    self.expirations += 1
+                reload_all = self._reset or expired
+                stale, self._stale = self._stale, set()
+            if not reload_all and not stale:
+                return False  # done by the refresh we waited for
+            with self.session_factory() as db:
+                if not reload_all:
+                    rows = db.execute(
+                        select(*CRUMB_COLUMNS).where(
+                            Category.__table__.c.id == any_(id_array(stale))
+                        )
+                    ).all()
+                    with self._lock:
+                        # a parent we never heard of means something was missed
+                        reload_all = not self._apply(stale, rows)
+                if reload_all:
+                    with self._lock:
+                        self._reset = False
+                        self._stale.clear()  # part of what the query reads
+                    rows = db.execute(select(*CRUMB_COLUMNS)).all()
+                    with self._lock:
+                        self._load(rows)
+                        self._expires_at = time.monotonic() + self.max_age
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self, rows):
+        self.invalidations += len(self._nodes)
+        nodes, children, ids_by_slug = {}, {}, {}
+        for category_id, name, slug, parent_id in rows:
+            nodes[category_id] = (
+                {"id": category_id, "name": name, "slug": slug},
+                parent_id,
+            )
+            ids_by_slug[slug] = category_id
+            children.setdefault(parent_id, set()).add(category_id)
+        # top down, every breadcrumb is its parent's plus one crumb
+        crumbs, pending = {None: ()}, [None]
+        while pending:
+            parent_id = pending.pop()
+            for category_id in children.get(parent_id, ()):
+                crumbs[category_id] = crumbs[parent_id] + (nodes[category_id][0],)
+                pending.append(category_id)
+        del crumbs[None]
+        self._nodes, self._children, self._ids_by_slug = nodes, children, ids_by_slug
+        self._crumbs = crumbs
+
+    def _add(self, row):
+        category_id, name, slug, parent_id = row
+        crumb = {"id": category_id, "name": name, "slug": slug}
+        self._nodes[category_id] = (crumb, parent_id)
+        self._ids_by_slug[slug] = category_id
+        self._children.setdefault(parent_id, set()).add(category_id)
+
+    def _remove(self, category_id):
+        crumb, parent_id = self._nodes.pop(category_id)
+        if self._ids_by_slug.get(crumb["slug"]) == category_id:
+            del self._ids_by_slug[crumb["slug"]]
+        self._children[parent_id].discard(category_id)
+
+    def _apply(self, stale, rows):
+        """
+        the rows of the changed categories, a stale id without a row was deleted.
+        False when a row points at a parent that is not in the index
+        """
+        for category_id in stale:
+            if category_id in self._nodes:
+                self._drop_subtree(category_id)
+                self._remove(category_id)
+        for row in rows:
+            self._add(row)
+        return all(
+            row.parent_id is None or row.parent_id in self._nodes for row in rows
+        )
+
+    def _drop_subtree(self, category_id):
+        # a new name, slug or parent changes the breadcrumbs of the whole subtree
+        pending = [category_id]
+        while pending:
+            category_id = pending.pop()
+            if self._crumbs.pop(category_id, None) is not None:
+                self.invalidations += 1
+            pending.extend(self._children.get(category_id, ()))
+
+    def _breadcrumb(self, category_id):
+        breadcrumb = self._crumbs.get(category_id)
+        if breadcrumb is not None:
+            return breadcrumb
+        # climb to the first category that has its breadcrumb, then build down
+        chain = []
+        while category_id is not None and category_id not in self._crumbs:
+            chain.append(category_id)
+            category_id = self._nodes[category_id][1]
+        breadcrumb = self._crumbs[category_id] if category_id is not None else ()
+        for category_id in reversed(chain):
+            breadcrumb = breadcrumb + (self._nodes[category_id][0],)
+            self._crumbs[category_id] = breadcrumb
+        return breadcrumb
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._nodes),
+                "maxsize": 0,  # every category, not bounded
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": 0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+category_breadcrumbs = register_cache("category_breadcrumbs", CategoryBreadcrumbs())
+register_invalidator(category_breadcrumbs.on_change, category_breadcrumbs.on_reset)
@@ -0,0 +1,347 @@
+import logging
+import os
+
+from sqlalchemy import (
+    Integer,
+    String,
+    any_,
+    bindparam,
+    delete,
+    exists,
+    func,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from app.models import Category, Product
+from app.utils.category_events import record_category_change
+from app.utils.category_utils import PARENT_CYCLE
+
+logger = logging.getLogger(__name__)
+
+# most items a single bulk request accepts
+CATEGORY_BULK_MAX_ITEMS = int(os.getenv("CATEGORY_BULK_MAX_ITEMS", "5000"))
+# rows per INSERT / UPDATE / DELETE statement of a bulk request
+CATEGORY_BULK_CHUNK_SIZE = int(os.getenv("CATEGORY_BULK_CHUNK_SIZE", "1000"))
+
+SLUG_EXISTS = "Category slug already exists"
+NAME_LEVEL_EXISTS = "Category name and level already exists"
+PARENT_NOT_FOUND = "Parent category not found"
+CHANGED_CONCURRENTLY = "Category changed concurrently, retry"
+NOT_WRITTEN = "Not written, another item of the batch failed"
+CATEGORY_NOT_FOUND = "Category not found"
+CATEGORY_IN_USE = "Category has subcategories or products"
+CHUNK_FAILED = "Not written, a category of the same chunk failed"
+
+category_table = Category.__table__
+
+
+def created(index, category_id):
+    return {"index": index, "status": "created", "id": category_id}
+
+
+def failed(index, detail):
+    return {"index": index, "status": "error", "detail": detail}
+
+
+def skipped(index):
+    return {"index": index, "status": "skipped", "detail": NOT_WRITTEN}
+
+
+def find_conflicts(db, items):
+    """
+    index -> error message for every item that cannot be inserted: its slug or its
+    name + level is taken by an existing category or by an earlier item of the same
+    batch, or its parent_id does not exist. one query for the unique columns and one
+    for the parents, however many items there are. the values go in as arrays, an
+    IN list of thousands of bind parameters is slow to build and to plan.
+    """
+    pairs = (
+        func.unnest(
+            bindparam("names", [item.name for item in items], type_=ARRAY(String)),
+            bindparam("levels", [item.level for item in items], type_=ARRAY(Integer)),
+        )
+        .table_valued("name", "level")
+        .render_derived()
+    )
+    slugs = bindparam("slugs", [item.slug for item in items], type_=ARRAY(String))
+    existing = db.execute(
+        select(Category.slug, Category.name, Category.level).where(
+            or_(
+                Category.slug == any_(slugs),
+                tuple_(Category.name, Category.level).in_(
+                    select(pairs.c.name, pairs.c.level)
+                ),
+            )
+        )
+    ).all()
+    taken_slugs = {row.slug for row in existing}
+    taken_names = {(row.name, row.level) for row in existing}
+
+    parent_ids = list({item.parent_id for item in items} - {None})
+    found_parents = set(
+        db.scalars(
+            select(Category.id).where(
+                Category.id == any_(bindparam("ids", parent_ids, type_=ARRAY(Integer)))
+            )
+        )
+        if parent_ids
+        else ()
+    )
+
+    conflicts = {}
+    for index, item in enumerate(items):
+        # same order of checks as raise_if_existing_category
+        if (item.name, item.level) in taken_names:
+            conflicts[index] = NAME_LEVEL_EXISTS
+        elif item.slug in taken_slugs:
+            conflicts[index] = SLUG_EXISTS
+        elif item.parent_id is not None and item.parent_id not in found_parents:
+            conflicts[index] = PARENT_NOT_FOUND
+        else:
+            # later items of the batch conflict with this one, a rejected item
+            # takes nothing
+            taken_slugs.add(item.slug)
+            taken_names.add((item.name, item.level))
+    return conflicts
+
+
+def insert_categories(db, items):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING with all the rows as parameters,
+    sqlalchemy sends them as multi-row VALUES statements of CATEGORY_BULK_CHUNK_SIZE
+    rows ("insertmanyvalues"). returns slug -> id of the inserted rows, a missing
+    one lost a race against a concurrent insert since find_conflicts ran.
+    """
+    statement = (
+        insert(category_table)
+        .on_conflict_do_nothing()
+        .returning(category_table.c.id, category_table.c.slug)
+        .execution_options(insertmanyvalues_page_size=CATEGORY_BULK_CHUNK_SIZE)
+    )
+    rows = db.execute(statement, [item.model_dump() for item in items])
+    return {row.slug: row.id for row in rows}
+
+
+def bulk_create_categories(db, items, atomic):
+    """
+    Creates the categories in the transaction of the request session and returns
+    (results, ok). results has one entry per item, in request order. With atomic,
+    ok is False as soon as one item fails and the caller must roll back.
+    """
+    if not items:
+        return [], True
+    conflicts = find_conflicts(db, items)
+    if atomic and conflicts:
+        return [
+            failed(index, conflicts[index]) if index in conflicts else skipped(index)
+            for index in range(len(items))
+        ], False
+
+    candidates = [item for index, item in enumerate(items) if index not in conflicts]
+    inserted = insert_categories(db, candidates) if candidates else {}
+
+    results = []
+    for index, item in enumerate(items):
+        if index in conflicts:
+            results.append(failed(index, conflicts[index]))
+        elif item.slug in inserted:
+            results.append(created(index, inserted[item.slug]))
+            # a cached 404 of the new slug
+            record_category_change(db, inserted[item.slug], item.slug)
+        else:
+            results.append(failed(index, CHANGED_CONCURRENTLY))
+    if atomic and len(inserted) < len(items):
+        # lost a race, the caller rolls back what did get inserted
+        return [
+            skipped(result["index"]) if result["status"] == "created" else result
+            for result in results
+        ], False
+    return results, True
+
+
+# bulk update / delete work through the selected categories CATEGORY_BULK_CHUNK_SIZE
+# ids at a time (or the chunk_size of the request) and commit after every chunk, so
+# a huge selection never holds its row locks for long. a chunk that fails on a
+# constraint is rolled back on its own and its ids reported, the chunks before it
+# stay committed and the ones after it still run
+
+
+def id_array(ids):
+    return bindparam("ids", list(ids), type_=ARRAY(Integer))
+
+
+def selection_clauses(selector):
+    fields = selector.model_dump(exclude_unset=True)
+    clauses = []
+    if "ids" in fields:
+        clauses.append(
+            Category.id
+            == any_(bindparam("selected", fields["ids"], type_=ARRAY(Integer)))
+        )
+    if "level" in fields:
+        clauses.append(Category.level == fields["level"])
+    if "parent_id" in fields:
+        if fields["parent_id"] is None:
+            clauses.append(Category.parent_id.is_(None))
+        else:
+            clauses.append(Category.parent_id == fields["parent_id"])
+    return clauses
+
+
+def selected_id_chunks(db, clauses, chunk_size):
+    # keyset over the primary key, rows that an earlier chunk moved out of the
+    # selection (a level update for example) are not picked up again
+    after = 0
+    while True:
+        ids = db.scalars(
+            select(Category.id)
+            .where(*clauses, Category.id > after)
+            .order_by(Category.id)
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            return
+        yield ids
+        if len(ids) < chunk_size:
+            return
+        after = ids[-1]
+
+
+def new_write_result():
+    return {"ids": [], "unchanged": 0, "errors": [], "chunks": 0}
+
+
+def update_error(error: IntegrityError):
+    # the constraint one row of the chunk ran into, the names are in the message
+    # with psycopg2 and asyncpg
+    message = str(error.orig)
+    if "uq_category_name_level" in message:
+        return NAME_LEVEL_EXISTS
+    if "category_path_cycle" in message:
+        return PARENT_CYCLE
+    if "category_parent_id_fkey" in message:
+        # the parent was deleted after the endpoint checked it
+        return PARENT_NOT_FOUND
+    return CHUNK_FAILED
+
+
+def chunk_failed(db, result, ids, error, detail):
+    db.rollback()  # only this chunk, the ones before it are committed
+    logger.warning(f"Bulk chunk of {len(ids)} categories rolled back: {error}")
+    result["errors"].extend(
+        {"id": category_id, "detail": detail} for category_id in ids
+    )
+    result["chunks"] += 1
+
+
+def report_not_found(result, selector, seen):
+    if "ids" in selector.model_fields_set:
+        for category_id in dict.fromkeys(selector.ids):
+            if category_id not in seen:
+                result["errors"].append(
+                    {"id": category_id, "detail": CATEGORY_NOT_FOUND}
+                )
+
+
+def bulk_update_categories(db, selector, values, chunk_size):
+    """
+    One UPDATE ... WHERE id = ANY(chunk) RETURNING per chunk, setting only the sent
+    columns and skipping rows that already have those values.
+    """
+    values = values.model_dump(exclude_unset=True)
+    changed = or_(
+        *(
+            getattr(Category, key).is_distinct_from(value)
+            for key, value in values.items()
+        )
+    )
+    result, seen = new_write_result(), set()
+    for ids in selected_id_chunks(db, selection_clauses(selector), chunk_size):
+        seen.update(ids)
+        try:
+            rows = db.execute(
+                update(Category)
+                .where(Category.id == any_(id_array(ids)), changed)
+                .values(**values)
+                .returning(Category.id, Category.slug)
+                .execution_options(synchronize_session=False)
+            ).all()
+            for row in rows:
+                # the slug doesnt change here, no need for the (slower) id lookup
+                record_category_change(db, slug=row.slug)
+            db.commit()
+        except IntegrityError as e:
+            chunk_failed(db, result, ids, e, update_error(e))
+            continue
+        result["ids"].extend(row.id for row in rows)
+        result["unchanged"] += len(ids) - len(rows)
+        result["chunks"] += 1
+    report_not_found(result, selector, seen)
+    return result
+
+
+def delete_unused(db, ids):
+    # only categories no other category or product points at, the FK from
+    # category.parent_id (and product.category_id) would fail the whole statement
+    child = aliased(Category)
+    return db.execute(
+        delete(Category)
+        .where(
+            Category.id == any_(id_array(ids)),
+            ~exists().where(child.parent_id == Category.id),
+            ~exists().where(Product.category_id == Category.id),
+        )
+        .returning(Category.id, Category.slug)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def delete_chunk(db, ids, result):
+    """
+    deletes what it can of ids and returns the ids it could not (a failed chunk is
+    reported here and returns none). a parent is
+    blocked until its children are gone, so passes repeat while they make progress:
+    a subtree goes bottom-up, one level per pass
+    """
+    remaining, deleted = set(ids), []
+    try:
+        while remaining:
+            rows = delete_unused(db, remaining)
+            if not rows:
+                break
+            for row in rows:
+                record_category_change(db, slug=row.slug)
+                remaining.discard(row.id)
+            deleted.extend(row.id for row in rows)
+        db.commit()
+    except IntegrityError as e:
+        # a subcategory or a product pointing at one of them was inserted since
+        # the NOT EXISTS checks ran
+        chunk_failed(db, result, sorted(ids), e, CATEGORY_IN_USE)
+        return set()
+    result["ids"].extend(deleted)
+    result["chunks"] += 1
+    return remaining
+
+
+def bulk_delete_categories(db, selector, chunk_size):
+    result, seen, blocked = new_write_result(), set(), []
+    for ids in selected_id_chunks(db, selection_clauses(selector), chunk_size):
+        seen.update(ids)
+        blocked.extend(delete_chunk(db, ids, result))
+    # a parent can be blocked only by children of a later chunk, now they are gone
+    still_blocked = []
+    for start in range(0, len(blocked), chunk_size):
+        still_blocked.extend(
+            delete_chunk(db, blocked[start : start + chunk_size], result)
+        )
+    for category_id in sorted(still_blocked):
+        result["errors"].append({"id": category_id, "detail": CATEGORY_IN_USE})
+    report_not_found(result, selector, seen)
+    return result
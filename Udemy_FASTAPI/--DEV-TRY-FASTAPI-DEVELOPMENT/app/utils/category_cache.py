@@ -0,0 +1,88 @@
+import os
+
+from app.schemas.category_schema import CategoryReturn
+from app.utils.cache import TTLCache, register_cache
+from app.utils.category_events import register_invalidator
+from app.utils.category_reads import CATEGORY_BY_SLUG, category_record
+from app.utils.db_routing import primary_bind
+from app.utils.singleflight import SingleFlight, register_flight
+
+# GET /api/category/slug/{slug} answers from this cache, slugs rarely change and a
+# handful of them get most of the traffic. entries are the serialized CategoryReturn
+# dict (never the ORM object, that one belongs to the session that loaded it) or
+# None for a slug that does not exist
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "60"))
+CATEGORY_CACHE_NEGATIVE_TTL = float(os.getenv("CATEGORY_CACHE_NEGATIVE_TTL", "5"))
+
+category_slug_cache = register_cache(
+    "category_by_slug",
+    TTLCache(
+        maxsize=CATEGORY_CACHE_SIZE,
+        ttl=CATEGORY_CACHE_TTL,
+        negative_ttl=CATEGORY_CACHE_NEGATIVE_TTL,
+    ),
+)
+
+
+def get_cached_category(slug: str):
+    return category_slug_cache.get(slug)
+
+
+def cache_category(slug: str, category, generation=None):
+    if category is not None:
+        category = CategoryReturn.model_validate(
+            category, from_attributes=True
+        ).model_dump()
+    category_slug_cache.set(slug, category, generation=generation)
+
+
+# the requests for a slug that missed the cache at the same time (a hot category
+# whose entry just expired) share one query
+category_slug_flight = register_flight("category_by_slug", SingleFlight())
+
+# what fills the cache is read from the primary, a replica may not have the write
+# whose invalidation already ran. and it is not stored when an invalidation ran
+# while it was read, the row may be from before that write
+
+
+def load_category(db, slug: str):
+    def query():
+        generation = category_slug_cache.generation
+        result = CATEGORY_BY_SLUG.execute(
+            db, bind_arguments=primary_bind(db), slug=slug
+        )
+        category = category_record(result.first())
+        cache_category(slug, category, generation)  # a 404 is cached too
+        return category
+
+    return category_slug_flight.do(slug, query)
+
+
+async def load_category_async(db, slug: str):
+    async def query():
+        generation = category_slug_cache.generation
+        result = await db.execute(
+            CATEGORY_BY_SLUG.statement,
+            {"slug": slug},
+            bind_arguments=primary_bind(db),
+        )
+        category = category_record(result.first())
+        cache_category(slug, category, generation)
+        return category
+
+    return await category_slug_flight.do_async(slug, query)
+
+
+def invalidate_category(category_id=None, slug=None):
+    if slug is not None:
+        category_slug_cache.pop(slug)
+    if category_id is not None:
+        # the old slug of an updated/deleted row is only known through its id
+        category_slug_cache.pop_where(
+            lambda cached: cached is not None and cached["id"] == category_id
+        )
+
+
+# entries are dropped once a category write commits, in this worker or in any other
+register_invalidator(invalidate_category, category_slug_cache.clear)
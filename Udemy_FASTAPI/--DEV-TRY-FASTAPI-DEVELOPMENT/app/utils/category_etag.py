@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import text
+
+from app.utils.cache import register_cache
+from app.utils.category_events import CURRENT_VERSION, register_invalidator
+from app.utils.db_routing import primary_bind
+
+# GET /api/category/ and GET /api/category/slug/{slug} send an ETag built from
+# category_version, the counter every committed category write bumps
+# (category_events). a client sending it back in If-None-Match gets a 304 with
+# no body. the version is kept per worker and only read again after a category
+# write (this worker's or a notified one) or once it is CATEGORY_ETAG_MAX_AGE
+# seconds old, so most 304s dont touch the database. it is read from the primary,
+# a lagging replica would hand back the version from before the write that
+# invalidated it. writes that bypass the api (psql, migrations) dont bump the
+# counter
+CATEGORY_ETAG_ENABLED = os.getenv("CATEGORY_ETAG_ENABLED", "true").lower() == "true"
+CATEGORY_ETAG_MAX_AGE = float(os.getenv("CATEGORY_ETAG_MAX_AGE", "60"))
+
+CURRENT_VERSION_STATEMENT = text(CURRENT_VERSION)
+
+
+class VersionStamp:
+    """
+    The last category_version read by this worker. on_change / on_reset are the
+    category_events invalidators: the next get() reads the table again
+    """
+
+    def __init__(self, max_age=CATEGORY_ETAG_MAX_AGE):
+        self.max_age = max_age
+        self._version = None
+        self._read_at = 0.0
+        # bumped by every invalidation, a read that started before one is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def on_change(self, category_id=None, slug=None):
+        with self._lock:
+            self._version = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def on_reset(self):
+        self.on_change()
+
+    def clear(self):
+        self.on_change()
+
+    def _cached(self):
+        with self._lock:
+            if (
+                self._version is not None
+                and time.monotonic() - self._read_at < self.max_age
+            ):
+                self.hits += 1
+                return self._version, None
+            self.misses += 1
+            return None, (self._generation, time.monotonic())
+
+    def _keep(self, version, started):
+        generation, read_at = started
+        with self._lock:
+            if generation == self._generation:
+                self._version, self._read_at = version, read_at
+        return version
+
+    def get(self, db):
+        version, started = self._cached()
+        if version is None:
+            result = db.execute(
+                CURRENT_VERSION_STATEMENT, bind_arguments=primary_bind(db)
+            )
+            version = self._keep(result.scalar(), started)
+        return version
+
+    async def get_async(self, db):
+        version, started = self._cached()
+        if version is None:
+            result = await db.execute(
+                CURRENT_VERSION_STATEMENT, bind_arguments=primary_bind(db)
+            )
+            version = self._keep(result.scalar(), started)
+        return version
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": 0 if self._version is None else 1,
+                "maxsize": 1,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": 0,
+                "expirations": 0,
+                "invalidations": self.invalidations,
+            }
+
+
+def read_version(db):
+    # the version the session itself sees, a replica's may be behind the primary
+    return db.execute(CURRENT_VERSION_STATEMENT).scalar()
+
+
+async def read_version_async(db):
+    return (await db.execute(CURRENT_VERSION_STATEMENT)).scalar()
+
+
+category_version = register_cache("category_version", VersionStamp())
+register_invalidator(category_version.on_change, category_version.on_reset)
+
+
+def version_etag(version):
+    # strong: the body of both endpoints is the same for the same version
+    return f'"category-{version}"'
+
+
+def etag_matches(request: Request, etag):
+    # If-None-Match compares weakly, a W/ prefix added by a proxy still matches
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified(request: Request, response: Response, version):
+    """
+    sets the ETag of version on response, and returns the 304 to answer with
+    when the client already has it (None otherwise)
+    """
+    etag = version_etag(version)
+    response.headers["ETag"] = etag
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import select
+import threading
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# every uvicorn worker keeps its own in-process caches of categories. a committed
+# category write is announced on this postgres channel and every worker (the one
+# that wrote included) drops the matching entries when the notification comes in
+CATEGORY_CHANNEL = "category_changes"
+CATEGORY_NOTIFY_ENABLED = os.getenv("CATEGORY_NOTIFY_ENABLED", "true").lower() == "true"
+# seconds between two reads of category_version by the listener. a worker that missed
+# notifications (they are not queued while it is disconnected) sees the counter
+# moved past the last version it handled and clears its caches
+CATEGORY_VERSION_CHECK_INTERVAL = float(
+    os.getenv("CATEGORY_VERSION_CHECK_INTERVAL", "30")
+)
+# the ETags of the category endpoints are built from category_version, it is
+# bumped even without notifications (app/utils/category_etag.py)
+CATEGORY_VERSION_ENABLED = os.getenv("CATEGORY_ETAG_ENABLED", "true").lower() == "true"
+# NOTIFY payloads are limited to 8000 bytes, bigger change sets are sent as a reset
+MAX_PAYLOAD_BYTES = 7500
+
+# session.info key holding the (id, slug) pairs a transaction changed
+PENDING_CHANGES = "category_changes"
+
+# (on_change(category_id, slug), on_reset()) of every local cache of categories
+_invalidators = []
+# the same for caches every worker shares (the response cache in redis): only the
+# worker that wrote invalidates them, not every worker again for its notification
+_shared_invalidators = []
+
+
+def register_invalidator(on_change, on_reset, shared=False):
+    (_shared_invalidators if shared else _invalidators).append((on_change, on_reset))
+
+
+def dispatch_change(category_id=None, slug=None, notified=False):
+    # notified: from CategoryChangeListener, the worker that wrote has already
+    # dispatched it after its commit
+    for on_change, _ in (
+        _invalidators if notified else _invalidators + _shared_invalidators
+    ):
+        on_change(category_id, slug)
+
+
+def dispatch_reset(notified=False):
+    for _, on_reset in (
+        _invalidators if notified else _invalidators + _shared_invalidators
+    ):
+        on_reset()
+
+
+def record_category_change(db, category_id=None, slug=None):
+    # called by the endpoints after they flush a category write. nothing is
+    # invalidated before the commit, otherwise a concurrent request could put the
+    # old row back into a cache before our transaction is visible
+    db.info.setdefault(PENDING_CHANGES, []).append((category_id, slug))
+
+
+def notify_payload(version, changes):
+    payload = json.dumps(
+        {"version": version, "changes": [list(change) for change in changes]}
+    )
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        payload = json.dumps({"version": version, "changes": None})
+    return payload
+
+
+# bumps the counter and returns the new value; the row lock it takes makes concurrent
+# category writes commit (and so notify) in version order
+BUMP_VERSION = text(
+    "UPDATE category_version SET version = version + 1 WHERE id = 1 RETURNING version"
+)
+NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+CURRENT_VERSION = "SELECT version FROM category_version WHERE id = 1"
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session):
+    changes = session.info.get(PENDING_CHANGES)
+    if not changes or not (CATEGORY_NOTIFY_ENABLED or CATEGORY_VERSION_ENABLED):
+        return
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    version = session.execute(BUMP_VERSION).scalar()
+    if not CATEGORY_NOTIFY_ENABLED:
+        return
+    # NOTIFY is transactional: it is only delivered if this transaction commits
+    session.execute(
+        NOTIFY,
+        {"channel": CATEGORY_CHANNEL, "payload": notify_payload(version, changes)},
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # the writing worker does not wait for its own notification
+    for category_id, slug in session.info.pop(PENDING_CHANGES, ()):
+        dispatch_change(category_id, slug)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    # nothing was written, nothing to invalidate
+    session.info.pop(PENDING_CHANGES, None)
+
+
+class CategoryChangeListener:
+    """
+    Background thread that LISTENs on CATEGORY_CHANNEL over its own psycopg2
+    connection (outside the pool, a pooled connection would be recycled under it)
+    and hands every notification to the registered invalidators.
+
+    Notifications sent while it is disconnected are lost, so the last handled
+    category_version is compared with the table after every reconnect and every
+    CATEGORY_VERSION_CHECK_INTERVAL seconds; if they differ the caches are cleared.
+    """
+
+    def __init__(
+        self,
+        engine,
+        channel=CATEGORY_CHANNEL,
+        check_interval=CATEGORY_VERSION_CHECK_INTERVAL,
+        max_backoff=30,
+    ):
+        self.engine = engine
+        self.channel = channel
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.version = None  # last category_version this worker is up to date with
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="category-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _connect(self):
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        connection = self.engine.dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        return connection
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                self.check_version(connection)
+                logger.info(f"Listening for category changes on {self.channel}")
+                backoff = 1
+                self._listen(connection)
+            except Exception as e:
+                logger.warning(
+                    f"Category change listener disconnected, retrying in {backoff}s: {e}"
+                )
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _listen(self, connection):
+        waited = 0.0
+        while not self._stop.is_set():
+            # short timeout so stop() doesnt wait for the next notification
+            if select.select([connection], [], [], 1) == ([], [], []):
+                waited += 1
+                if waited >= self.check_interval:
+                    waited = 0.0
+                    self.check_version(connection)  # doubles as a keepalive
+                continue
+            connection.poll()
+            self._drain(connection)
+
+    def _drain(self, connection):
+        while connection.notifies:
+            self.handle(connection.notifies.pop(0).payload)
+
+    def check_version(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(CURRENT_VERSION)
+            row = cursor.fetchone()
+        current = row[0] if row else 0
+        if self.version is None:
+            # first connection: whatever got cached before it was never verified
+            del connection.notifies[:]
+            dispatch_reset(notified=True)
+        else:
+            # notifications that arrived before the query are part of current
+            self._drain(connection)
+            if current != self.version:
+                logger.warning(
+                    f"Missed category changes ({self.version} -> {current}), "
+                    "clearing the category caches"
+                )
+                dispatch_reset(notified=True)
+        self.version = current
+
+    def handle(self, payload):
+        message = json.loads(payload)
+        version = message["version"]
+        if version <= self.version:
+            return  # already counted in by check_version
+        if version != self.version + 1:
+            dispatch_reset(notified=True)  # there is a gap, something got lost
+        elif message["changes"] is None:
+            dispatch_reset(notified=True)  # too many changes for one notification
+        else:
+            for category_id, slug in message["changes"]:
+                dispatch_change(category_id, slug, notified=True)
+        self.version = version
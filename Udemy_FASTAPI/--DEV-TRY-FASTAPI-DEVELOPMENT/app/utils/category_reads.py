@@ -0,0 +1,61 @@
+from itertools import starmap
+
+from sqlalchemy import bindparam, select
+
+from app.models import Category
+from app.utils.category_utils import CATEGORY_RETURN_COLUMNS, paginate_categories
+from app.utils.prepared import PreparedStatement
+
+# read path of the category endpoints (both DB_ASYNC_MODEs) and the search. a
+# db.query(Category) builds a full ORM instance per row, registers it in the
+# identity map of the session and instruments every attribute, just for the
+# response_model to copy it into a CategoryReturn. these statements select the
+# CategoryReturn columns with Core and the rows become CategoryRecords: nothing
+# is tracked, the session has nothing to flush or expire. the writes keep
+# working on Category
+
+
+class CategoryRecord:
+    """
+    Read only CategoryReturn shaped row. The response_model and cache_category
+    read it through its attributes like a Category; __slots__ keeps it at a
+    fraction of the size of an ORM instance.
+    """
+
+    # the order of CategoryReturn.model_fields, the order of the columns
+    __slots__ = ("name", "slug", "is_active", "level", "parent_id", "id")
+
+    def __init__(self, name, slug, is_active, level, parent_id, id):
+        self.name = name
+        self.slug = slug
+        self.is_active = is_active
+        self.level = level
+        self.parent_id = parent_id
+        self.id = id
+
+    def __repr__(self):
+        return f"CategoryRecord(id={self.id!r}, slug={self.slug!r})"
+
+
+def category_records(rows):
+    return list(starmap(CategoryRecord, rows))
+
+
+def category_record(row):
+    return CategoryRecord(*row) if row is not None else None
+
+
+def category_page_statement(cursor, limit):
+    # GET /api/category/, limit + 1 rows for set_next_page
+    return paginate_categories(select(*CATEGORY_RETURN_COLUMNS), cursor, limit)
+
+
+# the hot lookups are built once with bound parameters, see app/utils/prepared.py
+CATEGORY_BY_SLUG = PreparedStatement(
+    "category_by_slug",
+    select(*CATEGORY_RETURN_COLUMNS).where(Category.slug == bindparam("slug")).limit(1),
+)
+CATEGORY_BY_ID = PreparedStatement(
+    "category_by_id",
+    select(*CATEGORY_RETURN_COLUMNS).where(Category.id == bindparam("category_id")),
+)
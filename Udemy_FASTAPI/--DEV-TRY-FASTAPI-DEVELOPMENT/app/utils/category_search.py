@@ -0,0 +1,58 @@
+import os
+import re
+
+from sqlalchemy import bindparam, func, literal_column, select
+
+from app.models import CATEGORY_SEARCH_DOCUMENT, Category
+from app.utils.category_reads import category_records
+from app.utils.category_utils import CATEGORY_RETURN_COLUMNS
+
+# most categories one search request may ask for
+CATEGORY_SEARCH_MAX_LIMIT = int(os.getenv("CATEGORY_SEARCH_MAX_LIMIT", "100"))
+CATEGORY_SEARCH_DEFAULT_LIMIT = int(os.getenv("CATEGORY_SEARCH_DEFAULT_LIMIT", "20"))
+
+# the words of name and slug, matched through the ix_category_search gin index.
+# the column names are not qualified, the statements have category alone in FROM
+search_document = literal_column(CATEGORY_SEARCH_DOCUMENT)
+SIMPLE = literal_column("'simple'::regconfig")  # no stemming, no stop words
+
+
+def search_terms(q):
+    # the words of q the way to_tsvector('simple') splits and lowercases them.
+    # anything else (& | ! : quotes) would be tsquery syntax, it is dropped
+    return re.findall(r"[^\W_]+", q.lower())
+
+
+def search_query(terms, prefix=True):
+    # every word has to match, with prefix the last letters may be missing: "kit"
+    # finds "kitchen"
+    return " & ".join(f"{term}:*" if prefix else term for term in terms)
+
+
+def search_statement(q, limit, prefix=True):
+    """
+    the categories matching q, best first: an exact name, then ts_rank, then the
+    shorter name. None when q has no words to search for
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+    query = func.to_tsquery(SIMPLE, bindparam("query", search_query(terms, prefix)))
+    return (
+        select(*CATEGORY_RETURN_COLUMNS)
+        .where(search_document.bool_op("@@")(query))
+        .order_by(
+            (func.lower(Category.name) == q.strip().lower()).desc(),
+            func.ts_rank(search_document, query).desc(),
+            func.length(Category.name),
+            Category.id,
+        )
+        .limit(limit)
+    )
+
+
+def search_categories(db, q, limit, prefix=True):
+    statement = search_statement(q, limit, prefix)
+    if statement is None:
+        return []
+    return category_records(db.execute(statement).all())
@@ -0,0 +1,179 @@
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, and_, any_, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased
+
+from app.models import Category, CategoryPath
+from app.utils.category_bulk import PARENT_NOT_FOUND
+from app.utils.category_events import record_category_change
+from app.utils.category_utils import PARENT_CYCLE
+
+# deepest level below (or above) the start a tree request may ask for
+CATEGORY_TREE_MAX_DEPTH = int(os.getenv("CATEGORY_TREE_MAX_DEPTH", "50"))
+
+TREE_COLUMNS = ("id", "name", "slug", "is_active", "level", "parent_id")
+
+# the tree queries work on the materialized path of the categories
+# (CategoryPath, "3/17/42/") instead of walking parent_id: a subtree is one range
+# scan on ix_category_path_path and the ancestors are the ids in the path, primary
+# key lookups
+
+
+def tree_columns(table):
+    return [getattr(table, column) for column in TREE_COLUMNS]
+
+
+def tree_node(row):
+    # zip over the plain tuple, attribute access by name on 100k rows is slow
+    node = dict(zip(TREE_COLUMNS, row))
+    node["children"] = []
+    return node
+
+
+def path_depth(table):
+    # 0 for a top level category, one "/" per id in the path
+    return func.length(table.path) - func.length(func.replace(table.path, "/", "")) - 1
+
+
+def in_subtree(table, path):
+    """
+    the rows of table in the subtree with the given path (its root included), with
+    "C" collation that is every path in ["3/17/", "3/170"). path is a string or the
+    path column of a joined row, an index range scan either way, which a
+    LIKE root.path || '%' is not. joins products to the subtree of a category the
+    same way
+    """
+    if isinstance(path, str):
+        upper = path[:-1] + "0"
+    else:
+        upper = func.left(path, -1) + "0"
+    return and_(table.path >= path, table.path < upper)
+
+
+def tree_statement(max_depth):
+    depth = path_depth(CategoryPath)
+    return (
+        select(*tree_columns(Category), depth.label("depth"))
+        .join(CategoryPath, CategoryPath.category_id == Category.id)
+        .where(depth <= max_depth)
+        .order_by(depth, Category.id)
+    )
+
+
+def subtree_statement(category_id, max_depth):
+    root = aliased(CategoryPath)
+    depth = path_depth(CategoryPath) - path_depth(root)
+    return (
+        select(*tree_columns(Category), depth.label("depth"))
+        .select_from(root)
+        .join(CategoryPath, in_subtree(CategoryPath, root.path))
+        .join(Category, Category.id == CategoryPath.category_id)
+        .where(root.category_id == category_id, depth <= max_depth)
+        .order_by(depth, Category.id)
+    )
+
+
+def ancestors_statement(category_id, max_depth):
+    node = aliased(CategoryPath)
+    path_ids = func.string_to_array(func.rtrim(node.path, "/"), "/")
+    depth = path_depth(node) - path_depth(CategoryPath)
+    return (
+        select(*tree_columns(Category), depth.label("depth"))
+        .select_from(node)
+        .join(Category, Category.id == any_(path_ids.cast(ARRAY(Integer))))
+        .join(CategoryPath, CategoryPath.category_id == Category.id)
+        .where(node.category_id == category_id, depth <= max_depth)
+        .order_by(depth)
+    )
+
+
+def nest(rows):
+    """
+    rows of tree_statement / subtree_statement -> the nested start nodes. rows come
+    parents first, children end up in id order
+    """
+    nodes, roots = {}, []
+    for row in rows:
+        node = tree_node(row)
+        nodes[node["id"]] = node
+        if row[-1] == 0:  # depth
+            roots.append(node)
+        else:
+            nodes[node["parent_id"]]["children"].append(node)
+    return roots
+
+
+def category_tree(db, max_depth):
+    # every top level category with its subtree
+    return nest(db.execute(tree_statement(max_depth)).all())
+
+
+def category_subtree(db, category_id, max_depth):
+    # the category with its subtree, None when there is no such category
+    roots = nest(db.execute(subtree_statement(category_id, max_depth)).all())
+    return roots[0] if roots else None
+
+
+def category_ancestors(db, category_id, max_depth):
+    """
+    the chain from the top level category (or the highest one within max_depth)
+    down to the category, one child per level. None when there is no such category
+    """
+    rows = db.execute(ancestors_statement(category_id, max_depth)).all()
+    chain = None
+    for row in rows:  # the category itself first, then its parent and so on
+        node = tree_node(row)
+        if chain:
+            node["children"].append(chain)
+        chain = node
+    return chain
+
+
+def lock_hierarchy(db):
+    # the lock the category_path triggers take for a parent_id change (see the
+    # 1e3c4a5dc028 migration), held until the transaction ends. no other move and
+    # no insert below a parent runs in between
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext("category_path"))))
+
+
+def move_category(db, category_id, parent_id):
+    """
+    Moves the category with its whole subtree below parent_id (None: to the top
+    level) and returns (category, moved), moved being the number of categories
+    whose path got rewritten. the UPDATE of parent_id is all it takes, the
+    category_path_move trigger rewrites the subtree in one set-based UPDATE
+    """
+    lock_hierarchy(db)
+    category = db.execute(
+        select(Category.parent_id, CategoryPath.path)
+        .join(CategoryPath, CategoryPath.category_id == Category.id)
+        .where(Category.id == category_id)
+    ).first()
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    if parent_id == category.parent_id:
+        return db.get(Category, category_id), 0
+    if parent_id is not None:
+        parent_path = db.scalar(
+            select(CategoryPath.path).where(CategoryPath.category_id == parent_id)
+        )
+        if parent_path is None:
+            raise HTTPException(status_code=400, detail=PARENT_NOT_FOUND)
+        if parent_path.startswith(category.path):
+            raise HTTPException(status_code=400, detail=PARENT_CYCLE)
+    # under the lock nothing moves in or out of the subtree until the commit
+    moved = db.scalar(
+        select(func.count()).where(in_subtree(CategoryPath, category.path))
+    )
+    moved_category = db.execute(
+        update(Category)
+        .where(Category.id == category_id)
+        .values(parent_id=parent_id)
+        .returning(Category)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    # the cached category has the old parent_id
+    record_category_change(db, moved_category.id, moved_category.slug)
+    return moved_category, moved
@@ -1,24 +1,49 @@
-from fastapi import HTTPException
+import base64
+import json
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import (
+    bindparam,
+    delete,
+    func,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models import Category
-from app.schemas.category_schema import CategoryCreate
-
+from app.schemas.category_schema import CategoryCreate, CategoryReturn
+from app.utils.fast_json import schema_columns
+from app.utils.prepared import PreparedStatement
 
-def check_existing_category(db: Session, category_data: CategoryCreate):
-    existing_category = (
-        db.query(Category)
-        .filter(  # filter method in sql alchemy allows us to filter only rows that meet certain criteria
-            (Category.slug == category_data.slug)
-            | (Category.name == category_data.name)
-            & (Category.level == category_data.level)
-        )
-        .first()  # we need to make sure there is at least one but it doesnt matter many dedi
-        # nasil many olcak ki zaten tum olay bunlarin unique olmaqsi degil mi
+# filter method in sql alchemy allows us to filter only rows that meet certain criteria.
+# built once with bound parameters, it runs after every conflicting create
+EXISTING_CATEGORY = PreparedStatement(
+    "existing_category",
+    select(Category.name, Category.level)
+    .filter(
+        (Category.slug == bindparam("slug"))
+        | (Category.name == bindparam("name")) & (Category.level == bindparam("level"))
     )
+    .limit(1),
+)
 
-    # so above we made a query with filter, thats gonna return either a single object or nothing
 
+def existing_category_params(category_data: CategoryCreate):
+    return {
+        "slug": category_data.slug,
+        "name": category_data.name,
+        "level": category_data.level,
+    }
+
+
+def raise_if_existing_category(existing_category, category_data: CategoryCreate):
     if existing_category:
         if (
             existing_category.name == category_data.name
@@ -29,3 +54,167 @@ def check_existing_category(db: Session, category_data: CategoryCreate):
             detail_msg = "Category slug already exists"
 
         raise HTTPException(status_code=400, detail=detail_msg)
+
+
+def check_existing_category(db: Session, category_data: CategoryCreate):
+    existing_category = (
+        EXISTING_CATEGORY.execute(db, **existing_category_params(category_data)).first()
+    )  # we need to make sure there is at least one but it doesnt matter many dedi
+    # nasil many olcak ki zaten tum olay bunlarin unique olmaqsi degil mi
+
+    # so above we made a query with filter, thats gonna return either a single object or nothing
+    raise_if_existing_category(existing_category, category_data)
+
+
+async def check_existing_category_async(
+    db: AsyncSession, category_data: CategoryCreate
+):
+    result = await db.execute(
+        EXISTING_CATEGORY.statement, existing_category_params(category_data)
+    )
+    raise_if_existing_category(result.first(), category_data)
+
+
+# POST /api/category/ is one INSERT ... ON CONFLICT round trip. a conflict on
+# uq_category_slug or uq_category_name_level makes it return no row instead of
+# raising, and only then check_existing_category looks up which one it was.
+# two concurrent creates of the same category can no longer both pass a check and
+# then fail on the constraint with a 500
+# xmax is 0 for a row version written by an INSERT, an upsert that updated the
+# existing row gets the id of its transaction there
+INSERTED = literal_column("xmax = 0").label("inserted")
+
+
+def insert_category_statement(category_data: CategoryCreate):
+    return (
+        insert(Category)
+        .values(**category_data.model_dump())
+        .on_conflict_do_nothing()
+        .returning(Category, INSERTED)
+    )
+
+
+def upsert_category_statement(category_data: CategoryCreate):
+    # ?upsert=true: the category with this slug is overwritten instead of a 400
+    values = category_data.model_dump()
+    statement = insert(Category).values(**values)
+    return (
+        statement.on_conflict_do_update(
+            constraint="uq_category_slug",
+            set_={
+                **{key: statement.excluded[key] for key in values if key != "slug"},
+                "updated_at": func.now(),
+            },
+        )
+        .returning(Category, INSERTED)
+        .execution_options(populate_existing=True)
+    )
+
+
+def raise_if_name_level_conflict(error: IntegrityError):
+    # an upsert only resolves slug conflicts, the name + level of another row can
+    # still be taken. the message names the constraint with psycopg2 and asyncpg
+    if "uq_category_name_level" in str(error.orig):
+        raise HTTPException(
+            status_code=400, detail="Category name and level already exists"
+        )
+
+
+PARENT_CYCLE = "Category can not move below its own subcategory"
+
+
+def raise_if_parent_cycle(error: IntegrityError):
+    # the category_path trigger refuses a parent_id inside the category's own
+    # subtree (check_violation category_path_cycle)
+    if "category_path_cycle" in str(error.orig):
+        raise HTTPException(status_code=400, detail=PARENT_CYCLE)
+
+
+# PUT and DELETE /api/category/{id} are one statement each, RETURNING hands back
+# the row (no row means 404) so nothing is loaded before or refreshed after.
+# no object of the session is affected, so there is nothing to synchronize
+def update_category_statement(category_id: int, category_data: CategoryCreate):
+    return (
+        update(Category)
+        .where(Category.id == category_id)
+        .values(**category_data.model_dump())
+        .returning(Category)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def patch_category_statement(category_id: int, values: dict):
+    # PATCH /api/category/{id}: SET only the columns the client sent, and only when
+    # one of them actually differs, an unchanged row is not rewritten (no new row
+    # version, no index or WAL churn) and comes back as no row at all
+    return (
+        update(Category)
+        .where(
+            Category.id == category_id,
+            or_(
+                *(
+                    getattr(Category, key).is_distinct_from(value)
+                    for key, value in values.items()
+                )
+            ),
+        )
+        .values(**values)
+        .returning(Category)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_category_statement(category_id: int):
+    return (
+        delete(Category)
+        .where(Category.id == category_id)
+        .returning(Category.id, Category.name, Category.slug)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# GET /api/category/ is paginated with a keyset cursor instead of OFFSET: the next
+# page starts right after the (level, id) of the last row the client got, which is
+# one range scan on ix_category_level_id however deep the page is
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# what the fast path of GET /api/category/ selects instead of the Category objects
+CATEGORY_RETURN_FIELDS = tuple(CategoryReturn.model_fields)
+CATEGORY_RETURN_COLUMNS = schema_columns(Category, CategoryReturn)
+
+
+def encode_cursor(level: int, category_id: int):
+    raw = json.dumps([level, category_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        level, category_id = json.loads(raw)
+        return int(level), int(category_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate_categories(query, cursor: str, limit: int):
+    # works for both db.query(Category) and select(Category).
+    # one extra row is fetched to know whether there is a next page
+    query = query.order_by(Category.level, Category.id)
+    if cursor:
+        level, category_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(Category.level, Category.id) > tuple_(level, category_id)
+        )
+    return query.limit(limit + 1)
+
+
+def set_next_page(request: Request, response: Response, categories, limit: int):
+    if len(categories) <= limit:
+        return categories
+    categories = categories[:limit]
+    next_cursor = encode_cursor(categories[-1].level, categories[-1].id)
+    next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = next_cursor
+    return categories
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """
+    Read replicas the RoutingSession can send read-only sessions to.
+
+    engines are what the sessions bind to (for async mode the .sync_engine of each
+    AsyncEngine), probe_engines are plain sync engines pointing at the same
+    databases that the health check thread uses to run SELECT 1.
+    A replica is taken out of rotation when its probe fails or when a statement on
+    it fails with a connection error, and comes back after a successful probe
+    (or once retry_after seconds passed without a health check thread).
+    """
+
+    def __init__(self, engines=(), probe_engines=(), retry_after=30, interval=5):
+        self.engines = list(engines)
+        self.probe_engines = list(probe_engines)
+        self.retry_after = retry_after
+        self.interval = interval
+        self._down_until = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(
+            context.original_exception, exc.OperationalError
+        ):
+            self.mark_down(context.engine, context.original_exception)
+
+    def mark_down(self, engine, reason=None):
+        now = time.monotonic()
+        with self._lock:
+            was_up = self._down_until.get(engine, 0) <= now
+            self._down_until[engine] = now + self.retry_after
+        if was_up:  # only log the transition, not every failed health check
+            logger.warning(f"Read replica {engine.url.host} marked down: {reason}")
+
+    def mark_up(self, engine):
+        with self._lock:
+            if self._down_until.pop(engine, None) is not None:
+                logger.info(f"Read replica {engine.url.host} is back")
+
+    def healthy(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                engine
+                for engine in self.engines
+                if self._down_until.get(engine, 0) <= now
+            ]
+
+    def choose(self):
+        # round robin over the healthy replicas, None sends the session to the primary
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check(self):
+        for engine, probe in zip(self.engines, self.probe_engines):
+            try:
+                with probe.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception as e:
+                self.mark_down(engine, e)
+            else:
+                self.mark_up(engine)
+
+    def start_health_checks(self):
+        if not self.probe_engines or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run_health_checks, name="replica-health", daemon=True
+        )
+        self._thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run_health_checks(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends read-only work to a replica and everything else to its bind
+    (the primary). get_db_session / get_read_db_session set info["read_only"].
+    get_read_db_session also puts request.state in info["request_state"], it gets
+    read_from_replica = True once a replica is handed out.
+    The replica is picked once per session, so a request never spreads its
+    queries over several replicas, and anything that flushes goes to the primary.
+    A replica that can not be connected to is marked down and the session goes
+    on with the primary, the request itself does not fail.
+    """
+
+    def __init__(self, *args, replica_set=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+        self._replica = None
+        self._replica_failed = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.info.get("read_only")
+            and self.replica_set is not None
+            and not self._flushing
+            and not self._replica_failed
+        ):
+            if self._replica is None:
+                self._replica = self.replica_set.choose()
+            if self._replica is not None:
+                # what the request builds from this session may be behind the
+                # primary, the response cache does not keep it
+                state = self.info.get("request_state")
+                if state is not None:
+                    state.read_from_replica = True
+                return self._replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except exc.OperationalError as e:
+            # only the first connection to the replica, nothing was read from it
+            # yet. handle_error may have marked it down already, a failed connect
+            # does not always go through it
+            if self._replica is None or engine is not self._replica:
+                raise
+            self.replica_set.mark_down(engine, e)
+            self._replica_failed = True
+            return super()._connection_for_bind(
+                super().get_bind(), execution_options, **kw
+            )
+
+    def close(self):
+        super().close()
+        self._replica = None
+        self._replica_failed = False
+
+
+def primary_bind(db):
+    """
+    bind_arguments sending a statement of db (a Session or an AsyncSession) to the
+    primary, also in a read only session. For the reads whose result outlives the
+    request, a lagging replica would keep its stale answer around
+    """
+    session = getattr(db, "sync_session", db)
+    if session.bind is None:
+        return None  # bound per mapper, nothing to route around
+    return {"bind": session.bind}
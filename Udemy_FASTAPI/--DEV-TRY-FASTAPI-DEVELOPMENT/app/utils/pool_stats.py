@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (in ms) of the checkout wait time histogram buckets, anything slower
+# than the last one ends up in "+Inf"
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+# name -> (engine, PoolStats) for every engine whose pool we want to expose
+_registry = {}
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.timeouts = 0
+
+    def observe_wait(self, seconds):
+        wait_ms = seconds * 1000
+        index = next(
+            (i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound),
+            len(WAIT_BUCKETS_MS),
+        )
+        with self._lock:
+            self.wait_buckets[index] += 1
+            self.wait_count += 1
+            self.wait_total += wait_ms
+            self.wait_max = max(self.wait_max, wait_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [str(bound) for bound in WAIT_BUCKETS_MS] + ["+Inf"]
+            return {
+                "timeouts": self.timeouts,
+                "wait_count": self.wait_count,
+                "wait_avg_ms": (
+                    self.wait_total / self.wait_count if self.wait_count else 0.0
+                ),
+                "wait_max_ms": self.wait_max,
+                "wait_histogram_ms": dict(zip(labels, self.wait_buckets)),
+            }
+
+
+def instrumented_pool(pool_class, stats):
+    # QueuePool has no "before checkout" event, so the wait is timed around _do_get,
+    # which is where a checkout blocks when the pool is exhausted.
+    # stats lives on the class because engine.dispose() rebuilds the pool from it
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                self.stats.record_timeout()
+                logger.warning(
+                    f"Connection pool exhausted: {self.status()} "
+                    f"(timeouts so far: {self.stats.timeouts})"
+                )
+                raise
+            finally:
+                self.stats.observe_wait(time.perf_counter() - start)
+
+    InstrumentedPool.stats = stats
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def register_pool(name, engine, stats):
+    _registry[name] = (engine, stats)
+
+
+def pool_snapshots():
+    snapshots = []
+    for name, (engine, stats) in _registry.items():
+        pool = engine.pool
+        snapshots.append(
+            {
+                "name": name,
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                # QueuePool counts overflow from -pool_size, only the part above 0 is
+                # actual overflow connections
+                "overflow": max(pool.overflow(), 0),
+                **stats.snapshot(),
+            }
+        )
+    return snapshots
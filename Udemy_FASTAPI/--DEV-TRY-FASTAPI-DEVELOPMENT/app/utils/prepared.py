@@ -0,0 +1,46 @@
+import os
+
+from sqlalchemy.dialects import postgresql
+
+# the hottest category statements (slug lookup, id lookup, duplicate check) run
+# as server side prepared statements: PREPARE once per connection, then EXECUTE,
+# so postgres does not parse and plan them again on every call. psycopg2 can not
+# prepare by itself (asyncpg does, see DB_PREPARED_STATEMENT_CACHE_SIZE in
+# db_connetion). turn it off behind pgbouncer in transaction mode, the next
+# transaction may run on a server connection that never saw the PREPARE
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# PREPARE takes $1, $2... placeholders
+NUMERIC_DOLLAR = postgresql.dialect(paramstyle="numeric_dollar")
+
+
+class PreparedStatement:
+    """
+    A statement with bindparams, built and compiled once. execute() runs it as
+    EXECUTE name(...) on the connection of the session, PREPAREd the first time
+    that connection sees it. The prepared names are kept in the info of the pooled
+    connection, which is emptied when the connection is closed or invalidated.
+
+    .statement is the plain statement, for the async sessions (asyncpg prepares
+    it) and for DB_PREPARED_STATEMENTS=false.
+    """
+
+    def __init__(self, name, statement):
+        self.name = name
+        self.statement = statement
+        compiled = statement.compile(dialect=NUMERIC_DOLLAR)
+        self.prepare_sql = f"PREPARE {name} AS {compiled}"
+        self.defaults = compiled.params  # the ones not passed in, like the LIMIT
+        placeholders = ", ".join(f"%({key})s" for key in compiled.positiontup)
+        self.execute_sql = f"EXECUTE {name}({placeholders})"
+
+    def execute(self, db, bind_arguments=None, **params):
+        if not DB_PREPARED_STATEMENTS:
+            return db.execute(self.statement, params, bind_arguments=bind_arguments)
+        # the replica for a read only session, unless bind_arguments say otherwise
+        connection = db.connection(bind_arguments=bind_arguments)
+        prepared = connection.info.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            connection.exec_driver_sql(self.prepare_sql)
+            prepared.add(self.name)
+        return connection.exec_driver_sql(self.execute_sql, {**self.defaults, **params})
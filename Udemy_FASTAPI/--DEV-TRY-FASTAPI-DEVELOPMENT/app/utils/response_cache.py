@@ -0,0 +1,334 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.db_connetion import RESPONSE_CACHE_ENABLED, wrote_recently
+from app.utils.cache import MISSING, TTLCache, register_cache
+from app.utils.category_etag import etag_matches
+from app.utils.category_events import register_invalidator
+
+logger = logging.getLogger(__name__)
+
+# the GET endpoints under /api/category answer repeated requests from a cache of
+# the responses they sent (status, headers and body). every entry is tagged with
+# what it was built from: category:{id} and category:slug:{slug} for a single
+# category, category:list for anything built from more than one. a committed
+# category write bumps the version of its tags and the entries holding an older
+# version are not served anymore. RESPONSE_CACHE_URL=redis://... keeps the entries
+# in redis (or anything speaking its protocol), shared by every worker and server,
+# otherwise every worker keeps its own. RESPONSE_CACHE_ENABLED is in db_connetion,
+# the last_write cookie of a write depends on it too
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_PREFIX = os.getenv("RESPONSE_CACHE_PREFIX", "responses:")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+# seconds. lists and trees change with every category write, a single category
+# only with its own
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_ITEM_TTL = float(os.getenv("RESPONSE_CACHE_ITEM_TTL", "300"))
+
+# request headers the responses depend on, the Link header of a page holds the
+# absolute url
+VARY_HEADERS = ("host", "accept")
+
+LIST_TAG = "category:list"
+# every entry carries it, bumped when the changes are not known (a reset)
+ALL_TAG = "category:all"
+# bumped by every change after its tags. a response computed while it moved is
+# not stored, it may hold the rows from before the change and the tag versions
+# from after it
+CHANGES = "changes"
+
+
+class MemoryBackend:
+    """
+    Entries in a TTLCache and tag versions in a dict, one per worker. The other
+    workers bump their tags through the category_events notifications
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.entries = TTLCache(maxsize=maxsize)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        return None if entry is MISSING else entry
+
+    async def set(self, key, entry, ttl):
+        self.entries.set(key, entry, ttl)
+
+    async def versions(self, names):
+        return [self._versions.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def stats(self):
+        stats = self.entries.stats()
+        return {
+            "size": stats["size"],
+            "maxsize": stats["maxsize"],
+            "evictions": stats["evictions"],
+            "expirations": stats["expirations"],
+        }
+
+
+class RedisBackend:
+    """
+    Entries and tag versions in redis, shared by every worker. Reads go through the
+    asyncio client. Bumps come from the after_commit hook of the session, which is
+    not async (and runs on the event loop with DB_ASYNC_MODE): they go through the
+    blocking client on a thread of their own, in commit order
+    """
+
+    def __init__(self, client, async_client, prefix=RESPONSE_CACHE_PREFIX, bumps=None):
+        self.client = client
+        self.async_client = async_client
+        self.prefix = prefix
+        self.bumps = bumps or ThreadPoolExecutor(1, thread_name_prefix="response-cache")
+
+    @classmethod
+    def from_url(cls, url, prefix=RESPONSE_CACHE_PREFIX):
+        # only needed with RESPONSE_CACHE_URL
+        import redis
+        import redis.asyncio
+
+        return cls(redis.Redis.from_url(url), redis.asyncio.Redis.from_url(url), prefix)
+
+    def _tag_keys(self, names):
+        return [f"{self.prefix}tag:{name}" for name in names]
+
+    async def get(self, key):
+        return await self.async_client.get(self.prefix + key)
+
+    async def set(self, key, entry, ttl):
+        await self.async_client.set(self.prefix + key, entry, px=int(ttl * 1000))
+
+    async def versions(self, names):
+        values = await self.async_client.mget(self._tag_keys(names))
+        return [int(value or 0) for value in values]
+
+    def _bump(self, names):
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key in self._tag_keys(names):
+                pipeline.incr(key)
+            pipeline.execute()
+        except Exception as e:
+            # the entries are served until they expire
+            logger.error(f"Invalidating cached responses failed: {e}")
+
+    def bump(self, names):
+        return self.bumps.submit(self._bump, names)
+
+    def stats(self):
+        # kept by redis itself (INFO), not per worker
+        return {"size": 0, "maxsize": 0, "evictions": 0, "expirations": 0}
+
+
+def request_key(request: Request):
+    parts = [
+        request.url.scheme,
+        *("=".join(item) for item in sorted(request.query_params.multi_items())),
+        *(request.headers.get(name, "") for name in VARY_HEADERS),
+    ]
+    digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return f"{request.url.path}:{digest}"
+
+
+def encode_entry(response: Response, tags):
+    meta = {
+        "headers": [
+            [name.decode("latin-1"), value.decode("latin-1")]
+            for name, value in response.raw_headers
+        ],
+        "tags": tags,
+    }
+    return json.dumps(meta).encode() + b"\n" + response.body
+
+
+class ResponseCache:
+    """
+    Serves the responses of cached_response endpoints from backend. on_change /
+    on_reset are the category_events invalidators
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def on_change(self, category_id=None, slug=None):
+        tags = [LIST_TAG]
+        if category_id is not None:
+            tags.append(f"category:{category_id}")
+        if slug is not None:
+            tags.append(f"category:slug:{slug}")
+        self._bump(tags)
+
+    def on_reset(self):
+        self._bump([ALL_TAG])
+
+    def clear(self):
+        self.on_reset()
+
+    def _bump(self, tags):
+        try:
+            self.backend.bump([*tags, CHANGES])
+        except Exception as e:
+            # the entries are served until they expire
+            logger.error(f"Invalidating cached responses failed: {e}")
+        with self._lock:
+            self.invalidations += 1
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    async def _cached_response(self, request: Request, entry):
+        meta, body = entry.split(b"\n", 1)
+        meta = json.loads(meta)
+        tags = meta["tags"]
+        if await self.backend.versions(list(tags)) != list(tags.values()):
+            return None  # a category it was built from changed since
+        headers = dict(meta["headers"])
+        surrogate_key = " ".join(tags)
+        etag = headers.get("etag")
+        if etag and etag_matches(request, etag):
+            return Response(
+                status_code=304,
+                headers={
+                    "ETag": etag,
+                    "Surrogate-Key": surrogate_key,
+                    "X-Cache": "HIT",
+                },
+            )
+        response = Response(content=body)
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in meta["headers"]
+        ]
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    async def serve(self, request: Request, handler, ttl, tags):
+        key = request_key(request)
+        try:
+            entry = await self.backend.get(key)
+            if entry is not None:
+                response = await self._cached_response(request, entry)
+                if response is not None:
+                    self._count(hit=True)
+                    return response
+            (changes,) = await self.backend.versions([CHANGES])
+        except Exception as e:
+            logger.error(f"Reading cached responses failed: {e}")
+            return await handler(request)
+        self._count(hit=False)
+
+        response = await handler(request)
+        body = getattr(response, "body", None)  # a streamed response has none
+        if response.status_code != 200 or body is None:
+            return response
+        entry_tags = [ALL_TAG, *tags(request, body)]
+        # the same tags, for a CDN in front of the api to purge by
+        response.headers["Surrogate-Key"] = " ".join(entry_tags)
+        try:
+            *versions, changes_now = await self.backend.versions([*entry_tags, CHANGES])
+            # a replica may not have replayed a write whose bump already landed,
+            # the CHANGES check only sees the ones during the handler
+            replica = getattr(request.state, "read_from_replica", False)
+            if changes_now == changes and not replica:
+                entry = encode_entry(response, dict(zip(entry_tags, versions)))
+                await self.backend.set(key, entry, ttl)
+        except Exception as e:
+            logger.error(f"Storing a cached response failed: {e}")
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                **self.backend.stats(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = register_cache(
+    "category_responses",
+    ResponseCache(
+        RedisBackend.from_url(RESPONSE_CACHE_URL)
+        if RESPONSE_CACHE_URL
+        else MemoryBackend()
+    ),
+)
+# in redis every worker sees the bumps of the one that wrote
+register_invalidator(
+    response_cache.on_change, response_cache.on_reset, shared=bool(RESPONSE_CACHE_URL)
+)
+
+
+def list_tags(request: Request, body):
+    # built from more than one category
+    return [LIST_TAG]
+
+
+def category_tags(request: Request, body):
+    # a single category, the id of a renamed slug is all the write knows of it
+    return [
+        f"category:slug:{request.path_params['category_slug']}",
+        f"category:{json.loads(body)['id']}",
+    ]
+
+
+def cached_response(ttl=RESPONSE_CACHE_TTL, tags=list_tags):
+    """
+    marks a GET endpoint of a CachedRoute router as cached for ttl seconds, tags
+    (request, body) returns the tags of a response
+    """
+
+    def decorate(endpoint):
+        endpoint.cached_response = (ttl, tags)
+        return endpoint
+
+    return decorate
+
+
+class CachedRoute(APIRoute):
+    """
+    route_class of the category routers: the endpoints marked with cached_response
+    are answered through response_cache while RESPONSE_CACHE_ENABLED
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        policy = getattr(self.endpoint, "cached_response", None)
+        if policy is None:
+            return handler
+        ttl, tags = policy
+
+        async def cached_handler(request: Request):
+            # a client that just wrote reads from the primary, not from what was
+            # cached before its write
+            if not RESPONSE_CACHE_ENABLED or wrote_recently(request):
+                return await handler(request)
+            return await response_cache.serve(request, handler, ttl, tags)
+
+        return cached_handler
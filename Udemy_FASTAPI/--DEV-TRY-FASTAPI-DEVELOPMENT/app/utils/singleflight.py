@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# concurrent identical reads (every request for a hot category right after its
+# cache entry expired) wait on the one already running and share its result,
+# instead of each running the same query. a waiter gives up after
+# SINGLEFLIGHT_TIMEOUT seconds and runs it itself
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "2"))
+# keys whose counters are kept per flight, the least recently used go first
+SINGLEFLIGHT_MAX_KEYS = int(os.getenv("SINGLEFLIGHT_MAX_KEYS", "1000"))
+
+# name -> SingleFlight for every flight we want to expose
+_registry = {}
+
+
+class _Call:
+    __slots__ = ("done", "finished", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        # false when the leader was interrupted (KeyboardInterrupt, a thread
+        # cancelled) before it had a result or an error to share
+        self.finished = False
+        self.result = None
+        self.error = None
+
+
+class KeyStats:
+    __slots__ = ("leaders", "followers", "timeouts", "errors", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.leaders = 0  # ran the call
+        self.followers = 0  # shared the result of a running one
+        self.timeouts = 0  # gave up waiting and ran it again
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class SingleFlight:
+    """
+    do(key, fn) from threadpool threads (plain def handlers), do_async(key, fn)
+    from the event loop (async def handlers, fn returns an awaitable). Only one
+    call per key runs at a time in a worker, the others get its result or its
+    exception. Nothing is kept once the call returns, caching the result is up
+    to fn.
+    """
+
+    def __init__(self, timeout=SINGLEFLIGHT_TIMEOUT, max_keys=SINGLEFLIGHT_MAX_KEYS):
+        self.timeout = timeout
+        self.max_keys = max_keys
+        self._calls = {}  # key -> _Call, threadpool
+        self._futures = {}  # key -> asyncio.Future, event loop only
+        self._stats = OrderedDict()  # key -> KeyStats, least recently used first
+        self._lock = threading.Lock()
+
+    def _key_stats(self, key):
+        # under self._lock
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = KeyStats()
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def _count(self, key, leader):
+        with self._lock:
+            stats = self._key_stats(key)
+            if leader:
+                stats.leaders += 1
+            else:
+                stats.followers += 1
+
+    def _record(self, key, waited=None, timeout=False, error=False):
+        with self._lock:
+            stats = self._key_stats(key)
+            if waited is not None:
+                stats.wait_total += waited
+                stats.wait_max = max(stats.wait_max, waited)
+            stats.timeouts += timeout
+            stats.errors += error
+
+    def do(self, key, fn):
+        if not SINGLEFLIGHT_ENABLED:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(key, leader)
+
+        if leader:
+            try:
+                call.result = fn()
+                call.finished = True
+                return call.result
+            except Exception as e:
+                call.error = e
+                call.finished = True
+                self._record(key, error=True)
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        started = time.perf_counter()
+        if not call.done.wait(self.timeout):
+            self._record(key, waited=time.perf_counter() - started, timeout=True)
+            logger.warning(f"Gave up waiting on the running call for {key!r}")
+            return fn()
+        self._record(key, waited=time.perf_counter() - started)
+        if not call.finished:
+            return self.do(key, fn)  # the leader was interrupted, not this request
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, fn):
+        if not SINGLEFLIGHT_ENABLED:
+            return await fn()
+        future = self._futures.get(key)
+        leader = future is None
+        self._count(key, leader)
+
+        if leader:
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                future.cancel()  # the followers run it themselves
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # retrieved, even without followers
+                self._record(key, error=True)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                del self._futures[key]
+
+        started = time.perf_counter()
+        # asyncio.wait neither cancels the call when this follower times out or is
+        # cancelled, nor raises what the call raised: a CancelledError here is
+        # always this request's own
+        done, _ = await asyncio.wait({future}, timeout=self.timeout)
+        if not done:
+            self._record(key, waited=time.perf_counter() - started, timeout=True)
+            logger.warning(f"Gave up waiting on the running call for {key!r}")
+            return await fn()
+        self._record(key, waited=time.perf_counter() - started)
+        if future.cancelled():
+            # the leader was cancelled (its client went away), not this request
+            return await self.do_async(key, fn)
+        return future.result()
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "key": str(key),
+                    "in_flight": key in self._calls or key in self._futures,
+                    "leaders": stats.leaders,
+                    "followers": stats.followers,
+                    "timeouts": stats.timeouts,
+                    "errors": stats.errors,
+                    "wait_avg_ms": (
+                        stats.wait_total / stats.followers * 1000
+                        if stats.followers
+                        else 0.0
+                    ),
+                    "wait_max_ms": stats.wait_max * 1000,
+                }
+                for key, stats in self._stats.items()
+            ]
+
+
+def register_flight(name, flight):
+    _registry[name] = flight
+    return flight
+
+
+def flight_snapshots():
+    return [
+        {"name": name, **snapshot}
+        for name, flight in _registry.items()
+        for snapshot in flight.snapshot()
+    ]
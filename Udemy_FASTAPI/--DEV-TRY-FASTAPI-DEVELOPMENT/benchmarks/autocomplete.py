@@ -0,0 +1,87 @@
+"""
+Build time, memory and lookup latency of the autocomplete index
+(app/utils/autocomplete.py), in memory only, no database:
+
+    python -m benchmarks.autocomplete --names 1000000
+
+The script makes up --names names of two to four random words (with a number
+on the end, so every name is different) and weights 0-100 like category levels,
+builds a PrefixIndex of them and looks up --lookups random prefixes of one to
+five letters, taken from the start of random names. The memory is what
+tracemalloc sees held by the index once the rows it was built from are gone:
+the names and slugs included.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.utils.autocomplete import PrefixIndex
+
+WORDS = (
+    "home kitchen garden tools outdoor electronics audio video computer phone "
+    "cable toys games books music sports fitness health beauty office school "
+    "baby pet food drinks coffee tea furniture lighting bath storage"
+).split()
+
+
+def make_rows(count):
+    return [
+        (
+            number,
+            " ".join(random.sample(WORDS, random.randint(2, 4))).title() + f" {number}",
+            f"bench-autocomplete-{number}",
+            random.randint(0, 100),
+        )
+        for number in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = make_rows(args.names)
+    print(f"names: {args.names}")
+
+    start = time.perf_counter()
+    index = PrefixIndex(rows)
+    print(f"  build: {time.perf_counter() - start:.2f} s")
+
+    # the names and slugs belong to the index once the rows are gone, like the
+    # rows of the query in Autocomplete.build
+    del index, rows
+    tracemalloc.start()
+    rows = make_rows(args.names)
+    index = PrefixIndex(rows)
+    del rows
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  memory: {memory / 2**20:.0f} MiB ({memory / args.names:.0f} bytes per name)"
+    )
+
+    for length in range(1, 6):
+        prefixes = [
+            random.choice(index.names)[:length].casefold() for _ in range(args.lookups)
+        ]
+        latencies = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            found = index.top(prefix, args.limit)
+            latencies.append(time.perf_counter() - start)
+            assert found
+        latencies.sort()
+        print(
+            f"  prefix of {length}: p50 {statistics.median(latencies) * 1e6:.0f} us  "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Time to resolve category breadcrumbs, straight against the database in
+DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_breadcrumbs --nodes 100000 --depth 12 --batch 500
+
+The script inserts its own tree (slugs starting with bench-tree-, see
+benchmarks.category_tree) and resolves the breadcrumbs of --batch random
+categories on its deepest level three ways:
+
+"parent walk" follows parent_id up, one query per level and category.
+"ancestors query" is category_ancestors (GET /{id}/ancestors), one query per
+category.
+"index" is the in-memory CategoryBreadcrumbs (GET /{id}/breadcrumbs and
+POST /breadcrumbs), one get per category and one get_many for the whole batch.
+
+The load of the index (every category in the table, not only the tree) is
+reported on its own, and so is the refresh after a category halfway up one of the
+breadcrumbs gets renamed. The tree is deleted again at the end.
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils.category_breadcrumbs import CategoryBreadcrumbs
+from app.utils.category_tree import CATEGORY_TREE_MAX_DEPTH, category_ancestors
+from benchmarks.category_mutations import RoundTrips
+from benchmarks.category_tree import SLUG_PREFIX, insert_tree
+
+
+def breadcrumb_parent_walk(db, category_id):
+    breadcrumb = []
+    while category_id is not None:
+        row = db.execute(
+            select(Category.id, Category.name, Category.slug, Category.parent_id).where(
+                Category.id == category_id
+            )
+        ).one()
+        breadcrumb.append({"id": row.id, "name": row.name, "slug": row.slug})
+        category_id = row.parent_id
+    return breadcrumb[::-1]
+
+
+def breadcrumb_ancestors(db, category_id):
+    breadcrumb, node = [], category_ancestors(db, category_id, CATEGORY_TREE_MAX_DEPTH)
+    while node:
+        breadcrumb.append(
+            {"id": node["id"], "name": node["name"], "slug": node["slug"]}
+        )
+        node = node["children"][0] if node["children"] else None
+    return breadcrumb
+
+
+def timed(Session, round_trips, work):
+    with Session() as db:
+        round_trips.count = 0
+        start = time.perf_counter()
+        result = work(db)
+        return time.perf_counter() - start, round_trips.count, result
+
+
+def report(name, elapsed, queries, lookups):
+    print(
+        f"{name}: {elapsed * 1000:.1f} ms  "
+        f"({elapsed / lookups * 1e6:.1f} us per category)  queries: {queries}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    round_trips = RoundTrips(engine)
+    try:
+        insert_tree(engine, args.nodes, args.depth)
+        with Session() as db:
+            deepest = db.scalars(
+                select(Category.id).where(
+                    Category.slug.startswith(SLUG_PREFIX),
+                    Category.level == args.depth,
+                )
+            ).all()
+        ids = random.sample(deepest, min(args.batch, len(deepest)))
+        print(f"tree: {args.nodes + 1} nodes, {args.depth + 1} levels")
+        print(f"breadcrumbs of {len(ids)} categories on level {args.depth}")
+
+        for name, strategy in (
+            ("parent walk", breadcrumb_parent_walk),
+            ("ancestors query", breadcrumb_ancestors),
+        ):
+            elapsed, queries, _ = timed(
+                Session,
+                round_trips,
+                lambda db: [strategy(db, category_id) for category_id in ids],
+            )
+            report(name, elapsed, queries, len(ids))
+
+        index = CategoryBreadcrumbs(Session)
+        elapsed, queries, _ = timed(Session, round_trips, lambda db: index.get(ids[0]))
+        print(f"index load: {elapsed * 1000:.1f} ms  queries: {queries}")
+        elapsed, queries, _ = timed(
+            Session,
+            round_trips,
+            lambda db: [index.get(category_id) for category_id in ids],
+        )
+        report("index get", elapsed, queries, len(ids))
+        elapsed, queries, _ = timed(
+            Session, round_trips, lambda db: index.get_many(ids)
+        )
+        report("index get_many", elapsed, queries, len(ids))
+
+        # what the invalidator does once a rename commits, of the category
+        # halfway up the breadcrumb of the first one
+        middle_id = index.get(ids[0])[args.depth // 2]["id"]
+        with engine.begin() as connection:
+            connection.execute(
+                update(Category)
+                .where(Category.id == middle_id)
+                .values(name=f"{SLUG_PREFIX}renamed")
+            )
+        index.on_change(middle_id)
+        elapsed, queries, breadcrumbs = timed(
+            Session, round_trips, lambda db: index.get_many(ids)
+        )
+        renamed = sum(
+            any(crumb["id"] == middle_id for crumb in breadcrumb)
+            for breadcrumb in breadcrumbs.values()
+        )
+        report(
+            f"index get_many after a rename ({renamed} below it)",
+            elapsed,
+            queries,
+            len(ids),
+        )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
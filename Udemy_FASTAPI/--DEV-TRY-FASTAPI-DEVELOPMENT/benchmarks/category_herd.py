@@ -0,0 +1,94 @@
+"""
+A thundering herd on one slug: --threads concurrent lookups of the same
+category right after its cache entry expired, with and without the single
+flight of app/utils/singleflight.py, straight against the database in
+DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_herd --threads 50
+
+Every round clears the slug cache and lets --threads threads, each with its own
+session like one request per thread, call load_category (what GET /slug/{slug}
+does on a miss) at the same time. It reports the statements sent to postgres and
+the time until the last thread got its category, per round. The category is
+inserted before and deleted again at the end.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from sqlalchemy import create_engine, delete, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils import singleflight
+from app.utils.category_cache import category_slug_cache, load_category
+
+SLUG = "bench-herd-category"
+
+
+def herd(Session, threads):
+    barrier = threading.Barrier(threads + 1)
+    found = []
+
+    def request():
+        with Session() as db:
+            db.connection()  # checked out before the herd starts
+            barrier.wait()
+            found.append(load_category(db, SLUG))
+
+    workers = [threading.Thread(target=request) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    assert len(found) == threads and all(found)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        DEV_DATABASE_URL, pool_size=args.threads, max_overflow=0, pool_timeout=60
+    )
+    Session = sessionmaker(bind=engine)
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    try:
+        with engine.begin() as connection:
+            connection.execute(insert(Category).values(name=SLUG, slug=SLUG))
+        herd(Session, args.threads)  # opens the pool connections
+        for enabled in (False, True):
+            singleflight.SINGLEFLIGHT_ENABLED = enabled
+            timings, counts = [], []
+            for _ in range(args.rounds):
+                category_slug_cache.clear()
+                statements.clear()
+                timings.append(herd(Session, args.threads))
+                # a checkout of a pooled connection runs no statement, the
+                # lookups are the PREPARE / EXECUTE or SELECT statements
+                counts.append(len(statements))
+            print(
+                f"single flight {'on' if enabled else 'off'}: "
+                f"{statistics.mean(counts):.0f} statements per herd  "
+                f"p50 {statistics.median(timings) * 1000:.1f} ms  "
+                f"max {max(timings) * 1000:.1f} ms"
+            )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(delete(Category).where(Category.slug == SLUG))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
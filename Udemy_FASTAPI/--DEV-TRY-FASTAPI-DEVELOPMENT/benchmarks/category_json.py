@@ -0,0 +1,128 @@
+"""
+Cost of answering GET /api/category/ with the default response path against the
+CATEGORY_FAST_JSON one, for pages far bigger than MAX_PAGE_SIZE to see how both
+scale, straight against the database in DEV_DATABASE_URL (no http in between):
+
+    python -m benchmarks.category_json --rows 1000 --rows 10000 --rows 100000
+
+The script inserts max(--rows) categories (slugs starting with bench-json-) and
+builds the response body for the first --rows categories of the endpoint order
+(level, id) both ways:
+
+"orm + response_model" loads Category objects and runs them through what fastapi
+does with a response_model: validation with List[CategoryReturn] and the stdlib
+json of JSONResponse.
+"rows + orjson" selects the CategoryReturn columns and writes them with
+rows_response, as the endpoint does with CATEGORY_FAST_JSON=true.
+
+Both bodies are compared byte for byte. The categories in the table before the
+run are included as well. The rows are deleted again at the end.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.schemas.category_schema import CategoryReturn
+from app.utils.category_utils import CATEGORY_RETURN_COLUMNS, CATEGORY_RETURN_FIELDS
+from app.utils.fast_json import rows_response
+
+SLUG_PREFIX = "bench-json-"
+RESPONSE_FIELD = create_response_field(
+    name="Response_get_categories", type_=List[CategoryReturn]
+)
+
+
+def insert_categories(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [
+                {
+                    "name": f"Bench Json {number}",
+                    "slug": f"{SLUG_PREFIX}{number}",
+                    "level": number % 10,
+                }
+                for number in range(rows)
+            ],
+        )
+
+
+def orm_response_model(db, rows):
+    start = time.perf_counter()
+    categories = db.scalars(
+        select(Category).order_by(Category.level, Category.id).limit(rows)
+    ).all()
+    queried = time.perf_counter()
+    content = asyncio.run(
+        serialize_response(field=RESPONSE_FIELD, response_content=categories)
+    )
+    body = JSONResponse(content).body
+    return body, queried - start, time.perf_counter() - queried
+
+
+def rows_orjson(db, rows):
+    start = time.perf_counter()
+    result = db.execute(
+        select(*CATEGORY_RETURN_COLUMNS)
+        .order_by(Category.level, Category.id)
+        .limit(rows)
+    ).all()
+    queried = time.perf_counter()
+    body = rows_response(result, CATEGORY_RETURN_FIELDS).body
+    return body, queried - start, time.perf_counter() - queried
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, action="append", dest="sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sizes = args.sizes or [1000, 10000, 100000]
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    strategies = [
+        ("orm + response_model", orm_response_model),
+        ("rows + orjson", rows_orjson),
+    ]
+    try:
+        insert_categories(engine, max(sizes))
+        print(f"inserted {max(sizes)} categories")
+        for rows in sizes:
+            print(f"rows={rows}")
+            bodies = []
+            for name, strategy in strategies:
+                timings = []
+                for _ in range(args.repeat):
+                    with Session() as db:
+                        body, query, serialize = strategy(db, rows)
+                    timings.append((query + serialize, query, serialize))
+                total, query, serialize = min(timings)
+                bodies.append(body)
+                print(
+                    f"  {name}: best {total * 1000:.1f} ms "
+                    f"(query {query * 1000:.1f} ms, "
+                    f"serialize {serialize * 1000:.1f} ms)  "
+                    f"{rows / total:.0f} rows/s"
+                )
+            assert bodies[0] == bodies[1], "the two bodies differ"
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
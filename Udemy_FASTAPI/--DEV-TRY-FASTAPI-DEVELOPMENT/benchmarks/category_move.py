@@ -0,0 +1,78 @@
+"""
+Time to move a whole category branch, straight against the database in
+DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_move --nodes 50000 --depth 12
+
+The script inserts its own branch (slugs starting with bench-tree-, see
+benchmarks.category_tree) plus two top level parents, and moves the branch back
+and forth between them with move_category (POST /{id}/move), one transaction per
+move. Every move rewrites the path of each category in the branch. The rows are
+deleted again at the end.
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils.category_tree import move_category
+from benchmarks.category_mutations import RoundTrips
+from benchmarks.category_tree import SLUG_PREFIX, insert_tree
+
+
+def insert_parents(engine):
+    with engine.begin() as connection:
+        return list(
+            connection.execute(
+                insert(Category).returning(Category.id, sort_by_parameter_order=True),
+                [
+                    {"name": slug, "slug": slug, "level": 0}
+                    for slug in (f"{SLUG_PREFIX}parent-a", f"{SLUG_PREFIX}parent-b")
+                ],
+            ).scalars()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=6)
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    round_trips = RoundTrips(engine)
+    try:
+        branch_id, _ = insert_tree(engine, args.nodes, args.depth)
+        parents = insert_parents(engine)
+        print(f"branch: {args.nodes + 1} nodes, {args.depth + 1} levels")
+        timings = []
+        for number in range(args.repeat):
+            with Session() as db:
+                round_trips.count = 0
+                start = time.perf_counter()
+                _, moved = move_category(db, branch_id, parents[number % 2])
+                db.commit()
+                timings.append(time.perf_counter() - start)
+        print(f"  moved: {moved}  round trips: {round_trips.count}")
+        print(
+            f"  best: {min(timings) * 1000:.0f} ms  "
+            f"median: {statistics.median(timings) * 1000:.0f} ms  "
+            f"worst: {max(timings) * 1000:.0f} ms"
+        )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
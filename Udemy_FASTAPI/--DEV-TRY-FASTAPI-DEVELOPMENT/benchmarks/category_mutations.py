@@ -0,0 +1,145 @@
+"""
+Round trips and latency of the category update/delete paths, straight against the
+database in DEV_DATABASE_URL (no api in between, so only the sql differs):
+
+    python -m benchmarks.category_mutations --rows 2000 --concurrency 16
+
+"load" is how update_category / delete_category used to work: load the row, change
+it through the ORM, flush, commit and refresh. "returning" is the single
+UPDATE/DELETE ... RETURNING they run now. The script inserts its own rows (slugs
+starting with bench-mutation-) and deletes what is left of them at the end.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, delete, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.schemas.category_schema import CategoryUpdate
+from app.utils.category_utils import (
+    delete_category_statement,
+    update_category_statement,
+)
+
+SLUG_PREFIX = "bench-mutation-"
+
+
+class RoundTrips:
+    # statements plus commits/rollbacks sent to postgres, counted per connection event
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        for name in ("before_cursor_execute", "commit", "rollback"):
+            event.listen(engine, name, self._increment)
+
+    def _increment(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+def update_with_load(db, category_id, data):
+    category = db.query(Category).filter(Category.id == category_id).first()
+    for key, value in data.model_dump().items():
+        setattr(category, key, value)
+    db.commit()
+    db.refresh(category)
+
+
+def update_with_returning(db, category_id, data):
+    db.execute(update_category_statement(category_id, data)).scalars().first()
+    db.commit()
+
+
+def delete_with_load(db, category_id, data):
+    category = db.query(Category).filter(Category.id == category_id).first()
+    db.delete(category)
+    db.commit()
+
+
+def delete_with_returning(db, category_id, data):
+    db.execute(delete_category_statement(category_id)).first()
+    db.commit()
+
+
+def insert_rows(engine, rows, run):
+    with engine.begin() as connection:
+        return list(
+            connection.execute(
+                insert(Category).returning(Category.id),
+                [
+                    {
+                        "name": f"{SLUG_PREFIX}{run}-{number}",
+                        "slug": f"{SLUG_PREFIX}{run}-{number}",
+                        "level": 1,
+                    }
+                    for number in range(rows)
+                ],
+            ).scalars()
+        )
+
+
+def measure(Session, operation, ids, concurrency):
+    latencies = []
+
+    def call(category_id):
+        data = CategoryUpdate(
+            name=f"{SLUG_PREFIX}{category_id}",
+            slug=f"{SLUG_PREFIX}{category_id}",
+            level=2,
+        )
+        start = time.perf_counter()
+        with Session() as db:
+            operation(db, category_id, data)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(call, ids))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, ids, round_trips, elapsed, latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name}")
+    print(f"  round trips per call: {round_trips / len(ids):.2f}")
+    print(f"  throughput: {len(ids) / elapsed:.1f} calls/s")
+    print(f"  p50: {quantiles[49] * 1000:.2f} ms  p99: {quantiles[98] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL, pool_size=args.concurrency, max_overflow=0)
+    Session = sessionmaker(bind=engine)
+    round_trips = RoundTrips(engine)
+    operations = [
+        ("update: load + setattr + commit + refresh", update_with_load),
+        ("update: UPDATE ... RETURNING", update_with_returning),
+        ("delete: load + delete + commit", delete_with_load),
+        ("delete: DELETE ... RETURNING", delete_with_returning),
+    ]
+    try:
+        for run, (name, operation) in enumerate(operations):
+            ids = insert_rows(engine, args.rows, run)
+            round_trips.count = 0
+            elapsed, latencies = measure(Session, operation, ids, args.concurrency)
+            report(name, ids, round_trips.count, elapsed, latencies)
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+CPU time and memory of loading categories through the ORM against the Core read
+path of app/utils/category_reads.py, straight against the database in
+DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_reads --rows 10000
+
+The script inserts --rows categories (slugs starting with bench-read-) and loads
+the first --rows categories of the GET /api/category/ order (level, id) three
+ways:
+
+"orm" is db.query(Category), what the read endpoints used to do: one Category
+per row, registered in the identity map of the session.
+"core rows" selects the CategoryReturn columns, plain Row tuples.
+"records" turns those rows into CategoryRecords, what the endpoints return now.
+
+For each it reports the CPU time (process time, the driver included) of the
+load and of the response_model validation into CategoryReturn, and with
+tracemalloc the memory still held once the load is done (session open, like
+during a request) and the peak while loading. The categories in the table before
+the run are included as well. The rows are deleted again at the end.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.schemas.category_schema import CategoryReturn
+from app.utils.category_reads import category_page_statement, category_records
+
+SLUG_PREFIX = "bench-read-"
+RESPONSE_ADAPTER = TypeAdapter(List[CategoryReturn])
+
+
+def insert_categories(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [
+                {
+                    "name": f"Bench Read {number}",
+                    "slug": f"{SLUG_PREFIX}{number}",
+                    "level": number % 10,
+                }
+                for number in range(rows)
+            ],
+        )
+
+
+def load_orm(db, rows):
+    return db.query(Category).order_by(Category.level, Category.id).limit(rows).all()
+
+
+def load_core_rows(db, rows):
+    return db.execute(category_page_statement(None, rows - 1)).all()
+
+
+def load_records(db, rows):
+    return category_records(db.execute(category_page_statement(None, rows - 1)).all())
+
+
+def measure(Session, load, rows, repeat):
+    load_cpu, validate_cpu = [], []
+    for _ in range(repeat):
+        with Session() as db:
+            start = time.process_time()
+            result = load(db, rows)
+            loaded = time.process_time()
+            RESPONSE_ADAPTER.validate_python(result, from_attributes=True)
+            load_cpu.append(loaded - start)
+            validate_cpu.append(time.process_time() - loaded)
+        assert len(result) == rows, f"only {len(result)} categories loaded"
+    with Session() as db:
+        tracemalloc.start()
+        result = load(db, rows)
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return min(load_cpu), min(validate_cpu), held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    strategies = [
+        ("orm", load_orm),
+        ("core rows", load_core_rows),
+        ("records", load_records),
+    ]
+    per = 10000 / args.rows
+    try:
+        insert_categories(engine, args.rows)
+        print(f"inserted {args.rows} categories, figures per 10k rows")
+        for name, load in strategies:
+            load_cpu, validate_cpu, held, peak = measure(
+                Session, load, args.rows, args.repeat
+            )
+            print(
+                f"  {name}: load {load_cpu * per * 1000:.1f} ms cpu  "
+                f"validate {validate_cpu * per * 1000:.1f} ms cpu  "
+                f"held {held * per / 2**20:.1f} MiB  "
+                f"peak {peak * per / 2**20:.1f} MiB"
+            )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
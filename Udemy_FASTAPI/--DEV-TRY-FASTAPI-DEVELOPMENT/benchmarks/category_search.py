@@ -0,0 +1,116 @@
+"""
+Category search, the ix_category_search gin index against a full scan with
+ILIKE, straight against the database in DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_search --rows 100000
+
+The script inserts --rows categories (slugs starting with bench-search-) named
+after a few random words of a small vocabulary, then times every --query both
+ways:
+
+"gin index" is search_categories (GET /api/category/search), every word of the
+query as a prefix, ranked.
+"ilike scan" requires every word in the name or the slug with
+ILIKE '%word%', which can only be answered by reading every category.
+
+Both return at most --limit categories. The categories in the table before the
+run are searched as well. The rows are deleted again at the end.
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import and_, create_engine, delete, func, insert, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils.category_search import search_categories, search_terms
+
+SLUG_PREFIX = "bench-search-"
+WORDS = (
+    "home kitchen garden tools outdoor electronics audio video computer phone "
+    "cable toys games books music sports fitness health beauty office school "
+    "baby pet food drinks coffee tea furniture lighting bath storage"
+).split()
+QUERIES = ["kitchen", "kit", "garden tools", "phone cable", "bench search 4242"]
+
+
+def insert_categories(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [
+                {
+                    "name": " ".join(random.sample(WORDS, 3)).title() + f" {number}",
+                    "slug": f"{SLUG_PREFIX}{number}",
+                    "level": 0,
+                }
+                for number in range(rows)
+            ],
+        )
+
+
+def search_ilike(db, q, limit):
+    return db.scalars(
+        select(Category)
+        .where(
+            and_(
+                *(
+                    or_(
+                        Category.name.ilike(f"%{term}%"),
+                        Category.slug.ilike(f"%{term}%"),
+                    )
+                    for term in search_terms(q)
+                )
+            )
+        )
+        .order_by(Category.name, Category.id)
+        .limit(limit)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--query", action="append", dest="queries")
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    strategies = [
+        ("gin index", lambda db, q: search_categories(db, q, args.limit)),
+        ("ilike scan", lambda db, q: search_ilike(db, q, args.limit)),
+    ]
+    try:
+        insert_categories(engine, args.rows)
+        with Session() as db:
+            total = db.scalar(select(func.count()).select_from(Category))
+        print(f"inserted {args.rows} categories, {total} in the table")
+        for q in args.queries or QUERIES:
+            print(f"q={q!r}")
+            for name, strategy in strategies:
+                timings = []
+                for _ in range(args.repeat):
+                    with Session() as db:
+                        start = time.perf_counter()
+                        found = strategy(db, q)
+                        timings.append(time.perf_counter() - start)
+                print(
+                    f"  {name}: {len(found)} found  "
+                    f"best: {min(timings) * 1000:.1f} ms  "
+                    f"mean: {sum(timings) / len(timings) * 1000:.1f} ms"
+                )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
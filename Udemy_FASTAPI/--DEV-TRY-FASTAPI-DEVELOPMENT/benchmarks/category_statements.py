@@ -0,0 +1,170 @@
+"""
+Per call cost of the hot category lookups, built per call against the prebuilt
+and prepared statements of app/utils/prepared.py, straight against the database
+in DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_statements --calls 5000
+
+The script inserts --rows categories (slugs starting with bench-stmt-) and runs
+--calls lookups of random ones per lookup and strategy, each in its own session
+like one per request:
+
+"orm query" is db.query(Category).filter(...).first(), what the endpoints did.
+"select per call" builds the Core select of the CategoryReturn columns per call.
+"prebuilt" executes the module level statement with bound parameters.
+"prepared" is PreparedStatement.execute: EXECUTE of a statement PREPAREd once
+per connection.
+
+The lookups are the slug lookup of GET /slug/{slug} and the duplicate check of
+check_existing_category. It reports the wall time and the CPU time of this
+process (building, compiling, the driver; not postgres) per call. The rows are
+deleted again at the end.
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils import prepared
+from app.utils.category_reads import CATEGORY_BY_SLUG
+from app.utils.category_utils import CATEGORY_RETURN_COLUMNS, EXISTING_CATEGORY
+
+SLUG_PREFIX = "bench-stmt-"
+
+
+def insert_categories(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [
+                {
+                    "name": f"Bench Statement {number}",
+                    "slug": f"{SLUG_PREFIX}{number}",
+                    "level": number % 10,
+                }
+                for number in range(rows)
+            ],
+        )
+
+
+def by_slug_strategies():
+    return [
+        (
+            "orm query",
+            lambda db, number: (
+                db.query(Category)
+                .filter(Category.slug == f"{SLUG_PREFIX}{number}")
+                .first()
+            ),
+        ),
+        (
+            "select per call",
+            lambda db, number: db.execute(
+                select(*CATEGORY_RETURN_COLUMNS)
+                .where(Category.slug == f"{SLUG_PREFIX}{number}")
+                .limit(1)
+            ).first(),
+        ),
+        (
+            "prebuilt",
+            lambda db, number: db.execute(
+                CATEGORY_BY_SLUG.statement, {"slug": f"{SLUG_PREFIX}{number}"}
+            ).first(),
+        ),
+        (
+            "prepared",
+            lambda db, number: CATEGORY_BY_SLUG.execute(
+                db, slug=f"{SLUG_PREFIX}{number}"
+            ).first(),
+        ),
+    ]
+
+
+def existing_strategies():
+    def params(number):
+        return {
+            "slug": f"{SLUG_PREFIX}{number}",
+            "name": f"Bench Statement {number}",
+            "level": number % 10,
+        }
+
+    def orm_query(db, number):
+        values = params(number)
+        return (
+            db.query(Category)
+            .filter(
+                (Category.slug == values["slug"])
+                | (Category.name == values["name"])
+                & (Category.level == values["level"])
+            )
+            .first()
+        )
+
+    return [
+        ("orm query", orm_query),
+        (
+            "prebuilt",
+            lambda db, number: db.execute(
+                EXISTING_CATEGORY.statement, params(number)
+            ).first(),
+        ),
+        (
+            "prepared",
+            lambda db, number: EXISTING_CATEGORY.execute(db, **params(number)).first(),
+        ),
+    ]
+
+
+def measure(Session, lookup, numbers):
+    wall, cpu = time.perf_counter(), time.process_time()
+    for number in numbers:
+        with Session() as db:
+            assert lookup(db, number) is not None
+    return (
+        (time.perf_counter() - wall) / len(numbers),
+        (time.process_time() - cpu) / len(numbers),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    prepared.DB_PREPARED_STATEMENTS = True
+    # one connection, so every strategy runs on the same (already prepared) one
+    engine = create_engine(DEV_DATABASE_URL, pool_size=1)
+    Session = sessionmaker(bind=engine)
+    lookups = [
+        ("slug lookup", by_slug_strategies()),
+        ("duplicate check", existing_strategies()),
+    ]
+    try:
+        insert_categories(engine, args.rows)
+        print(f"inserted {args.rows} categories, {args.calls} calls each")
+        for lookup_name, strategies in lookups:
+            print(lookup_name)
+            for name, lookup in strategies:
+                measure(Session, lookup, range(100))  # warm the caches
+                numbers = [random.randrange(args.rows) for _ in range(args.calls)]
+                wall, cpu = measure(Session, lookup, numbers)
+                print(
+                    f"  {name}: {wall * 1e6:.0f} us per call  "
+                    f"{cpu * 1e6:.0f} us cpu per call"
+                )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput benchmark for the category read endpoints.
+
+Run the api once per mode and point this script at it, e.g.
+
+    DB_ASYNC_MODE=false uvicorn app.main:app --port 8000
+    python -m benchmarks.category_throughput --url http://127.0.0.1:8000
+
+    DB_ASYNC_MODE=true uvicorn app.main:app --port 8000
+    python -m benchmarks.category_throughput --url http://127.0.0.1:8000
+
+and compare the requests/sec and latency percentiles of the two runs.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client, path, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url, path, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                worker(client, path, deadline, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+    return latencies, errors
+
+
+def report(path, concurrency, duration, latencies, errors):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    print(f"{path}  concurrency={concurrency}")
+    print(f"  requests: {len(latencies)}  errors: {len(errors)}")
+    print(f"  throughput: {len(latencies) / duration:.1f} req/s")
+    if quantiles:
+        print(
+            f"  p50: {quantiles[49] * 1000:.1f} ms  "
+            f"p95: {quantiles[94] * 1000:.1f} ms  "
+            f"p99: {quantiles[98] * 1000:.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--path",
+        action="append",
+        help="endpoint(s) to hit, defaults to the category list",
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    for path in args.path or ["/api/category/"]:
+        latencies, errors = asyncio.run(
+            run(args.url, path, args.concurrency, args.duration)
+        )
+        report(path, args.concurrency, args.duration, latencies, errors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Time to rebuild a category subtree, straight against the database in
+DEV_DATABASE_URL (no api in between):
+
+    python -m benchmarks.category_tree --nodes 100000 --depth 12
+
+The script inserts its own tree (slugs starting with bench-tree-): one root and
+--nodes more categories spread evenly over --depth levels below it, each with a
+random parent on the level above. It then rebuilds the nested subtree of the root
+four ways:
+
+"materialized path" is category_subtree (GET /{id}/subtree), one range scan on
+category_path.
+"recursive cte" is one WITH RECURSIVE query walking parent_id, what
+category_subtree did before the materialized path.
+"query per level" asks for the children of the previous level, one query per level.
+"whole table" fetches every category (like paging through GET /api/category/ does)
+and walks parent_id in python.
+
+Both the subtree of the root (all of the tree) and of a category halfway down are
+timed. The tree is deleted again at the end.
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import (
+    Integer,
+    any_,
+    bindparam,
+    create_engine,
+    delete,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased, sessionmaker
+
+from app.db_connetion import DEV_DATABASE_URL
+from app.models import Category
+from app.utils.category_tree import (
+    category_subtree,
+    nest,
+    tree_columns,
+    tree_node,
+)
+from benchmarks.category_mutations import RoundTrips
+
+SLUG_PREFIX = "bench-tree-"
+
+
+def insert_tree(engine, nodes, depth):
+    # level by level, every level needs the ids of the one above
+    per_level = [nodes // depth + (level < nodes % depth) for level in range(depth)]
+    number = 0
+    with engine.begin() as connection:
+
+        def insert_level(level, parents):
+            nonlocal number
+            rows = []
+            for parent_id in parents:
+                rows.append(
+                    {
+                        "name": f"{SLUG_PREFIX}{number}",
+                        "slug": f"{SLUG_PREFIX}{number}",
+                        "level": level,
+                        "parent_id": parent_id,
+                    }
+                )
+                number += 1
+            return list(
+                connection.execute(
+                    insert(Category).returning(
+                        Category.id, sort_by_parameter_order=True
+                    ),
+                    rows,
+                ).scalars()
+            )
+
+        root_id = insert_level(0, [None])[0]
+        above = [root_id]
+        for level, size in enumerate(per_level, start=1):
+            above = insert_level(level, [random.choice(above) for _ in range(size)])
+            if level == depth // 2:
+                middle_id = above[0]
+    return root_id, middle_id
+
+
+def subtree_recursive(db, root_id, max_depth):
+    walk = (
+        select(*tree_columns(Category), literal(0).label("depth"))
+        .where(Category.id == root_id)
+        .cte("walk", recursive=True)
+    )
+    child = aliased(Category)
+    walk = walk.union_all(
+        select(*tree_columns(child), walk.c.depth + 1)
+        .join(walk, child.parent_id == walk.c.id)
+        .where(walk.c.depth < max_depth)
+    )
+    rows = db.execute(select(walk).order_by(walk.c.depth, walk.c.id)).all()
+    return nest(rows)[0]
+
+
+def subtree_per_level(db, root_id, max_depth):
+    root = tree_node(
+        db.execute(select(*tree_columns(Category)).where(Category.id == root_id)).one()
+    )
+    level = {root_id: root}
+    for _ in range(max_depth):
+        rows = db.execute(
+            select(*tree_columns(Category))
+            .where(
+                Category.parent_id
+                == any_(bindparam("ids", list(level), type_=ARRAY(Integer)))
+            )
+            .order_by(Category.id)
+        )
+        below = {}
+        for row in rows:
+            below[row.id] = tree_node(row)
+            level[row.parent_id]["children"].append(below[row.id])
+        if not below:
+            break
+        level = below
+    return root
+
+
+def subtree_whole_table(db, root_id, max_depth):
+    nodes, children = {}, {}
+    for row in db.execute(select(*tree_columns(Category)).order_by(Category.id)):
+        nodes[row.id] = tree_node(row)
+        children.setdefault(row.parent_id, []).append(row.id)
+
+    def attach(category_id, depth):
+        if depth < max_depth:
+            for child_id in children.get(category_id, ()):
+                nodes[category_id]["children"].append(nodes[child_id])
+                attach(child_id, depth + 1)
+
+    attach(root_id, 0)
+    return nodes[root_id]
+
+
+def count(tree):
+    return 1 + sum(count(child) for child in tree["children"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(DEV_DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    round_trips = RoundTrips(engine)
+    strategies = [
+        ("materialized path", category_subtree),
+        ("recursive cte", subtree_recursive),
+        ("query per level", subtree_per_level),
+        ("whole table", subtree_whole_table),
+    ]
+    try:
+        root_id, middle_id = insert_tree(engine, args.nodes, args.depth)
+        print(f"tree: {args.nodes + 1} nodes, {args.depth + 1} levels")
+        for start_id in (root_id, middle_id):
+            for name, strategy in strategies:
+                timings = []
+                for _ in range(args.repeat):
+                    with Session() as db:
+                        round_trips.count = 0
+                        start = time.perf_counter()
+                        tree = strategy(db, start_id, args.depth)
+                        timings.append(time.perf_counter() - start)
+                        queries = round_trips.count
+                print(f"subtree of {start_id}: {name}")
+                print(f"  nodes: {count(tree)}  queries: {queries}")
+                print(
+                    f"  best: {min(timings) * 1000:.1f} ms  "
+                    f"mean: {sum(timings) / len(timings) * 1000:.1f} ms"
+                )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                delete(Category).where(Category.slug.startswith(SLUG_PREFIX))
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
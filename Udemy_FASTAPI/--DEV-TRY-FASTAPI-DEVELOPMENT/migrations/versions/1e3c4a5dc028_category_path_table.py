@@ -0,0 +1,175 @@
+"""category path table
+
+Revision ID: 1e3c4a5dc028
+Revises: 341730b4ff21
+Create Date: 2026-10-18 08:47:40.221453
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e3c4a5dc028'
+down_revision: Union[str, None] = '341730b4ff21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the path moves from category.path to the narrow category_path table, a move
+# rewrites the path of every category in the subtree and that is several times
+# cheaper there (two indexes instead of six).
+#
+# both triggers take the hierarchy lock (app/utils/category_tree.py,
+# lock_hierarchy): a parent_id change exclusively, an insert below a parent shared.
+# without it two concurrent moves can each pass the cycle check and close a loop
+# together, and a child inserted while its parent moves keeps the old path. the
+# SELECTs after the lock see what the previous holder committed.
+# the cycle error starts with category_path_cycle so the routes can recognise it
+# in the error text (raise_if_parent_cycle) with psycopg2 and asyncpg alike
+PATH_INSERT = """
+CREATE FUNCTION category_path_insert() RETURNS trigger AS $$
+BEGIN
+    IF NEW.parent_id IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock_shared(hashtext('category_path'));
+    END IF;
+    INSERT INTO category_path (category_id, path)
+    SELECT NEW.id, coalesce(
+        (SELECT path FROM category_path WHERE category_id = NEW.parent_id), ''
+    ) || NEW.id || '/';
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# the subtree of "3/17/" is the range ["3/17/", "3/170") in "C" collation, one
+# UPDATE rewrites its prefix. runs after the foreign key check of parent_id, a
+# parent that does not exist has raised by then
+PATH_MOVE = """
+CREATE FUNCTION category_path_move() RETURNS trigger AS $$
+DECLARE
+    old_path text;
+    new_path text := NEW.id || '/';
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('category_path'));
+    SELECT path INTO old_path FROM category_path WHERE category_id = NEW.id;
+    IF NEW.parent_id IS NOT NULL THEN
+        SELECT path || new_path INTO new_path
+        FROM category_path WHERE category_id = NEW.parent_id;
+        IF starts_with(new_path, old_path) THEN
+            RAISE EXCEPTION 'category_path_cycle: category % can not move below its own subcategory %',
+                NEW.id, NEW.parent_id
+                USING ERRCODE = 'check_violation', CONSTRAINT = 'category_path_cycle';
+        END IF;
+    END IF;
+    UPDATE category_path
+    SET path = new_path || substr(path, length(old_path) + 1)
+    WHERE path >= old_path AND path < left(old_path, -1) || '0';
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# the category.path triggers of 341730b4ff21, for the downgrade
+SET_PATH = """
+CREATE FUNCTION category_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path text;
+BEGIN
+    IF NEW.parent_id IS NOT NULL THEN
+        SELECT path INTO parent_path FROM category WHERE id = NEW.parent_id;
+        IF TG_OP = 'UPDATE' AND starts_with(parent_path, OLD.path) THEN
+            RAISE EXCEPTION 'category % can not move below its own subcategory %',
+                NEW.id, NEW.parent_id
+                USING ERRCODE = 'check_violation', CONSTRAINT = 'category_path_cycle';
+        END IF;
+    END IF;
+    NEW.path := coalesce(parent_path, '') || NEW.id || '/';
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+MOVE_SUBTREE = """
+CREATE FUNCTION category_move_subtree() RETURNS trigger AS $$
+BEGIN
+    UPDATE category
+    SET path = NEW.path || substr(path, length(OLD.path) + 1)
+    WHERE path > OLD.path AND path < left(OLD.path, -1) || '0';
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute("DROP TRIGGER category_path_move ON category")
+    op.execute("DROP TRIGGER category_path_update ON category")
+    op.execute("DROP TRIGGER category_path_insert ON category")
+    op.execute("DROP FUNCTION category_move_subtree()")
+    op.execute("DROP FUNCTION category_set_path()")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('category_path',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.Text(collation='C'), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['category.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    # ### end Alembic commands ###
+    op.execute("INSERT INTO category_path (category_id, path) SELECT id, path FROM category")
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_index('ix_category_path_path', 'category_path', ['path'], unique=False)
+    op.drop_index('ix_category_path', table_name='category')
+    op.drop_column('category', 'path')
+    # ### end Alembic commands ###
+
+    op.execute(PATH_INSERT)
+    op.execute(PATH_MOVE)
+    op.execute(
+        "CREATE TRIGGER category_path_insert AFTER INSERT ON category "
+        "FOR EACH ROW EXECUTE FUNCTION category_path_insert()"
+    )
+    op.execute(
+        "CREATE TRIGGER category_path_move AFTER UPDATE OF parent_id ON category "
+        "FOR EACH ROW WHEN (NEW.parent_id IS DISTINCT FROM OLD.parent_id) "
+        "EXECUTE FUNCTION category_path_move()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER category_path_move ON category")
+    op.execute("DROP TRIGGER category_path_insert ON category")
+    op.execute("DROP FUNCTION category_path_move()")
+    op.execute("DROP FUNCTION category_path_insert()")
+
+    op.add_column('category', sa.Column('path', sa.Text(collation='C'), nullable=True))
+    op.execute(
+        "UPDATE category SET path = category_path.path FROM category_path "
+        "WHERE category_path.category_id = category.id"
+    )
+    op.alter_column('category', 'path', nullable=False)
+    op.create_index('ix_category_path', 'category', ['path'], unique=False)
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_category_path_path', table_name='category_path')
+    op.drop_table('category_path')
+    # ### end Alembic commands ###
+
+    op.execute(SET_PATH)
+    op.execute(MOVE_SUBTREE)
+    op.execute(
+        "CREATE TRIGGER category_path_insert BEFORE INSERT ON category "
+        "FOR EACH ROW EXECUTE FUNCTION category_set_path()"
+    )
+    op.execute(
+        "CREATE TRIGGER category_path_update BEFORE UPDATE OF parent_id ON category "
+        "FOR EACH ROW WHEN (NEW.parent_id IS DISTINCT FROM OLD.parent_id) "
+        "EXECUTE FUNCTION category_set_path()"
+    )
+    op.execute(
+        "CREATE TRIGGER category_path_move AFTER UPDATE OF parent_id ON category "
+        "FOR EACH ROW WHEN (NEW.path IS DISTINCT FROM OLD.path) "
+        "EXECUTE FUNCTION category_move_subtree()"
+    )
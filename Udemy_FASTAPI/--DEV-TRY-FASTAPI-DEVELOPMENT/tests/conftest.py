@@ -1,5 +1,18 @@
-from .fixtures import client, db_session  # noqa: F401
-from .utils.pytest_utils import pytest_collection_modifyitems  # noqa: F401
+import os
+
+# the unit tests dont have a database to LISTEN on, must be set before app is imported
+os.environ.setdefault("CATEGORY_NOTIFY_ENABLED", "false")
+# nor rows to build the autocomplete indexes from at startup
+os.environ.setdefault("AUTOCOMPLETE_PRELOAD", "false")
+# nor connections to PREPARE on, the hot lookups go through Session.execute
+os.environ.setdefault("DB_PREPARED_STATEMENTS", "false")
+# nor a category_version row, the ETag tests turn it on themselves
+os.environ.setdefault("CATEGORY_ETAG_ENABLED", "false")
+# every test mocks its own rows, a response cached by another one would answer
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from .fixtures import async_client, client, db_session  # noqa: E402, F401
+from .utils.pytest_utils import pytest_collection_modifyitems  # noqa: E402, F401
 
 # since this conftest this script will be run automatically when pytest initiated
 # we need to disable ruff for this line in order to save ir w/o getting disappeared by format
@@ -1,9 +1,12 @@
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
+from app.routers import category_async_routes
+from app.utils.cache import clear_caches
 from tests.utils.database_utils import migrate_to_db
 from tests.utils.docker_utils import start_database_container
 
@@ -49,9 +52,23 @@ def db_session():
 
 @pytest.fixture(scope="function")  # fixture will be invoked once per test function
 def client():
+    clear_caches()  # a slug cached by an earlier test would skip the mocked query
     with TestClient(app) as _client:
         yield _client
 
         # this is the fixture for our client which we will pass into each test
         # that requires access to http endpoint
         # anytime we make http request we r gonna need a test client
+
+
+@pytest.fixture(scope="function")
+def async_client():
+    # app.main picks the sync or the async router at import time (DB_ASYNC_MODE),
+    # so the async endpoints get their own small app here
+    async_app = FastAPI()
+    async_app.include_router(
+        category_async_routes.router, prefix="/api/category", tags=["categories"]
+    )
+    clear_caches()
+    with TestClient(async_app) as _client:
+        yield _client
@@ -19,7 +19,11 @@ def test_model_structure_table_exists(db_inspector):
 """
 - [ ] Validate the existence of expected columns in each table, ensuring correct data types.
 """
-from sqlalchemy import Boolean, Integer, String
+import pytest
+from sqlalchemy import Boolean, DateTime, Integer, String, text
+from sqlalchemy.exc import IntegrityError
+
+from app.models import CATEGORY_SEARCH_DOCUMENT
 
 
 def test_model_structure_column_data_types(db_inspector):
@@ -32,6 +36,7 @@ def test_model_structure_column_data_types(db_inspector):
     assert isinstance(columns["is_active"]["type"], Boolean)
     assert isinstance(columns["level"]["type"], Integer)
     assert isinstance(columns["parent_id"]["type"], Integer)
+    assert isinstance(columns["updated_at"]["type"], DateTime)
 
     # bunu o columnlari build etmeden run edince the test fails and stops
     # ilk basta cunku sadece id column u build etmistik category table icin
@@ -56,13 +61,14 @@ def test_model_structure_nullable_constraints(db_inspector):
         "is_active": False,
         "level": False,
         "parent_id": True,
+        "updated_at": False,
     }
 
     for column in columns:
         column_name = column["name"]
-        assert column["nullable"] == expected_nullable.get(
-            column_name
-        ), f"column '{column_name}' is not nullable as expected"
+        assert column["nullable"] == expected_nullable.get(column_name), (
+            f"column '{column_name}' is not nullable as expected"
+        )
 
 
 # The comma at the end of the assert statement allows the assertion error message to be
@@ -120,6 +126,7 @@ def test_model_structure_default_values(db_inspector):
         columns["is_active"]["default"] == "false"
     )  # burda kucuk harfle yazmamiza ragmen geciyo cok garip
     assert columns["level"]["default"] == "100"
+    assert columns["updated_at"]["default"] == "CURRENT_TIMESTAMP"
 
     # when it comes to db build there are 2 approaches to set default value; see in models.py
     # this test is for server_default parameter
@@ -177,3 +184,94 @@ def test_model_structure_unique_constraints(db_inspector):
 
 
 # models.py a UniqueConstraint class i da ekle importa
+
+
+"""
+- [ ] Verify the materialized paths table is indexed and filled in by the triggers
+"""
+
+
+def test_model_structure_path_index(db_inspector):
+    assert db_inspector.has_table("category_path")
+    indexes = {
+        index["name"]: index for index in db_inspector.get_indexes("category_path")
+    }
+
+    assert indexes["ix_category_path_path"]["column_names"] == ["path"]
+
+
+def test_model_path_follows_parent(db_session):
+    with db_session() as db:
+        parent_id = db.execute(
+            text(
+                "INSERT INTO category (name, slug) VALUES ('path-a', 'path-a') RETURNING id"
+            )
+        ).scalar()
+        child_id = db.execute(
+            text(
+                "INSERT INTO category (name, slug, parent_id) "
+                "VALUES ('path-b', 'path-b', :parent_id) RETURNING id"
+            ),
+            {"parent_id": parent_id},
+        ).scalar()
+        path = text("SELECT path FROM category_path WHERE category_id = :id")
+        assert db.execute(path, {"id": child_id}).scalar() == f"{parent_id}/{child_id}/"
+
+        db.execute(
+            text("UPDATE category SET parent_id = NULL WHERE id = :id"),
+            {"id": child_id},
+        )
+        assert db.execute(path, {"id": child_id}).scalar() == f"{child_id}/"
+        db.rollback()
+
+
+def test_model_path_refuses_cycle(db_session):
+    with db_session() as db:
+        parent_id = db.execute(
+            text(
+                "INSERT INTO category (name, slug) VALUES ('cycle-a', 'cycle-a') RETURNING id"
+            )
+        ).scalar()
+        child_id = db.execute(
+            text(
+                "INSERT INTO category (name, slug, parent_id) "
+                "VALUES ('cycle-b', 'cycle-b', :parent_id) RETURNING id"
+            ),
+            {"parent_id": parent_id},
+        ).scalar()
+
+        with pytest.raises(IntegrityError, match="category_path_cycle"):
+            db.execute(
+                text("UPDATE category SET parent_id = :child_id WHERE id = :id"),
+                {"child_id": child_id, "id": parent_id},
+            )
+        db.rollback()
+
+
+"""
+- [ ] Verify the search index matches category names and slugs by word prefix
+"""
+
+
+def test_model_search_index(db_session):
+    with db_session() as db:
+        indexdef = db.execute(
+            text(
+                "SELECT indexdef FROM pg_indexes WHERE indexname = 'ix_category_search'"
+            )
+        ).scalar()
+        assert "USING gin" in indexdef
+
+        db.execute(
+            text(
+                "INSERT INTO category (name, slug) "
+                "VALUES ('Garden Tools', 'outdoor-garden_tools')"
+            )
+        )
+        found = text(
+            f"SELECT count(*) FROM category WHERE {CATEGORY_SEARCH_DOCUMENT} "
+            "@@ to_tsquery('simple', :query)"
+        )
+        for query in ("garden & tools", "gard:* & tool:*", "outdoor"):
+            assert db.execute(found, {"query": query}).scalar() == 1
+        db.rollback()
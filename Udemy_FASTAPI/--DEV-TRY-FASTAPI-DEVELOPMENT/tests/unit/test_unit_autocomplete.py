@@ -0,0 +1,119 @@
+import heapq
+import random
+
+from app.utils import category_events
+from app.utils.autocomplete import PrefixIndex, category_autocomplete, rank_key
+from tests.unit.test_unit_category_breadcrumbs import queued_results
+
+# the columns the autocomplete indexes read: id, name, slug, weight
+CATEGORIES = [
+    (1, "Kitchen", "kitchen", 0),
+    (2, "Kitchen Tools", "kitchen-tools", 1),
+    (3, "Kettles", "kettles", 2),
+    (4, "Garden", "garden", 0),
+]
+PRODUCTS = [(10, "Kettle Steel", "kettle-steel", 1), (11, "Kettle", "kettle", 0)]
+
+"""
+- [ ] Test the prefix index returns the same top k as sorting every match
+"""
+
+
+def test_unit_prefix_index_top_matches_brute_force():
+    rows = [
+        (
+            row_id,
+            "".join(random.choice("abC") for _ in range(random.randint(1, 5))),
+            f"slug-{row_id}",
+            random.randint(0, 3),
+        )
+        for row_id in range(500)
+    ]
+    index = PrefixIndex(rows)
+    skip = {row_id for row_id in range(0, 500, 7)}
+
+    for prefix in ["", "a", "ab", "c", "cab", "abcab", "x"]:
+        for k in (1, 5, 50):
+            expected = heapq.nsmallest(
+                k,
+                (
+                    row
+                    for row in rows
+                    if row[1].casefold().startswith(prefix) and row[0] not in skip
+                ),
+                key=rank_key,
+            )
+            found = [index.entry(position) for position in index.top(prefix, k, skip)]
+            # same order up to ties of weight, length and name
+            assert [rank_key(row)[:3] for row in found] == [
+                rank_key(row)[:3] for row in expected
+            ]
+
+
+"""
+- [ ] Test GET autocomplete builds the indexes once and answers from memory
+"""
+
+
+def test_unit_autocomplete_successfully(client, monkeypatch):
+    statements = queued_results(monkeypatch, CATEGORIES, PRODUCTS)
+
+    response = client.get("api/autocomplete/", params={"q": "ke"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "categories": [{"id": 3, "name": "Kettles", "slug": "kettles"}],
+        "products": [
+            {"id": 11, "name": "Kettle", "slug": "kettle"},
+            {"id": 10, "name": "Kettle Steel", "slug": "kettle-steel"},
+        ],
+    }
+
+    response = client.get(
+        "api/autocomplete/", params={"q": " KIT", "kind": "category", "limit": 1}
+    )
+    assert response.json() == {
+        "categories": [{"id": 1, "name": "Kitchen", "slug": "kitchen"}],
+        "products": [],
+    }
+    assert len(statements) == 2
+
+
+"""
+- [ ] Test GET autocomplete rejects an empty q and a limit out of range
+"""
+
+
+def test_unit_autocomplete_invalid_params(client):
+    assert client.get("api/autocomplete/").status_code == 422
+    assert client.get("api/autocomplete/", params={"q": ""}).status_code == 422
+    response = client.get("api/autocomplete/", params={"q": "a", "limit": 0})
+    assert response.status_code == 422
+    response = client.get("api/autocomplete/", params={"q": "a", "kind": "tag"})
+    assert response.status_code == 422
+
+
+"""
+- [ ] Test a committed write reads only the changed rows, deletes included
+"""
+
+
+def test_unit_autocomplete_applies_changes(client, monkeypatch):
+    statements = queued_results(
+        monkeypatch,
+        CATEGORIES,
+        [(3, "Garden Kettles", "kettles", 2), (5, "Kettle Grills", "grills", 1)],
+        [],
+    )
+    assert [row[0] for row in category_autocomplete.complete("k", 10)] == [1, 2, 3]
+
+    # what a commit of the endpoints (or a notification) hands to the invalidators
+    category_events.dispatch_change(3, "kettles")
+    category_events.dispatch_change(5, "grills")
+
+    assert [row[0] for row in category_autocomplete.complete("k", 10)] == [1, 5, 2]
+    assert [row[0] for row in category_autocomplete.complete("g", 10)] == [4, 3]
+
+    # a bulk delete only knows the slug
+    category_events.dispatch_change(slug="kitchen-tools")
+    assert [row[0] for row in category_autocomplete.complete("k", 10)] == [1, 5]
+    assert len(statements) == 3
@@ -0,0 +1,168 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.utils.cache import MISSING, TTLCache
+from app.utils.category_cache import (
+    cache_category,
+    category_slug_cache,
+    get_cached_category,
+    invalidate_category,
+    load_category,
+)
+from app.utils.category_events import record_category_change
+from app.utils.db_routing import ReplicaSet
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.unit.test_unit_db_routing import make_session
+from tests.utils.mock_utils import MockResult, category_rows
+
+"""
+- [ ] Test least recently used entry is evicted
+"""
+
+
+def test_unit_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+"""
+- [ ] Test expired entries and cached 404s
+"""
+
+
+def test_unit_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=60, negative_ttl=5)
+    cache.set("found", {"id": 1})
+    cache.set("not-found", None)
+
+    assert cache.get("not-found") is None  # a hit, the answer is "does not exist"
+    now[0] += 10
+    assert cache.get("not-found") is MISSING
+    assert cache.get("found") == {"id": 1}
+    now[0] += 60
+    assert cache.get("found") is MISSING
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (2, 2, 2)
+
+
+"""
+- [ ] Test a value read before an invalidation is not stored
+"""
+
+
+def test_unit_ttl_cache_skips_value_older_than_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.pop("a")  # nothing cached, still newer than what was read
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is MISSING
+
+    cache.set("a", 1, generation=cache.generation)
+    assert cache.get("a") == 1
+
+
+"""
+- [ ] Test slug lookups are served from the cache
+"""
+
+
+def test_unit_get_single_category_is_cached(client, monkeypatch):
+    category = get_random_category_dict()
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult(category_rows([category]))),
+    )
+    assert client.get(f"api/category/slug/{category['slug']}").status_code == 200
+
+    # the database is not asked again
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    response = client.get(f"api/category/slug/{category['slug']}")
+    assert response.status_code == 200
+    assert response.json() == category
+
+    stats = {cache["name"]: cache for cache in client.get("api/metrics/cache").json()}
+    by_slug = stats["category_by_slug"]
+    assert (by_slug["hits"], by_slug["misses"]) == (1, 1)
+
+
+def test_unit_get_single_category_not_found_is_cached(client, monkeypatch):
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    assert client.get("api/category/slug/missing").status_code == 404
+
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult(category_rows([get_random_category_dict()]))),
+    )
+    assert client.get("api/category/slug/missing").status_code == 404
+
+
+"""
+- [ ] Test writes invalidate the cache only once they are committed
+"""
+
+
+def test_unit_category_cache_invalidated_on_commit():
+    category_slug_cache.clear()
+    category = get_random_category_dict()
+    cache_category(category["slug"], category)
+    cache_category("renamed", None)
+
+    with Session(create_engine("sqlite://")) as db:
+        record_category_change(db, category["id"], "renamed")
+        assert get_cached_category(category["slug"]) == category
+        db.commit()
+
+    assert get_cached_category(category["slug"]) is MISSING  # old slug, by id
+    assert get_cached_category("renamed") is MISSING  # cached 404 of the new slug
+
+
+def test_unit_category_cache_kept_on_rollback():
+    category_slug_cache.clear()
+    category = get_random_category_dict()
+    cache_category(category["slug"], category)
+
+    with Session(create_engine("sqlite://")) as db:
+        db.execute(text("SELECT 1"))  # the write that gets rolled back
+        record_category_change(db, category["id"], category["slug"])
+        db.rollback()
+        db.commit()
+
+    assert get_cached_category(category["slug"]) == category
+
+
+"""
+- [ ] Test a miss is filled from the primary, and not when a write raced it
+"""
+
+
+def test_unit_load_category_fills_from_primary(monkeypatch):
+    category_slug_cache.clear()
+    category = get_random_category_dict()
+    primary, db = make_session(ReplicaSet(engines=[create_engine("sqlite://")]))
+    binds = []
+
+    def execute(self, statement, params=None, bind_arguments=None, **kwargs):
+        binds.append(bind_arguments["bind"])
+        if len(binds) == 1:
+            invalidate_category(category["id"])  # committed while it was read
+        return MockResult(category_rows([category]))
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+
+    assert load_category(db, category["slug"]).id == category["id"]
+    assert get_cached_category(category["slug"]) is MISSING
+    load_category(db, category["slug"])
+    assert get_cached_category(category["slug"]) == category
+    assert binds == [primary, primary]  # a read only session, not its replica
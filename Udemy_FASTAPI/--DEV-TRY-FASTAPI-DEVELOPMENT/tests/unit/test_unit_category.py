@@ -1,10 +1,13 @@
 import pytest
 from fastapi import HTTPException
 from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 
 from app.models import Category
-from app.schemas.category_schema import CategoryCreate
+from app.schemas.category_schema import CategoryCreate, CategoryPatch
+from app.utils.category_utils import decode_cursor, encode_cursor
 from tests.factories.models_factory import get_random_category_dict
+from tests.utils.mock_utils import MockResult, category_rows
 
 
 def mock_output(return_value=None):
@@ -113,21 +116,17 @@ def test_unit_create_new_category_successfully(client, monkeypatch):
     # monkeypatch allow modify at the runtime of testing
     category = get_random_category_dict()  # ge,erate one random category
 
-    ########## BU asagidaki iki satiri ben ekledim, sadece id'yi category dictten alip
-    # diger fieldlari random generate ettim, boylece sonda response.json() == category
-    # cikinca testi manual insertiondan degil post request basarili diye gectigimize eminiz
-    fake_cat = get_random_category_dict()
-    fake_cat["id"] = category["id"]
+    # the Category attributes are not patched anymore: the endpoint builds the INSERT
+    # from the Category columns, patching them would break the statement
 
-    for key, value in fake_cat.items():  # adam burayi koymamisti hata verdi
-        monkeypatch.setattr(Category, key, value)
-        # neymis bu bi id yaratiyomus guya falan filan"""
-
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output())
-    # this code ensures that if "sqlalchemy.orm.Query.first" operation appears in our
-    # function, it is not gonna be run bcz we r overriding it
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([(Category(**category), True)])),
+    )
+    # this code ensures that if "sqlalchemy.orm.Session.execute" operation appears in our
+    # function, it is not gonna be run bcz we r overriding it. the INSERT ... RETURNING
+    # gives back the row and whether it was inserted
     monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
-    monkeypatch.setattr("sqlalchemy.orm.Session.refresh", mock_output())
 
     """
     These lines use monkeypatch.setattr() to patch specific attributes or methods. 
@@ -257,7 +256,8 @@ def test_unit_create_new_category_existing(
         mock_check_existing_category,
     )
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output())
+    # ON CONFLICT DO NOTHING returned no row
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
     # bunda niye commit ve refresh yok,
     body = category_data.copy()
     body.pop("id")
@@ -286,8 +286,9 @@ def test_unit_create_new_category_with_internal_server_error(client, monkeypatch
             Category, key, value
         )  # gene bi attribute yoluyla manual populate hali
     # deminkinde niye bunu yapmadiysak hic
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output())
-    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_create_category_exception)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_create_category_exception
+    )
 
     body = category.copy()
     body.pop("id")
@@ -295,6 +296,45 @@ def test_unit_create_new_category_with_internal_server_error(client, monkeypatch
     assert response.status_code == 500
 
 
+"""
+- [ ] Test POST category upsert updates the existing category
+"""
+
+
+def test_unit_create_category_upsert_existing(client, monkeypatch):
+    category = get_random_category_dict()
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([(Category(**category), False)])),
+    )
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    body = category.copy()
+    body.pop("id")
+    response = client.post("/api/category/?upsert=true", json=body)
+    assert response.status_code == 200
+    assert response.json() == category
+
+
+def test_unit_create_category_upsert_name_level_conflict(client, monkeypatch):
+    def mock_unique_violation(*args, **kwargs):
+        raise IntegrityError(
+            "INSERT INTO category ...",
+            {},
+            Exception(
+                'duplicate key value violates unique constraint "uq_category_name_level"'
+            ),
+        )
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_unique_violation)
+
+    body = get_random_category_dict()
+    body.pop("id")
+    response = client.post("/api/category/?upsert=true", json=body)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Category name and level already exists"}
+
+
 """
 - [ ] Test GET all categories successfully
 """
@@ -302,7 +342,10 @@ def test_unit_create_new_category_with_internal_server_error(client, monkeypatch
 
 def test_unit_get_all_categories_successfully(client, monkeypatch):
     category = [get_random_category_dict(i) for i in range(5)]  # 5 oylesine sanrim
-    monkeypatch.setattr("sqlalchemy.orm.Query.all", mock_output(category))
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult(category_rows(category))),
+    )
     response = client.get("api/category/")
     assert response.status_code == 200
     assert response.json() == category
@@ -315,7 +358,7 @@ def test_unit_get_all_categories_successfully(client, monkeypatch):
 
 def test_unit_get_all_categories_returns_empty(client, monkeypatch):
     category = []
-    monkeypatch.setattr("sqlalchemy.orm.Query.all", mock_output(category))
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
     response = client.get("api/category/")
     assert response.status_code == 200
     assert response.json() == category
@@ -331,7 +374,9 @@ def test_unit_get_category_all_with_internal_server_error(client, monkeypatch):
     def mock_create_category_exception(*args, **kwargs):
         raise Exception("Internal server error")
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.all", mock_create_category_exception)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_create_category_exception
+    )
     response = client.get("api/category/")
     assert response.status_code == 500
 
@@ -345,7 +390,10 @@ def test_unit_get_category_all_with_internal_server_error(client, monkeypatch):
     "category", [get_random_category_dict() for _ in range(3)]
 )  # same test will be run 3 times with different random categories
 def test_unit_get_single_category_successfully(client, monkeypatch, category):
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output(category))
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult(category_rows([category]))),
+    )
     # what is the difference between first and all?
 
     response = client.get(f"api/category/slug/{category['slug']}")
@@ -360,7 +408,7 @@ def test_unit_get_single_category_successfully(client, monkeypatch, category):
 
 @pytest.mark.parametrize("category", [get_random_category_dict() for _ in range(3)])
 def test_unit_get_single_category_not_found(client, monkeypatch, category):
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output())
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
     response = client.get(f"api/category/slug/{category['slug']}")
     assert response.status_code == 404
     assert response.json() == {"detail": "Category does not exist"}
@@ -379,7 +427,9 @@ def test_unit_get_single_category_with_internal_server_error(
     def mock_create_category_exception(*args, **kwargs):
         raise Exception("Internal server error")
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_create_category_exception)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_create_category_exception
+    )
     response = client.get(f"api/category/slug/{category['slug']}")
     assert response.status_code == 500
 
@@ -393,9 +443,12 @@ def test_unit_update_category_successfully(client, monkeypatch):
     category_dict = get_random_category_dict()
     category_instance = Category(**category_dict)
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output(category_instance))
+    # UPDATE ... RETURNING gives back the updated row
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([category_instance])),
+    )
     monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
-    monkeypatch.setattr("sqlalchemy.orm.Session.refresh", mock_output())
 
     body = category_dict.copy()
     body.pop("id")
@@ -414,9 +467,8 @@ def test_unit_update_category_successfully(client, monkeypatch):
 def test_unit_update_category_not_found(client, monkeypatch):
     category_dict = get_random_category_dict()
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output())
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
     monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
-    monkeypatch.setattr("sqlalchemy.orm.Session.refresh", mock_output())
 
     body = category_dict.copy()
     body.pop("id")
@@ -437,7 +489,9 @@ def test_unit_update_category_internal_error(client, monkeypatch):
     def mock_create_category_exception(*args, **kwargs):
         raise Exception("Internal server error")
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_create_category_exception)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_create_category_exception
+    )
 
     body = category_dict.copy()
     body.pop("id")
@@ -455,8 +509,11 @@ def test_unit_delete_category_successfully(client, monkeypatch):
     category_dict = get_random_category_dict()
     category_instance = Category(**category_dict)
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output(category_instance))
-    monkeypatch.setattr("sqlalchemy.orm.Session.delete", mock_output())
+    # DELETE ... RETURNING gives back the deleted row
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([category_instance])),
+    )
     monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
 
     response = client.delete("api/category/1")
@@ -472,7 +529,9 @@ def test_unit_delete_category_successfully(client, monkeypatch):
 
 def test_unit_delete_category_not_found(client, monkeypatch):
     category = []
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_output(category))
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(category))
+    )
     monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
 
     response = client.delete("api/category/1")
@@ -490,8 +549,108 @@ def test_unit_delete_category_internal_error(client, monkeypatch):
     def mock_create_category_exception(*args, **kwargs):
         raise Exception("Internal server error")
 
-    monkeypatch.setattr("sqlalchemy.orm.Query.first", mock_create_category_exception)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_create_category_exception
+    )
 
     response = client.delete("api/category/1")
     assert response.status_code == 500
     assert response.json() == {"detail": "Internal server error"}
+
+
+"""
+- [ ] Test GET categories paginated with a cursor
+"""
+
+
+def test_unit_get_categories_returns_next_page_cursor(client, monkeypatch):
+    categories = category_rows([get_random_category_dict(i) for i in range(1, 4)])
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(categories))
+    )
+
+    response = client.get("api/category/?limit=2")
+    assert response.status_code == 200
+    assert [category["id"] for category in response.json()] == [1, 2]
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    assert decode_cursor(next_cursor) == (categories[1].level, 2)
+    assert f"cursor={next_cursor}" in response.headers["Link"]
+    assert response.headers["Link"].endswith('rel="next"')
+
+
+def test_unit_get_categories_last_page_has_no_cursor(client, monkeypatch):
+    categories = category_rows([get_random_category_dict(i) for i in range(1, 3)])
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(categories))
+    )
+
+    cursor = encode_cursor(1, 10)
+    response = client.get(f"api/category/?limit=2&cursor={cursor}")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "Link" not in response.headers
+
+
+def test_unit_get_categories_invalid_cursor(client):
+    response = client.get("api/category/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+"""
+- [ ] Test PATCH category sends only the fields in the body
+"""
+
+
+def test_unit_schema_category_patch_only_sets_sent_fields():
+    assert CategoryPatch(is_active=True).model_dump(exclude_unset=True) == {
+        "is_active": True
+    }
+    with pytest.raises(ValidationError):
+        CategoryPatch(name=None)  # name is not nullable
+
+
+def test_unit_patch_category_successfully(client, monkeypatch):
+    category_dict = get_random_category_dict()
+    statements = []
+
+    def mock_execute(self, statement, *args, **kwargs):
+        statements.append(str(statement))
+        return MockResult([Category(**category_dict)])
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_execute)
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.patch("api/category/1", json={"is_active": True})
+    assert response.status_code == 200
+    assert response.json() == category_dict
+    assert "SET is_active=" in statements[0]
+    assert "name=" not in statements[0]
+
+
+"""
+- [ ] Test PATCH category without changes does not write
+"""
+
+
+def test_unit_patch_category_unchanged(client, monkeypatch):
+    category_dict = get_random_category_dict()
+    # the UPDATE matched no row that differs, the category is read instead
+    results = iter([MockResult([]), MockResult(category_rows([category_dict]))])
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", lambda *args, **kwargs: next(results)
+    )
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.patch("api/category/1", json={"level": category_dict["level"]})
+    assert response.status_code == 200
+    assert response.json() == category_dict
+
+
+def test_unit_patch_category_not_found(client, monkeypatch):
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+
+    response = client.patch("api/category/1", json={"level": 3})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category not found"}
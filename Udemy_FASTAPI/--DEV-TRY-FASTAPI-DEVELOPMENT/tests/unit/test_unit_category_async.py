@@ -0,0 +1,178 @@
+import pytest
+
+from app.models import Category
+from tests.factories.models_factory import get_random_category_dict
+from tests.utils.mock_utils import MockResult, category_rows, mock_async_output
+
+# same checks as test_unit_category.py but against the async def endpoints
+# (category_async_routes.py), this time AsyncSession methods get patched
+
+
+def mock_async_exception(*args, **kwargs):
+    async def _mock(*args, **kwargs):
+        raise Exception("Internal server error")
+
+    return _mock
+
+
+def test_unit_async_get_all_categories_successfully(async_client, monkeypatch):
+    category = [get_random_category_dict(i) for i in range(5)]
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult(category_rows(category))),
+    )
+    response = async_client.get("api/category/")
+    assert response.status_code == 200
+    assert response.json() == category
+
+
+def test_unit_async_get_all_categories_with_internal_server_error(
+    async_client, monkeypatch
+):
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute", mock_async_exception()
+    )
+    response = async_client.get("api/category/")
+    assert response.status_code == 500
+
+
+@pytest.mark.parametrize("category", [get_random_category_dict() for _ in range(3)])
+def test_unit_async_get_single_category_successfully(
+    async_client, monkeypatch, category
+):
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult(category_rows([category]))),
+    )
+    response = async_client.get(f"api/category/slug/{category['slug']}")
+    assert response.status_code == 200
+    assert response.json() == category
+
+
+def test_unit_async_get_single_category_not_found(async_client, monkeypatch):
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([])),
+    )
+    response = async_client.get("api/category/slug/missing-slug")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category does not exist"}
+
+
+def test_unit_async_create_new_category_successfully(async_client, monkeypatch):
+    category = get_random_category_dict()
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([(Category(**category), True)])),
+    )
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.commit", mock_async_output()
+    )
+
+    body = category.copy()
+    body.pop("id")
+    response = async_client.post("api/category/", json=body)
+    assert response.status_code == 201
+    assert response.json() == category
+
+
+def test_unit_async_create_new_category_existing(async_client, monkeypatch):
+    category = get_random_category_dict()
+    existing = Category(**category)
+    # the INSERT returns nothing, the lookup after it finds the conflicting row
+    results = iter([MockResult([]), MockResult([existing])])
+
+    async def mock_execute(*args, **kwargs):
+        return next(results)
+
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.execute", mock_execute)
+
+    body = category.copy()
+    body.pop("id")
+    response = async_client.post("api/category/", json=body)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Category name and level already exists"}
+
+
+def test_unit_async_update_category_successfully(async_client, monkeypatch):
+    category_dict = get_random_category_dict()
+    category_instance = Category(**category_dict)
+
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([category_instance])),
+    )
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.commit", mock_async_output()
+    )
+
+    body = category_dict.copy()
+    body.pop("id")
+    response = async_client.put("api/category/1", json=body)
+    assert response.status_code == 201
+    assert response.json() == category_dict
+
+
+def test_unit_async_update_category_not_found(async_client, monkeypatch):
+    body = get_random_category_dict()
+    body.pop("id")
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([])),
+    )
+    response = async_client.put("api/category/1", json=body)
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category not found"}
+
+
+def test_unit_async_delete_category_successfully(async_client, monkeypatch):
+    category_dict = get_random_category_dict()
+    category_instance = Category(**category_dict)
+
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([category_instance])),
+    )
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.commit", mock_async_output()
+    )
+
+    response = async_client.delete("api/category/1")
+    assert response.status_code == 200
+    assert response.json() == {"id": category_dict["id"], "name": category_dict["name"]}
+
+
+def test_unit_async_delete_category_internal_error(async_client, monkeypatch):
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute", mock_async_exception()
+    )
+    response = async_client.delete("api/category/1")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error"}
+
+
+def test_unit_async_patch_category_successfully(async_client, monkeypatch):
+    category_dict = get_random_category_dict()
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([Category(**category_dict)])),
+    )
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.commit", mock_async_output()
+    )
+
+    response = async_client.patch("api/category/1", json={"is_active": True})
+    assert response.status_code == 200
+    assert response.json() == category_dict
+
+
+def test_unit_async_patch_category_not_found(async_client, monkeypatch):
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult([])),
+    )
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.get", mock_async_output())
+
+    response = async_client.patch("api/category/1", json={"level": 3})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category not found"}
@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+from app.utils import category_events
+from app.utils.category_breadcrumbs import category_breadcrumbs
+from tests.utils.mock_utils import MockResult
+
+# the columns the breadcrumb index reads: id, name, slug, parent_id
+Row = namedtuple("Row", "id name slug parent_id")
+
+
+def crumb_row(category_id, parent_id):
+    return Row(category_id, f"category-{category_id}", f"slug-{category_id}", parent_id)
+
+
+def queued_results(monkeypatch, *results):
+    # Session.execute answers with the given row lists in turn, the statements are
+    # kept to count the queries
+    statements, results = [], list(results)
+
+    def execute(self, statement, *args, **kwargs):
+        statements.append(statement)
+        return MockResult(results.pop(0))
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+    return statements
+
+
+TREE = [crumb_row(1, None), crumb_row(2, 1), crumb_row(3, 2), crumb_row(4, 1)]
+
+"""
+- [ ] Test GET breadcrumbs loads every category once and answers from memory
+"""
+
+
+def test_unit_get_category_breadcrumbs_from_memory(client, monkeypatch):
+    statements = queued_results(monkeypatch, TREE)
+
+    response = client.get("api/category/3/breadcrumbs")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "name": "category-1", "slug": "slug-1"},
+        {"id": 2, "name": "category-2", "slug": "slug-2"},
+        {"id": 3, "name": "category-3", "slug": "slug-3"},
+    ]
+    assert [
+        crumb["id"] for crumb in client.get("api/category/4/breadcrumbs").json()
+    ] == [1, 4]
+    assert client.get("api/category/99/breadcrumbs").status_code == 404
+    assert len(statements) == 1
+
+
+"""
+- [ ] Test POST breadcrumbs resolves a batch of ids and reports the unknown ones
+"""
+
+
+def test_unit_get_category_breadcrumbs_batch(client, monkeypatch):
+    queued_results(monkeypatch, TREE)
+
+    response = client.post("api/category/breadcrumbs", json={"ids": [3, 99, 1]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [crumb["id"] for crumb in body["breadcrumbs"]["3"]] == [1, 2, 3]
+    assert [crumb["id"] for crumb in body["breadcrumbs"]["1"]] == [1]
+    assert body["not_found"] == [99]
+
+
+def test_unit_get_category_breadcrumbs_batch_too_large(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.category_tree_routes.CATEGORY_BREADCRUMB_BATCH_MAX", 2
+    )
+    response = client.post("api/category/breadcrumbs", json={"ids": [1, 2, 3]})
+    assert response.status_code == 413
+
+
+"""
+- [ ] Test a committed write reloads only the changed rows, the subtrees follow
+"""
+
+
+def test_unit_category_breadcrumbs_reload_changed_rows(client, monkeypatch):
+    renamed = Row(1, "renamed", "slug-1", None)
+    moved = Row(3, "category-3", "slug-3", 4)  # from below 2 to below 4
+    statements = queued_results(monkeypatch, TREE, [renamed, moved])
+    assert [crumb["id"] for crumb in category_breadcrumbs.get(3)] == [1, 2, 3]
+
+    # what a commit of the endpoints (or a notification) hands to the invalidators
+    category_events.dispatch_change(1, "slug-1")
+    category_events.dispatch_change(3, "slug-3")
+
+    assert [crumb["id"] for crumb in category_breadcrumbs.get(3)] == [1, 4, 3]
+    assert category_breadcrumbs.get(2)[0]["name"] == "renamed"
+    assert len(statements) == 2
+
+
+"""
+- [ ] Test the whole index is loaded again when a change can not be placed
+"""
+
+
+def test_unit_category_breadcrumbs_reload_all(client, monkeypatch):
+    statements = queued_results(
+        monkeypatch,
+        TREE,
+        TREE + [crumb_row(5, 4)],  # unknown slug: reload everything
+        [crumb_row(6, 7)],  # a parent that is not in the index
+        TREE + [crumb_row(7, 1), crumb_row(6, 7)],
+    )
+    category_breadcrumbs.get(1)
+
+    category_events.dispatch_change(slug="slug-5")
+    assert [crumb["id"] for crumb in category_breadcrumbs.get(5)] == [1, 4, 5]
+    assert len(statements) == 2
+
+    category_events.dispatch_change(6, "slug-6")
+    assert [crumb["id"] for crumb in category_breadcrumbs.get(6)] == [1, 7, 6]
+    assert len(statements) == 4
@@ -0,0 +1,333 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Category
+from app.schemas.category_schema import CategoryCreate
+from app.utils import category_bulk
+from app.utils.category_bulk import (
+    CATEGORY_IN_USE,
+    CATEGORY_NOT_FOUND,
+    CHUNK_FAILED,
+    NAME_LEVEL_EXISTS,
+    PARENT_NOT_FOUND,
+    SLUG_EXISTS,
+    find_conflicts,
+)
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.utils.mock_utils import MockResult
+
+
+def random_items(count):
+    items = []
+    for number in range(count):
+        item = get_random_category_dict()
+        item.pop("id")
+        item["slug"] = f"{item['slug']}-{number}"
+        item["name"] = f"{item['name']}-{number}"
+        items.append(item)
+    return items
+
+
+def mock_insert(inserted):
+    def _mock(db, items):
+        inserted.extend(items)
+        return {item.slug: number for number, item in enumerate(items, start=1)}
+
+    return _mock
+
+
+"""
+- [ ] Test POST bulk categories, every item created
+"""
+
+
+def test_unit_bulk_create_categories_successfully(client, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(category_bulk, "find_conflicts", mock_output({}))
+    monkeypatch.setattr(category_bulk, "insert_categories", mock_insert(inserted))
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post("api/category/bulk", json=random_items(3))
+    assert response.status_code == 201
+    assert response.json()["succeeded"] == 3
+    assert [result["id"] for result in response.json()["results"]] == [1, 2, 3]
+    assert len(inserted) == 3
+
+
+"""
+- [ ] Test POST bulk categories all-or-nothing with a conflict
+"""
+
+
+def test_unit_bulk_create_categories_atomic_conflict(client, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(category_bulk, "find_conflicts", mock_output({1: SLUG_EXISTS}))
+    monkeypatch.setattr(category_bulk, "insert_categories", mock_insert(inserted))
+
+    response = client.post("api/category/bulk", json=random_items(3))
+    assert response.status_code == 400
+    results = response.json()["detail"]["results"]
+    assert [result["status"] for result in results] == ["skipped", "error", "skipped"]
+    assert results[1]["detail"] == SLUG_EXISTS
+    assert inserted == []
+
+
+"""
+- [ ] Test POST bulk categories best effort with a conflict
+"""
+
+
+def test_unit_bulk_create_categories_best_effort(client, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(category_bulk, "find_conflicts", mock_output({1: SLUG_EXISTS}))
+    monkeypatch.setattr(category_bulk, "insert_categories", mock_insert(inserted))
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post("api/category/bulk?mode=best_effort", json=random_items(3))
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [result["status"] for result in body["results"]] == [
+        "created",
+        "error",
+        "created",
+    ]
+    assert len(inserted) == 2
+
+
+"""
+- [ ] Test POST bulk categories rolls back when a concurrent insert won
+"""
+
+
+def test_unit_bulk_create_categories_atomic_race(client, monkeypatch):
+    monkeypatch.setattr(category_bulk, "find_conflicts", mock_output({}))
+    # ON CONFLICT DO NOTHING skipped the second item
+    items = random_items(2)
+    monkeypatch.setattr(
+        category_bulk, "insert_categories", mock_output({items[0]["slug"]: 1})
+    )
+
+    response = client.post("api/category/bulk", json=items)
+    assert response.status_code == 400
+    statuses = [result["status"] for result in response.json()["detail"]["results"]]
+    assert statuses == ["skipped", "error"]
+
+
+def test_unit_bulk_create_categories_too_many(client, monkeypatch):
+    monkeypatch.setattr("app.routers.category_bulk_routes.CATEGORY_BULK_MAX_ITEMS", 2)
+    response = client.post("api/category/bulk", json=random_items(3))
+    assert response.status_code == 413
+
+
+"""
+- [ ] Test duplicates inside the same batch are conflicts
+"""
+
+
+def test_unit_bulk_find_conflicts_within_batch(monkeypatch):
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    first, second, third = (CategoryCreate(**item) for item in random_items(3))
+    same_slug = second.model_copy(update={"name": "another name"})
+    same_name = third.model_copy(update={"slug": "another-slug"})
+
+    conflicts = find_conflicts(Session(), [first, second, same_slug, third, same_name])
+    assert conflicts == {2: SLUG_EXISTS, 4: NAME_LEVEL_EXISTS}
+
+
+"""
+- [ ] Test POST bulk categories best effort, a rejected item does not block a later one
+"""
+
+
+def test_unit_bulk_create_categories_best_effort_after_rejected(client, monkeypatch):
+    inserted = []
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    monkeypatch.setattr("sqlalchemy.orm.Session.scalars", mock_output([]))
+    monkeypatch.setattr(category_bulk, "insert_categories", mock_insert(inserted))
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+    orphan, valid = random_items(2)
+    orphan["parent_id"] = 999999  # does not exist
+    # only the name and level of the rejected item, its slug differs
+    valid.update(name=orphan["name"], level=orphan["level"], parent_id=None)
+
+    response = client.post("api/category/bulk?mode=best_effort", json=[orphan, valid])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["error", "created"]
+    assert results[0]["detail"] == PARENT_NOT_FOUND
+    assert [item.slug for item in inserted] == [valid["slug"]]
+
+
+"""
+- [ ] Test POST bulk update needs a selection and values
+"""
+
+
+def test_unit_bulk_update_categories_requires_selection(client):
+    response = client.post(
+        "api/category/bulk/update", json={"where": {}, "values": {"is_active": True}}
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "api/category/bulk/update", json={"where": {"level": 2}, "values": {}}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Nothing to update"}
+
+
+"""
+- [ ] Test POST bulk update by ids reports unchanged and missing categories
+"""
+
+
+def test_unit_bulk_update_categories_by_ids(client, monkeypatch):
+    # 1, 2 and 3 exist, only 1 and 2 had a different is_active
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.scalars", mock_output(MockResult([1, 2, 3]))
+    )
+    updated = [
+        Category(**get_random_category_dict(category_id)) for category_id in (1, 2)
+    ]
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(updated))
+    )
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post(
+        "api/category/bulk/update",
+        json={"where": {"ids": [1, 2, 3, 4]}, "values": {"is_active": True}},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": 2,
+        "unchanged": 1,
+        "failed": 1,
+        "ids": [1, 2],
+        "errors": [{"id": 4, "detail": CATEGORY_NOT_FOUND}],
+        "chunks": 1,
+    }
+
+
+"""
+- [ ] Test POST bulk delete removes subtrees bottom-up and reports what is in use
+"""
+
+
+def test_unit_bulk_delete_categories_bottom_up(client, monkeypatch):
+    # 1 <- 2 <- 3 (parent <- child), 4 still has a product
+    parents = {2: 1, 3: 2}
+    existing = {1, 2, 3, 4}
+
+    def mock_delete_unused(db, ids):
+        leaves = [
+            category_id
+            for category_id in ids
+            if category_id != 4 and category_id not in parents.values()
+        ]
+        for category_id in leaves:
+            existing.discard(category_id)
+            parents.pop(category_id, None)
+        return [
+            Category(id=category_id, slug=f"c{category_id}") for category_id in leaves
+        ]
+
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.scalars", mock_output(MockResult([1, 2, 3, 4]))
+    )
+    monkeypatch.setattr(category_bulk, "delete_unused", mock_delete_unused)
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post("api/category/bulk/delete", json={"ids": [1, 2, 3, 4]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ids"] == [3, 2, 1]
+    assert body["errors"] == [{"id": 4, "detail": CATEGORY_IN_USE}]
+    assert existing == {4}
+
+
+def chunks_of(*chunks):
+    # Session.scalars answering the keyset queries of selected_id_chunks
+    answers = iter([*chunks, []])
+    return lambda *args, **kwargs: MockResult(next(answers))
+
+
+def violation(constraint):
+    return IntegrityError(
+        "UPDATE category", {}, Exception(f'violates constraint "{constraint}"')
+    )
+
+
+"""
+- [ ] Test a failed bulk update chunk is rolled back and reported, the others kept
+"""
+
+
+def test_unit_bulk_update_categories_chunk_fails(client, monkeypatch):
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.scalars", chunks_of([1, 2], [3, 4], [5])
+    )
+    errors = iter([None, violation("category_parent_id_fkey"), violation("other")])
+
+    def execute(self, statement, *args, **kwargs):
+        error = next(errors)
+        if error is not None:
+            raise error
+        return MockResult([Category(id=1, slug="c1"), Category(id=2, slug="c2")])
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+    rollbacks = []
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.rollback", lambda self: rollbacks.append(1)
+    )
+
+    response = client.post(
+        "api/category/bulk/update",
+        json={"where": {"level": 2}, "values": {"parent_id": None}},
+        params={"chunk_size": 2},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": 2,
+        "unchanged": 0,
+        "failed": 3,
+        "ids": [1, 2],
+        "errors": [
+            # the parent was deleted concurrently
+            {"id": 3, "detail": PARENT_NOT_FOUND},
+            {"id": 4, "detail": PARENT_NOT_FOUND},
+            {"id": 5, "detail": CHUNK_FAILED},
+        ],
+        "chunks": 3,
+    }
+    assert len(rollbacks) == 2
+
+
+"""
+- [ ] Test a failed bulk delete chunk is rolled back and reported
+"""
+
+
+def test_unit_bulk_delete_categories_chunk_fails(client, monkeypatch):
+    def mock_delete_unused(db, ids):
+        if 3 in ids:  # a product of 3 was inserted meanwhile
+            raise violation("product_category_id_fkey")
+        return [Category(id=category_id, slug=f"c{category_id}") for category_id in ids]
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.scalars", chunks_of([1, 2], [3, 4]))
+    monkeypatch.setattr(category_bulk, "delete_unused", mock_delete_unused)
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post(
+        "api/category/bulk/delete", json={"level": 1}, params={"chunk_size": 2}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ids"] == [1, 2]
+    assert body["errors"] == [
+        {"id": 3, "detail": CATEGORY_IN_USE},
+        {"id": 4, "detail": CATEGORY_IN_USE},
+    ]
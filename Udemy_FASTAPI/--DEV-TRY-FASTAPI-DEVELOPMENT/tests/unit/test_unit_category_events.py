@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from app.utils import category_events
+from app.utils.category_events import CategoryChangeListener, notify_payload
+
+"""
+- [ ] Test notifications are handed to the invalidators in version order
+"""
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        category_events,
+        "_invalidators",
+        [
+            (
+                lambda category_id, slug: calls.append((category_id, slug)),
+                lambda: calls.append("reset"),
+            )
+        ],
+    )
+    return calls
+
+
+def test_unit_category_listener_dispatches_changes(invalidations):
+    listener = CategoryChangeListener(engine=None)
+    listener.version = 4
+
+    listener.handle(notify_payload(5, [(1, "old-slug"), (None, "new-slug")]))
+    listener.handle(notify_payload(5, [(2, "seen-already")]))
+
+    assert invalidations == [(1, "old-slug"), (None, "new-slug")]
+    assert listener.version == 5
+
+
+def test_unit_category_listener_resets_on_gap(invalidations):
+    listener = CategoryChangeListener(engine=None)
+    listener.version = 4
+
+    listener.handle(notify_payload(7, [(1, "slug")]))  # 5 and 6 got lost
+
+    assert invalidations == ["reset"]
+    assert listener.version == 7
+
+
+"""
+- [ ] Test shared caches only hear of the changes of the worker that wrote
+"""
+
+
+def test_unit_category_shared_invalidators_skip_notifications(
+    invalidations, monkeypatch
+):
+    shared = []
+    monkeypatch.setattr(
+        category_events,
+        "_shared_invalidators",
+        [
+            (
+                lambda category_id, slug: shared.append((category_id, slug)),
+                lambda: shared.append("reset"),
+            )
+        ],
+    )
+    listener = CategoryChangeListener(engine=None)
+    listener.version = 4
+
+    listener.handle(notify_payload(5, [(1, "slug")]))
+    listener.handle(notify_payload(7, [(2, "other-slug")]))  # a gap
+    assert invalidations == [(1, "slug"), "reset"]
+    assert shared == []
+
+    category_events.dispatch_change(3, "written-here")
+    category_events.dispatch_reset()
+    assert shared == [(3, "written-here"), "reset"]
+
+
+def test_unit_category_listener_resets_on_missed_version(invalidations):
+    class FakeConnection:
+        notifies = []
+
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def execute(self, statement):
+            pass
+
+        def fetchone(self):
+            return (9,)
+
+    listener = CategoryChangeListener(engine=None)
+    listener.version = 9
+    listener.check_version(FakeConnection())
+    assert invalidations == []
+
+    listener.version = 8  # reconnected after missing a notification
+    listener.check_version(FakeConnection())
+    assert invalidations == ["reset"]
+
+
+"""
+- [ ] Test big change sets are sent as a reset
+"""
+
+
+def test_unit_category_notify_payload_too_big():
+    changes = [(number, f"category-{number}") for number in range(1000)]
+    message = json.loads(notify_payload(3, changes))
+    assert message == {"version": 3, "changes": None}
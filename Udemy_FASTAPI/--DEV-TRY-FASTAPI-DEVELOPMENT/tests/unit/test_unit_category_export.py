@@ -0,0 +1,142 @@
+import asyncio
+import json
+from collections import namedtuple
+
+import pytest
+
+from app.routers.category_export_routes import (
+    open_export,
+    render_ndjson,
+    stream_categories,
+)
+from tests.factories.models_factory import get_random_category_dict
+
+CategoryRow = namedtuple(
+    "CategoryRow", ["id", "name", "slug", "is_active", "level", "parent_id"]
+)
+
+
+class MockStreamResult:
+    def __init__(self, batches):
+        self.batches = batches
+
+    def partitions(self):
+        return iter(self.batches)
+
+
+def mock_stream(batches):
+    return lambda *args, **kwargs: MockStreamResult(batches)
+
+
+def random_rows(count):
+    return [CategoryRow(**get_random_category_dict(i)) for i in range(1, count + 1)]
+
+
+"""
+- [ ] Test export categories as NDJSON
+"""
+
+
+def test_unit_export_categories_ndjson(client, monkeypatch):
+    rows = random_rows(5)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_stream([rows[:3], rows[3:]])
+    )
+
+    response = client.get("api/category/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == [row._asdict() for row in rows]
+
+
+"""
+- [ ] Test export categories as CSV
+"""
+
+
+def test_unit_export_categories_csv(client, monkeypatch):
+    rows = random_rows(4)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_stream([rows[:2], rows[2:]])
+    )
+
+    response = client.get("api/category/export?format=csv")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,name,slug,is_active,level,parent_id"
+    assert len(lines) == 5  # the header is only written once
+    assert lines[1].startswith(f"{rows[0].id},{rows[0].name},{rows[0].slug},")
+
+
+def test_unit_export_categories_unknown_format(client):
+    response = client.get("api/category/export?format=xml")
+    assert response.status_code == 422
+
+
+"""
+- [ ] Test export stops when the client disconnects
+"""
+
+
+class DisconnectingRequest:
+    def __init__(self, connected_checks):
+        self.connected_checks = connected_checks
+
+    async def is_disconnected(self):
+        self.connected_checks -= 1
+        return self.connected_checks < 0
+
+
+def test_unit_export_categories_stops_on_disconnect(monkeypatch):
+    closed = []
+    batches = [random_rows(2) for _ in range(10)]
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_stream(batches))
+    monkeypatch.setattr("sqlalchemy.orm.Session.close", lambda self: closed.append(1))
+
+    async def consume():
+        request = DisconnectingRequest(connected_checks=2)
+        db, result = await open_export()
+        stream = stream_categories(request, db, result, render_ndjson)
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(consume())
+    assert len(chunks) == 2
+    assert closed == [1]
+
+
+"""
+- [ ] Test a failing export query is a 500, a failure mid-stream is raised
+"""
+
+
+def test_unit_export_categories_query_fails(client, monkeypatch):
+    def execute(*args, **kwargs):
+        raise Exception("database went away")
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+    response = client.get("api/category/export")
+    assert response.status_code == 500
+
+
+def test_unit_export_categories_fails_mid_stream(monkeypatch):
+    closed = []
+
+    def batches():
+        yield random_rows(2)
+        raise Exception("database went away")
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_stream(batches()))
+    monkeypatch.setattr("sqlalchemy.orm.Session.close", lambda self: closed.append(1))
+
+    async def consume(chunks):
+        db, result = await open_export()
+        request = DisconnectingRequest(connected_checks=10)
+        async for chunk in stream_categories(request, db, result, render_ndjson):
+            chunks.append(chunk)
+
+    chunks = []
+    with pytest.raises(Exception, match="database went away"):
+        asyncio.run(consume(chunks))
+    assert len(chunks) == 1  # not ended as if that was all
+    assert closed == [1]
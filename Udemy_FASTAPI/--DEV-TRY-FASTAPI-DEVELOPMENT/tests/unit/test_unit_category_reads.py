@@ -0,0 +1,38 @@
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.category_schema import CategoryReturn
+from app.utils.category_reads import CATEGORY_BY_SLUG, CategoryRecord, category_records
+from app.utils.category_utils import CATEGORY_RETURN_FIELDS
+from tests.factories.models_factory import get_random_category_dict
+from tests.utils.mock_utils import category_rows
+
+"""
+- [ ] Test category records carry the CategoryReturn fields and nothing else
+"""
+
+
+def test_unit_category_records_match_category_return():
+    categories = [get_random_category_dict(i) for i in range(1, 4)]
+    records = category_records(category_rows(categories))
+
+    assert CategoryRecord.__slots__ == CATEGORY_RETURN_FIELDS
+    assert not hasattr(records[0], "__dict__")
+    assert [
+        CategoryReturn.model_validate(record, from_attributes=True).model_dump()
+        for record in records
+    ] == categories
+
+
+"""
+- [ ] Test the read statements select columns, not Category entities
+"""
+
+
+def test_unit_category_slug_statement_selects_columns():
+    statement = CATEGORY_BY_SLUG.statement
+    assert [column.name for column in statement.selected_columns] == list(
+        CATEGORY_RETURN_FIELDS
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "WHERE category.slug = %(slug)s" in sql
+    assert "LIMIT" in sql
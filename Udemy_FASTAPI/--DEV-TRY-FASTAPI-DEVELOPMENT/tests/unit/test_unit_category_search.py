@@ -0,0 +1,66 @@
+from sqlalchemy.dialects import postgresql
+
+from app.utils.category_search import search_statement, search_terms
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.utils.mock_utils import MockResult, category_rows
+
+"""
+- [ ] Test GET category search returns the matching categories
+"""
+
+
+def test_unit_search_category_successfully(client, monkeypatch):
+    categories = category_rows([get_random_category_dict(i) for i in range(1, 4)])
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(categories))
+    )
+
+    response = client.get("api/category/search", params={"q": "kitchen"})
+    assert response.status_code == 200
+    assert [category["id"] for category in response.json()] == [1, 2, 3]
+
+
+"""
+- [ ] Test GET category search without words to search for does not query
+"""
+
+
+def test_unit_search_category_without_words(client, monkeypatch):
+    def execute(*args, **kwargs):
+        raise AssertionError("no query expected")
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+
+    response = client.get("api/category/search", params={"q": " &!: "})
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+"""
+- [ ] Test GET category search rejects an empty q and a limit out of range
+"""
+
+
+def test_unit_search_category_invalid_params(client):
+    assert client.get("api/category/search").status_code == 422
+    assert client.get("api/category/search", params={"q": ""}).status_code == 422
+    response = client.get("api/category/search", params={"q": "a", "limit": 0})
+    assert response.status_code == 422
+
+
+"""
+- [ ] Test the search query uses the indexed expression with prefix matching
+"""
+
+
+def test_unit_search_statement_prefix_terms():
+    assert search_terms("Home & Kitchen-2 it's") == ["home", "kitchen", "2", "it", "s"]
+
+    statement = search_statement("Home kit", 20)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "to_tsvector('simple'::regconfig, (name::text" in sql
+    assert statement.compile().params["query"] == "home:* & kit:*"
+
+    statement = search_statement("Home kit", 20, prefix=False)
+    assert statement.compile().params["query"] == "home & kit"
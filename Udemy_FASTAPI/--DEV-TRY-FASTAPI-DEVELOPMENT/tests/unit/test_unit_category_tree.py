@@ -0,0 +1,172 @@
+from types import SimpleNamespace
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Category
+from app.routers import category_tree_routes
+from app.utils.category_bulk import PARENT_NOT_FOUND
+from app.utils.category_tree import subtree_statement
+from app.utils.category_utils import PARENT_CYCLE
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.utils.mock_utils import MockResult
+
+
+def tree_row(category_id, parent_id, depth):
+    # the columns of the tree statements: TREE_COLUMNS + depth
+    name = f"category-{category_id}"
+    return (category_id, name, name, True, 100, parent_id, depth)
+
+
+"""
+- [ ] Test GET category tree nests the rows of the recursive query
+"""
+
+
+def test_unit_get_category_tree_successfully(client, monkeypatch):
+    rows = [
+        tree_row(1, None, 0),
+        tree_row(2, None, 0),
+        tree_row(3, 1, 1),
+        tree_row(4, 1, 1),
+        tree_row(5, 3, 2),
+    ]
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult(rows)))
+
+    response = client.get("api/category/tree")
+    assert response.status_code == 200
+    tree = response.json()
+    assert [node["id"] for node in tree] == [1, 2]
+    assert [node["id"] for node in tree[0]["children"]] == [3, 4]
+    assert tree[0]["children"][0]["children"][0]["id"] == 5
+    assert tree[1]["children"] == []
+
+
+"""
+- [ ] Test GET category subtree, found and not found
+"""
+
+
+def test_unit_get_category_subtree(client, monkeypatch):
+    rows = [tree_row(3, 1, 0), tree_row(5, 3, 1)]
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult(rows)))
+
+    response = client.get("api/category/3/subtree?max_depth=1")
+    assert response.status_code == 200
+    assert response.json()["id"] == 3
+    assert response.json()["children"][0]["id"] == 5
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    response = client.get("api/category/3/subtree")
+    assert response.status_code == 404
+
+
+"""
+- [ ] Test GET category ancestors nests from the top level category down
+"""
+
+
+def test_unit_get_category_ancestors(client, monkeypatch):
+    # the walk goes up: the category itself first
+    rows = [tree_row(5, 3, 0), tree_row(3, 1, 1), tree_row(1, None, 2)]
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult(rows)))
+
+    response = client.get("api/category/5/ancestors")
+    assert response.status_code == 200
+    chain = response.json()
+    assert chain["id"] == 1
+    assert chain["children"][0]["id"] == 3
+    assert chain["children"][0]["children"][0]["id"] == 5
+    assert chain["children"][0]["children"][0]["children"] == []
+
+
+"""
+- [ ] Test GET category tree rejects a max_depth over the limit
+"""
+
+
+def test_unit_get_category_tree_max_depth(client):
+    response = client.get("api/category/tree?max_depth=100000")
+    assert response.status_code == 422
+
+
+"""
+- [ ] Test the subtree is a range on the materialized path of the category
+"""
+
+
+def test_unit_subtree_statement_is_a_path_range():
+    sql = str(subtree_statement(1, 3))
+    assert "category_path.path >= category_path_1.path" in sql
+    assert (
+        "category_path.path < (left(category_path_1.path, :left_1) || :left_2)" in sql
+    )
+    assert "WITH RECURSIVE" not in sql
+
+
+"""
+- [ ] Test POST move category returns the category and the size of the subtree
+"""
+
+
+def test_unit_move_category_successfully(client, monkeypatch):
+    category = get_random_category_dict()
+    monkeypatch.setattr(
+        category_tree_routes,
+        "move_category",
+        mock_output((Category(**category), 3)),
+    )
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post(f"api/category/{category['id']}/move", json={})
+    assert response.status_code == 200
+    assert response.json() == {"category": category, "moved": 3}
+
+
+"""
+- [ ] Test POST move category below its own subcategory or a missing parent
+"""
+
+
+def test_unit_move_category_rejected(client, monkeypatch):
+    # category 1 ("1/"), the lock and the lookup of the category share the mock
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([SimpleNamespace(parent_id=None, path="1/")])),
+    )
+    # category 5 is below category 1
+    monkeypatch.setattr("sqlalchemy.orm.Session.scalar", mock_output("1/5/"))
+    response = client.post("api/category/1/move", json={"parent_id": 5})
+    assert response.status_code == 400
+    assert response.json() == {"detail": PARENT_CYCLE}
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.scalar", mock_output(None))
+    response = client.post("api/category/1/move", json={"parent_id": 5})
+    assert response.status_code == 400
+    assert response.json() == {"detail": PARENT_NOT_FOUND}
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult([])))
+    response = client.post("api/category/1/move", json={"parent_id": 5})
+    assert response.status_code == 404
+
+
+"""
+- [ ] Test PATCH category parent_id into its own subtree is a 400
+"""
+
+
+def test_unit_patch_category_parent_cycle(client, monkeypatch):
+    def mock_cycle(*args, **kwargs):
+        raise IntegrityError(
+            "UPDATE category ...",
+            {},
+            Exception(
+                "category_path_cycle: category 1 can not move below its own subcategory 5"
+            ),
+        )
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_cycle)
+
+    response = client.patch("api/category/1", json={"parent_id": 5})
+    assert response.status_code == 400
+    assert response.json() == {"detail": PARENT_CYCLE}
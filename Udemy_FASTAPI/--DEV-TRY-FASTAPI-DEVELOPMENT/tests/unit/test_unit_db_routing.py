@@ -0,0 +1,133 @@
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import State
+from starlette.requests import Request
+
+from app.db_connetion import LAST_WRITE_COOKIE, wrote_recently
+from app.utils.db_routing import ReplicaSet, RoutingSession
+
+# sqlite engines stand in for the primary and the replicas here, the routing only
+# looks at which engine a session gets bound to
+
+
+def make_session(replica_set, read_only=True):
+    primary = create_engine("sqlite://")
+    Session = sessionmaker(bind=primary, class_=RoutingSession, replica_set=replica_set)
+    db = Session()
+    db.info["read_only"] = read_only
+    return primary, db
+
+
+"""
+- [ ] Test read-only sessions are routed to a replica
+"""
+
+
+def test_unit_routing_read_only_session_uses_replica():
+    replica = create_engine("sqlite://")
+    _, db = make_session(ReplicaSet(engines=[replica]))
+    assert db.get_bind() is replica
+
+
+def test_unit_routing_write_session_uses_primary():
+    replica = create_engine("sqlite://")
+    primary, db = make_session(ReplicaSet(engines=[replica]), read_only=False)
+    assert db.get_bind() is primary
+
+
+def test_unit_routing_session_sticks_to_one_replica():
+    replicas = [create_engine("sqlite://"), create_engine("sqlite://")]
+    _, db = make_session(ReplicaSet(engines=replicas))
+    assert len({db.get_bind() for _ in range(4)}) == 1
+
+    # but different sessions are spread over the replicas
+    other_sessions = [make_session(ReplicaSet(engines=replicas))[1] for _ in range(2)]
+    assert all(session.get_bind() in replicas for session in other_sessions)
+
+
+"""
+- [ ] Test a read goes on on the primary when the replica can not be connected to
+"""
+
+
+def test_unit_routing_retries_on_primary_when_replica_unreachable(tmp_path):
+    # sqlite can not open a file in a directory that does not exist
+    replica = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+    replica_set = ReplicaSet(engines=[replica])
+    primary, db = make_session(replica_set)
+
+    assert db.execute(text("SELECT 1")).scalar() == 1
+    assert db.get_bind() is primary
+    assert replica_set.healthy() == []
+
+
+"""
+- [ ] Test the request state is marked once a replica is handed out
+"""
+
+
+def test_unit_routing_marks_request_state():
+    state = State()
+    _, db = make_session(ReplicaSet(engines=[create_engine("sqlite://")]))
+    db.info["request_state"] = state
+    db.info["read_only"] = False
+    db.get_bind()
+    assert not hasattr(state, "read_from_replica")
+
+    db.info["read_only"] = True
+    db.get_bind()
+    assert state.read_from_replica is True
+
+
+"""
+- [ ] Test fallback to the primary when replicas are down
+"""
+
+
+def test_unit_routing_falls_back_to_primary_when_replica_down():
+    replica = create_engine("sqlite://")
+    replica_set = ReplicaSet(engines=[replica])
+    replica_set.mark_down(replica)
+
+    primary, db = make_session(replica_set)
+    assert db.get_bind() is primary
+
+
+def test_unit_routing_health_check_marks_replicas():
+    healthy, broken = create_engine("sqlite://"), create_engine("sqlite://")
+    replica_set = ReplicaSet(
+        engines=[healthy, broken],
+        probe_engines=[
+            create_engine("sqlite://"),
+            create_engine("sqlite:////nonexistent-dir/replica.db"),
+        ],
+    )
+    replica_set.check()
+    assert replica_set.healthy() == [healthy]
+
+
+def test_unit_routing_replica_comes_back_after_retry_window():
+    replica = create_engine("sqlite://")
+    replica_set = ReplicaSet(engines=[replica], retry_after=0)
+    replica_set.mark_down(replica)
+    assert replica_set.healthy() == [replica]
+
+
+"""
+- [ ] Test read-your-writes window
+"""
+
+
+def make_request(cookies):
+    cookie_header = "; ".join(f"{key}={value}" for key, value in cookies.items())
+    headers = [(b"cookie", cookie_header.encode())] if cookies else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_unit_routing_read_your_writes_window():
+    assert not wrote_recently(make_request({}))
+    assert wrote_recently(make_request({LAST_WRITE_COOKIE: str(time.time())}))
+    assert not wrote_recently(make_request({LAST_WRITE_COOKIE: "0"}))
+    assert not wrote_recently(make_request({LAST_WRITE_COOKIE: "garbage"}))
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import HTTPException
+
+from app.db_connetion import get_db_session
+from tests.utils.mock_utils import MockResult
+
+"""
+- [ ] Test the request session commits once and is closed
+"""
+
+
+def record_calls(monkeypatch, calls):
+    for method in ("commit", "rollback", "close"):
+        monkeypatch.setattr(
+            f"sqlalchemy.orm.Session.{method}",
+            lambda self, method=method: calls.append(method),
+        )
+
+
+def test_unit_db_session_commits_and_closes(monkeypatch):
+    calls = []
+    record_calls(monkeypatch, calls)
+
+    dependency = get_db_session()
+    next(dependency)  # what fastapi hands to the endpoint
+    with pytest.raises(StopIteration):
+        next(dependency)  # endpoint returned without raising
+
+    assert calls == ["commit", "close"]
+
+
+"""
+- [ ] Test the request session rolls back when the endpoint raises
+"""
+
+
+def test_unit_db_session_rolls_back_and_closes(monkeypatch):
+    calls = []
+    record_calls(monkeypatch, calls)
+
+    dependency = get_db_session()
+    next(dependency)
+    with pytest.raises(HTTPException):
+        dependency.throw(HTTPException(status_code=404, detail="Category not found"))
+
+    assert calls == ["rollback", "close"]
+
+
+def test_unit_db_session_rolls_back_failed_request(client, monkeypatch):
+    calls = []
+    record_calls(monkeypatch, calls)
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", lambda *args, **kwargs: MockResult([])
+    )
+
+    response = client.get("api/category/slug/missing-slug")
+    assert response.status_code == 404
+    assert calls == ["rollback", "close"]
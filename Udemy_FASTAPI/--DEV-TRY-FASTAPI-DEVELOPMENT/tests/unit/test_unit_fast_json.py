@@ -0,0 +1,42 @@
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.utils.mock_utils import (
+    MockResult,
+    category_rows,
+    mock_async_output,
+)
+
+CATEGORIES = [get_random_category_dict(i) for i in range(1, 4)]
+ROWS = category_rows(CATEGORIES)
+
+"""
+- [ ] Test GET categories fast path returns the same body and headers
+"""
+
+
+def test_unit_get_categories_fast_json_same_output(client, monkeypatch):
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", mock_output(MockResult(ROWS)))
+    expected = client.get("api/category/?limit=2")
+
+    monkeypatch.setattr("app.routers.category_routes.FAST_JSON", True)
+    response = client.get("api/category/?limit=2")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected.json() == CATEGORIES[:2]
+    # same keys in the same order
+    assert list(response.json()[0]) == list(expected.json()[0])
+    assert response.headers["X-Next-Cursor"] == expected.headers["X-Next-Cursor"]
+    assert response.headers["Link"] == expected.headers["Link"]
+
+
+def test_unit_async_get_categories_fast_json(async_client, monkeypatch):
+    monkeypatch.setattr("app.routers.category_async_routes.FAST_JSON", True)
+    monkeypatch.setattr(
+        "sqlalchemy.ext.asyncio.AsyncSession.execute",
+        mock_async_output(MockResult(ROWS)),
+    )
+    response = async_client.get("api/category/")
+    assert response.status_code == 200
+    assert response.json() == CATEGORIES
+    assert "Link" not in response.headers
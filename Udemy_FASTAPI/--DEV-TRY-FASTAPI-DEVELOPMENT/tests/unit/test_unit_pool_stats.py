@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.utils.pool_stats import PoolStats, instrumented_pool
+
+"""
+- [ ] Test pool wait time histogram
+"""
+
+
+def test_unit_pool_stats_histogram():
+    stats = PoolStats()
+    stats.observe_wait(0.0005)  # 0.5 ms
+    stats.observe_wait(0.003)  # 3 ms
+    stats.observe_wait(12)  # 12 s
+
+    snapshot = stats.snapshot()
+    assert snapshot["wait_count"] == 3
+    assert snapshot["wait_histogram_ms"]["1"] == 1
+    assert snapshot["wait_histogram_ms"]["5"] == 1
+    assert snapshot["wait_histogram_ms"]["+Inf"] == 1
+    assert snapshot["wait_max_ms"] == 12000
+
+
+"""
+- [ ] Test pool exhaustion is counted
+"""
+
+
+def test_unit_pool_stats_counts_checkouts_and_timeouts():
+    stats = PoolStats()
+    engine = create_engine(
+        "sqlite://",
+        poolclass=instrumented_pool(QueuePool, stats),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    connection = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    connection.close()
+
+    snapshot = stats.snapshot()
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_count"] == 2
+    assert engine.pool.checkedout() == 0
+
+    # dispose rebuilds the pool from the same class, stats must survive it
+    engine.dispose()
+    assert engine.pool.stats is stats
+
+
+"""
+- [ ] Test GET pool stats
+"""
+
+
+def test_unit_get_pool_stats(client):
+    response = client.get("api/metrics/pool")
+    assert response.status_code == 200
+    primary = next(pool for pool in response.json() if pool["name"] == "primary")
+    assert primary["checked_out"] == 0
+    assert set(primary["wait_histogram_ms"]) >= {"1", "+Inf"}
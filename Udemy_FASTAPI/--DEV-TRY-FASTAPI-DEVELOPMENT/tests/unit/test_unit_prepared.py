@@ -0,0 +1,50 @@
+from app.db_connetion import SessionLocal
+from app.utils.category_reads import CATEGORY_BY_SLUG
+from app.utils.category_utils import EXISTING_CATEGORY
+
+"""
+- [ ] Test hot statements are compiled once for PREPARE / EXECUTE
+"""
+
+
+def test_unit_prepared_statement_sql():
+    assert CATEGORY_BY_SLUG.prepare_sql.startswith("PREPARE category_by_slug AS SELECT")
+    assert "WHERE category.slug = $1" in CATEGORY_BY_SLUG.prepare_sql
+    assert CATEGORY_BY_SLUG.execute_sql == (
+        "EXECUTE category_by_slug(%(slug)s, %(param_1)s)"
+    )
+    assert "category.name = $2 AND category.level = $3" in EXISTING_CATEGORY.prepare_sql
+
+
+"""
+- [ ] Test a connection prepares a statement once and executes it after that
+"""
+
+
+class MockConnection:
+    def __init__(self):
+        self.info = {}
+        self.statements = []
+
+    def exec_driver_sql(self, sql, params=None):
+        self.statements.append((sql, params))
+
+
+def test_unit_prepared_statement_prepares_once_per_connection(monkeypatch):
+    monkeypatch.setattr("app.utils.prepared.DB_PREPARED_STATEMENTS", True)
+    connections = [MockConnection(), MockConnection()]
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.connection", lambda self, **kwargs: connection
+    )
+
+    for connection in [connections[0], connections[0], connections[1]]:
+        with SessionLocal() as db:
+            CATEGORY_BY_SLUG.execute(db, slug="kitchen")
+
+    execute = (CATEGORY_BY_SLUG.execute_sql, {"slug": "kitchen", "param_1": 1})
+    assert connections[0].statements == [
+        (CATEGORY_BY_SLUG.prepare_sql, None),
+        execute,
+        execute,
+    ]
+    assert connections[1].statements == [(CATEGORY_BY_SLUG.prepare_sql, None), execute]
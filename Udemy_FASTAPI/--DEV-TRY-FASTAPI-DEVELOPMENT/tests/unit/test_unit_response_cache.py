@@ -0,0 +1,275 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from app.models import Category
+from app.utils import response_cache
+from app.utils.category_events import dispatch_change, dispatch_reset
+from app.utils.response_cache import MemoryBackend, RedisBackend, ResponseCache
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.unit.test_unit_category_etag import versions  # noqa: F401
+from tests.utils.mock_utils import MockResult, category_rows
+
+
+class FakeRedis:
+    """
+    the redis commands RedisBackend uses, on a dict. expiry is ignored, the
+    blocking and the asyncio client of a RedisBackend share one FakeRedis
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.threads = []  # where every pipeline ran
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append(key)
+
+    def execute(self):
+        self.redis.threads.append(threading.current_thread().name)
+        for key in self.commands:
+            self.redis.data[key] = str(int(self.redis.data.get(key, 0)) + 1).encode()
+
+
+def memory_backend():
+    return MemoryBackend(maxsize=100)
+
+
+class InlineExecutor:
+    # bumps applied before dispatch_change returns, the tests check right after it
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def redis_backend():
+    redis = FakeRedis()
+    return RedisBackend(redis, redis, prefix="test:", bumps=InlineExecutor())
+
+
+@pytest.fixture(params=[memory_backend, redis_backend])
+def cache(request, monkeypatch):
+    cache = ResponseCache(request.param())
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "response_cache", cache)
+    monkeypatch.setattr(
+        "app.utils.category_events._invalidators", [(cache.on_change, cache.on_reset)]
+    )
+    monkeypatch.setattr("app.utils.category_events._shared_invalidators", [])
+    return cache
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    # every Session.execute, answered with three categories
+    queries = []
+    rows = category_rows([get_random_category_dict(i) for i in range(1, 4)])
+
+    def execute(self, statement, *args, **kwargs):
+        queries.append(statement)
+        return MockResult(rows)
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+    return queries
+
+
+"""
+- [ ] Test GET categories is answered from the cache the second time
+"""
+
+
+def test_unit_response_cache_hit(client, cache, queries):
+    response = client.get("api/category/")
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.headers["Surrogate-Key"] == "category:all category:list"
+
+    cached = client.get("api/category/")
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.headers["Surrogate-Key"] == "category:all category:list"
+    assert cached.headers["content-type"] == "application/json"
+    assert cached.json() == response.json()
+    assert len(queries) == 1
+    assert cache.stats()["hits"] == 1
+
+    # another page is another entry
+    client.get("api/category/", params={"limit": 2})
+    assert len(queries) == 2
+
+
+"""
+- [ ] Test a category write drops the responses tagged with it and the lists
+"""
+
+
+def test_unit_response_cache_invalidated_by_tag(client, cache, queries):
+    client.get("api/category/slug/some-slug")
+    client.get("api/category/")
+    assert len(queries) == 2
+
+    # an other category: the list changes, the slug does not
+    dispatch_change(2, "other-slug")
+    assert client.get("api/category/slug/some-slug").headers["X-Cache"] == "HIT"
+    assert client.get("api/category/").headers["X-Cache"] == "MISS"
+
+    # the response of the slug was category 1 (the first row)
+    dispatch_change(1, "renamed-slug")
+    response = client.get("api/category/slug/some-slug")
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.headers["Surrogate-Key"] == (
+        "category:all category:slug:some-slug category:1"
+    )
+
+    dispatch_reset()
+    assert client.get("api/category/slug/some-slug").headers["X-Cache"] == "MISS"
+
+
+"""
+- [ ] Test a response computed while a category changed is not stored
+"""
+
+
+def test_unit_response_cache_skips_racing_write(client, cache, monkeypatch):
+    rows = category_rows([get_random_category_dict(1)])
+
+    def execute(self, statement, *args, **kwargs):
+        dispatch_change(1, None)  # commits while the page is read
+        return MockResult(rows)
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+
+    client.get("api/category/")
+    assert client.get("api/category/").headers["X-Cache"] == "MISS"
+
+
+"""
+- [ ] Test the async endpoints and errors, which are never cached
+"""
+
+
+def test_unit_response_cache_async_and_errors(async_client, cache, monkeypatch):
+    rows = category_rows([get_random_category_dict(1)])
+
+    async def execute(self, *args, **kwargs):
+        return MockResult(rows)
+
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.execute", execute)
+    async_client.get("api/category/")
+    assert async_client.get("api/category/").headers["X-Cache"] == "HIT"
+
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.execute", execute_nothing)
+    assert async_client.get("api/category/slug/missing").status_code == 404
+    response = async_client.get("api/category/slug/missing")
+    assert response.status_code == 404
+    assert "X-Cache" not in response.headers
+
+
+async def execute_nothing(self, *args, **kwargs):
+    return MockResult([])
+
+
+"""
+- [ ] Test a cached response with an ETag answers If-None-Match with 304
+"""
+
+
+def test_unit_response_cache_not_modified(client, versions, cache):  # noqa: F811
+    etag = client.get("api/category/").headers["ETag"]
+    queries = len(versions["queries"])
+
+    response = client.get("api/category/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.headers["ETag"] == etag
+    assert len(versions["queries"]) == queries
+
+
+"""
+- [ ] Test the redis bumps run on their own thread, not the caller's
+"""
+
+
+def test_unit_response_cache_redis_bumps_off_the_caller():
+    redis = FakeRedis()
+    backend = RedisBackend(redis, redis, prefix="test:")
+
+    backend.bump(["category:list", "changes"]).result()
+    assert redis.threads[0].startswith("response-cache")
+    assert redis.data["test:tag:category:list"] == b"1"
+
+
+"""
+- [ ] Test a client that just wrote is not answered from the cache
+"""
+
+
+def test_unit_response_cache_bypassed_after_write(client, cache, queries):
+    client.get("api/category/")
+    assert client.get("api/category/").headers["X-Cache"] == "HIT"
+
+    client.cookies.set("last_write", str(time.time()))
+    response = client.get("api/category/")
+    assert "X-Cache" not in response.headers
+    assert len(queries) == 2
+
+
+"""
+- [ ] Test a response read on a replica is not stored
+"""
+
+
+def test_unit_response_cache_skips_replica_reads(client, cache, monkeypatch):
+    rows = category_rows([get_random_category_dict(1)])
+
+    def execute(self, statement, *args, **kwargs):
+        # what RoutingSession.get_bind does when it hands out a replica
+        self.info["request_state"].read_from_replica = True
+        return MockResult(rows)
+
+    monkeypatch.setattr("sqlalchemy.orm.Session.execute", execute)
+
+    assert client.get("api/category/").headers["X-Cache"] == "MISS"
+    assert client.get("api/category/").headers["X-Cache"] == "MISS"
+
+
+"""
+- [ ] Test a write sets the last_write cookie, also without replicas
+"""
+
+
+def test_unit_response_cache_write_sets_cookie(client, cache, monkeypatch):
+    monkeypatch.setattr("app.db_connetion.REPLICA_DATABASE_URLS", [])
+    monkeypatch.setattr("app.db_connetion.RESPONSE_CACHE_ENABLED", True)
+    category = get_random_category_dict()
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute",
+        mock_output(MockResult([(Category(**category), True)])),
+    )
+    monkeypatch.setattr("sqlalchemy.orm.Session.commit", mock_output())
+
+    response = client.post("api/category/", json=category)
+    assert response.status_code == 201
+    assert "last_write" in response.cookies
+    # the bump may not have reached redis yet, the cache is skipped
+    assert "X-Cache" not in client.get("api/category/").headers
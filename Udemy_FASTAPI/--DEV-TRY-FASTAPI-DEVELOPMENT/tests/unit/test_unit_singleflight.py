@@ -0,0 +1,211 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+from tests.factories.models_factory import get_random_category_dict
+from tests.unit.test_unit_category import mock_output
+from tests.utils.mock_utils import MockResult, category_rows
+
+"""
+- [ ] Test concurrent calls of one key in threads share one run
+"""
+
+
+def test_unit_singleflight_threads_share_one_call():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait()
+        return "category"
+
+    with ThreadPoolExecutor(10) as pool:
+        results = [pool.submit(flight.do, "hot-slug", query) for _ in range(10)]
+        # every caller is in before the leader finishes
+        while sum(s["leaders"] + s["followers"] for s in flight.snapshot()) < 10:
+            pass
+        release.set()
+
+    assert [result.result() for result in results] == ["category"] * 10
+    assert len(calls) == 1
+    (stats,) = flight.snapshot()
+    assert stats["leaders"] == 1
+    assert stats["followers"] == 9
+    assert stats["in_flight"] is False
+
+
+"""
+- [ ] Test a follower waits no longer than the timeout, and errors are shared
+"""
+
+
+def test_unit_singleflight_threads_timeout_and_error():
+    release = threading.Event()
+
+    def slow():
+        release.wait()
+        raise ValueError("database went away")
+
+    flight = SingleFlight(timeout=0.05)
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(flight.do, "slug", slow)
+        while not flight.snapshot():
+            pass
+        # runs the query itself after the timeout
+        assert flight.do("slug", lambda: "own result") == "own result"
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result()
+    (stats,) = flight.snapshot()
+    assert stats["timeouts"] == 1
+    assert stats["errors"] == 1
+
+    release.clear()
+    flight = SingleFlight(timeout=5)
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "slug", slow)
+        while not flight.snapshot():
+            pass
+        follower = pool.submit(flight.do, "slug", lambda: "not run")
+        while flight.snapshot()[0]["followers"] < 1:
+            pass
+        release.set()
+        with pytest.raises(ValueError):
+            follower.result()
+        with pytest.raises(ValueError):
+            leader.result()
+
+
+"""
+- [ ] Test the followers run the call themselves when the leader is interrupted
+"""
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_unit_singleflight_threads_leader_interrupted():
+    flight = SingleFlight(timeout=5)
+    release = threading.Event()
+
+    def interrupted():
+        release.wait()
+        raise Interrupted()  # like a KeyboardInterrupt, not an Exception
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "slug", interrupted)
+        while not flight.snapshot():
+            pass
+        follower = pool.submit(flight.do, "slug", lambda: "category")
+        while flight.snapshot()[0]["followers"] < 1:
+            pass
+        release.set()
+        with pytest.raises(Interrupted):
+            leader.result()
+        # not None, which the slug endpoint would answer with a 404
+        assert follower.result() == "category"
+
+
+"""
+- [ ] Test concurrent calls of one key on the event loop share one run
+"""
+
+
+def test_unit_singleflight_async_share_one_call():
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    async def query():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "category"
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do_async("hot-slug", query) for _ in range(10)),
+            flight.do_async("other-slug", query),
+        )
+
+    assert asyncio.run(main()) == ["category"] * 11
+    assert len(calls) == 2
+    stats = {stats["key"]: stats for stats in flight.snapshot()}
+    assert stats["hot-slug"]["followers"] == 9
+
+
+"""
+- [ ] Test the followers run the call themselves when the leader is cancelled
+"""
+
+
+def test_unit_singleflight_async_leader_cancelled():
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    async def query():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "category"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("slug", query))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("slug", query))
+        await asyncio.sleep(0)
+        leader.cancel()  # its client went away
+        return await follower
+
+    assert asyncio.run(main()) == "category"
+    assert len(calls) == 2
+
+
+"""
+- [ ] Test GET by slug goes through the flight and shows up in the metrics
+"""
+
+
+def test_unit_get_category_by_slug_singleflight(client, monkeypatch):
+    category = category_rows([get_random_category_dict(1)])
+    monkeypatch.setattr(
+        "sqlalchemy.orm.Session.execute", mock_output(MockResult(category))
+    )
+
+    assert client.get("api/category/slug/flight-slug").status_code == 200
+
+    response = client.get("api/metrics/singleflight")
+    assert response.status_code == 200
+    stats = {(s["name"], s["key"]): s for s in response.json()}
+    assert stats[("category_by_slug", "flight-slug")]["leaders"] == 1
+
+
+"""
+- [ ] Test a cancelled follower neither cancels nor repeats the running call
+"""
+
+
+def test_unit_singleflight_async_follower_cancelled():
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    async def query():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "category"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("slug", query))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("slug", query))
+        await asyncio.sleep(0)
+        follower.cancel()  # its client went away
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == "category"
+    assert len(calls) == 1
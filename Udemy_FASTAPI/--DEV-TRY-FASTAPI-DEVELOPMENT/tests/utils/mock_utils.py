@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+from app.utils.category_utils import CATEGORY_RETURN_FIELDS
+
+# what the unit tests patch Session.execute / AsyncSession.execute with, shared by
+# the sync and the async endpoint tests
+
+
+class MockResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.first()
+
+
+# what the read endpoints select (app/utils/category_reads.py): the CategoryReturn
+# columns, one row per category
+CategoryRow = namedtuple("CategoryRow", CATEGORY_RETURN_FIELDS)
+
+
+def category_rows(categories):
+    return [CategoryRow(**category) for category in categories]
+
+
+def mock_async_output(return_value=None):
+    async def _mock(*args, **kwargs):
+        return return_value
+
+    return _mock